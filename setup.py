@@ -37,6 +37,7 @@ setup(
         'matplotlib >= 2.0',
         'geopy >= 1.11.0',
         'pyyaml >= 3.11',
-        'scikit-learn >= 0.17.1'
+        'scikit-learn >= 0.17.1',
+        'scipy >= 1.3.0'
     ]
 )
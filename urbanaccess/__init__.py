@@ -5,6 +5,7 @@ from .gtfs.headways import *
 from .osm.load import *
 from .osm.network import *
 from .network import *
+from .routing import *
 from .utils import *
 from .gtfsfeeds import *
 from .plot import *
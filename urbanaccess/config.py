@@ -293,24 +293,35 @@ _GTFS_READ_TXT_CONFIG = {
                'opt_dtypes': None,
                'numeric_converter': None,
                'remove_whitespace': None,
-               'min_required_cols': None},
+               'min_required_cols': None,
+               'opt_used_cols': None,
+               'definition_cols': None},
     'stops': {'req_dtypes': {'stop_id': object},
               'opt_dtypes': None,
               'numeric_converter': ['stop_lat', 'stop_lon'],
               'remove_whitespace': ['stop_id'],
-              'min_required_cols': ['stop_id', 'stop_lat', 'stop_lon']},
+              'min_required_cols': ['stop_id', 'stop_lat', 'stop_lon'],
+              'opt_used_cols': ['stop_name', 'parent_station', 'stop_code',
+                                'wheelchair_boarding', 'zone_id',
+                                'location_type'],
+              'definition_cols': ['location_type', 'wheelchair_boarding']},
     'routes': {'req_dtypes': {'route_id': object},
                'opt_dtypes': None,
                'numeric_converter': None,
                'remove_whitespace': ['route_id'],
-               'min_required_cols': ['route_id']},
+               'min_required_cols': ['route_id'],
+               'opt_used_cols': ['agency_id', 'route_type',
+                                 'route_long_name'],
+               'definition_cols': ['route_type']},
     'trips': {'req_dtypes': {'trip_id': object,
                              'service_id': object,
                              'route_id': object},
               'opt_dtypes': {'shape_id': object},
               'numeric_converter': None,
               'remove_whitespace': ['trip_id', 'service_id', 'route_id'],
-              'min_required_cols': ['trip_id', 'service_id', 'route_id']},
+              'min_required_cols': ['trip_id', 'service_id', 'route_id'],
+              'opt_used_cols': ['direction_id', 'shape_id'],
+              'definition_cols': ['bikes_allowed', 'wheelchair_accessible']},
 
     'stop_times': {'req_dtypes': {'trip_id': object,
                                   'stop_id': object,
@@ -320,7 +331,10 @@ _GTFS_READ_TXT_CONFIG = {
                    'numeric_converter': None,
                    'remove_whitespace': ['trip_id', 'stop_id'],
                    'min_required_cols': ['trip_id', 'stop_id',
-                                         'departure_time', 'arrival_time']},
+                                         'departure_time', 'arrival_time'],
+                   'opt_used_cols': ['stop_sequence'],
+                   'definition_cols': ['pickup_type', 'drop_off_type',
+                                       'timepoint']},
     'calendar': {'req_dtypes': {'service_id': object},
                  'opt_dtypes': None,
                  'numeric_converter': ['monday', 'tuesday', 'wednesday',
@@ -330,13 +344,17 @@ _GTFS_READ_TXT_CONFIG = {
                  'min_required_cols': ['service_id', 'monday', 'tuesday',
                                        'wednesday', 'thursday', 'friday',
                                        'saturday', 'sunday', 'start_date',
-                                       'end_date']},
+                                       'end_date'],
+                 'opt_used_cols': None,
+                 'definition_cols': None},
     'calendar_dates': {'req_dtypes': {'service_id': object},
                        'opt_dtypes': None,
                        'numeric_converter': None,
                        'remove_whitespace': ['service_id'],
                        'min_required_cols': ['service_id', 'date',
-                                             'exception_type']}
+                                             'exception_type'],
+                       'opt_used_cols': None,
+                       'definition_cols': None}
 }
 
 # instantiate the UrbanAccess configuration object and check format
@@ -1,4 +1,5 @@
 import warnings
+import numpy as np
 import pandas as pd
 import time
 
@@ -25,39 +26,39 @@ def _calc_headways_by_route_stop(df):
         DataFrame of statistics of route stop headways in units of minutes
     """
 
-    # TODO: Optimize for speed
-
     start_time = time.time()
 
     df['unique_stop_route'] = (
         df['unique_stop_id'].str.cat(
             df['unique_route_id'].astype('str'), sep=','))
 
-    stop_route_groups = df.groupby('unique_stop_route')
+    stop_route_codes, stop_routes = pd.factorize(
+        df['unique_stop_route'], sort=True)
     log('Starting route stop headway calculation for {:,} route '
-        'stops...'.format(len(stop_route_groups)))
-
-    results = {}
-
-    # suppress RuntimeWarning: Mean of empty slice. for this code block
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category='RuntimeWarning')
-
-        for unique_stop_route, stop_route_group in stop_route_groups:
-            stop_route_group.sort_values(['departure_time_sec_interpolate'],
-                                         ascending=True, inplace=True)
-            next_bus_time = (stop_route_group['departure_time_sec_interpolate']
-                             .iloc[1:].values)
-            prev_bus_time = (stop_route_group['departure_time_sec_interpolate']
-                             .iloc[:-1].values)
-            stop_route_group_headways = (next_bus_time - prev_bus_time) / 60
-            results[unique_stop_route] = (pd.Series(stop_route_group_headways)
-                                          .describe())
+        'stops...'.format(len(stop_routes)))
+
+    # sort once by route stop and departure time so the headway of each
+    # departure is the difference to the previous departure of the same
+    # route stop
+    departure_times = df['departure_time_sec_interpolate'].to_numpy(
+        dtype=float)
+    order = np.lexsort((departure_times, stop_route_codes))
+    stop_route_codes = stop_route_codes[order]
+    departure_times = departure_times[order]
+    same_stop_route = stop_route_codes[1:] == stop_route_codes[:-1]
+    headways = np.diff(departure_times)[same_stop_route] / 60
+
+    results = pd.Series(headways).groupby(
+        stop_route_codes[1:][same_stop_route]).describe()
+    # route stops with a single departure have no headways
+    results = results.reindex(range(len(stop_routes)))
+    results['count'] = results['count'].fillna(0)
+    results.index = pd.Index(stop_routes)
 
     log('Route stop headway calculation complete. Took {:,.2f} seconds'.format(
         time.time() - start_time))
 
-    return pd.DataFrame(results).T
+    return results
 
 
 def _headway_handler(interpolated_stop_times_df, trips_df,
@@ -1,5 +1,7 @@
 import os
 import codecs
+import hashlib
+import json
 import re
 import time
 import pandas as pd
@@ -7,7 +9,7 @@ import six
 import logging as lg
 
 from urbanaccess import config
-from urbanaccess.utils import log
+from urbanaccess.utils import log, _replace
 from urbanaccess.gtfs.gtfsfeeds_dataframe import gtfsfeeds_dfs
 from urbanaccess.gtfs import utils_validation
 from urbanaccess.gtfs import utils_format
@@ -170,7 +172,8 @@ def _txt_header_whitespace_check(
 
 def gtfsfeed_to_df(gtfsfeed_path=None, validation=False, verbose=True,
                    bbox=None, remove_stops_outsidebbox=None,
-                   append_definitions=False):
+                   append_definitions=False, column_projection=False,
+                   day=None, calendar_dates_lookup=None, cache_dir=None):
     """
     Read all GTFS feed components as a DataFrame in a gtfsfeeds_dfs object and
     merge all individual GTFS feeds into a regional metropolitan data table.
@@ -201,6 +204,40 @@ def gtfsfeed_to_df(gtfsfeed_path=None, validation=False, verbose=True,
         if true, columns that use the GTFS data schema for their attribute
         codes will have the corresponding GTFS definition information of
         that code appended to the resulting DataFrames for reference
+    column_projection : bool, optional
+        if true, only the columns of stops, routes, trips and stop_times
+        that are used by UrbanAccess will be read from the GTFS text files
+        which reduces memory use for feeds with many optional columns.
+        Columns used to append definitions are also read if
+        append_definitions is true. Optional columns not used by
+        UrbanAccess such as stop_headsign or shape_dist_traveled will not
+        exist in the resulting DataFrames. All columns in calendar and
+        calendar_dates are always read
+    day : {'monday', 'tuesday', 'wednesday', 'thursday',
+    'friday', 'saturday', 'sunday'}, optional
+        if specified, the calendar and calendar_dates tables are used to
+        select the trips that run on this day of the week before stop_times
+        is read and stop_times is then read in chunks keeping only the
+        records of the selected trips. This reduces peak memory use to one
+        service day. The agency and route type of stops are still assigned
+        using the trips of all days. Use the same day and
+        calendar_dates_lookup that will be used in create_transit_net
+    calendar_dates_lookup : dict, optional
+        dictionary of the lookup column (key) as a string and corresponding
+        string (value) as string or list of strings to use to select
+        additional trips using the calendar_dates table when day is
+        specified. Follows the same format as the calendar_dates_lookup
+        parameter in create_transit_net. Feeds whose calendar_dates table
+        does not have a lookup column do not use that column to select
+        trips, an error is raised if no feed has the column.
+        Example: {'schedule_type' : 'WD'} or {'schedule_type' : ['WD', 'SU']}
+    cache_dir : str, optional
+        if specified, the processed DataFrames of each GTFS feed are saved
+        to a HDF5 file per feed in this directory, keyed by a hash of the
+        feed's text files and the parameters above. On the following runs
+        feeds whose text files and parameters have not changed are read from
+        this cache instead of being processed again from the text files.
+        The directory will be created if it does not exist
 
     Returns
     -------
@@ -242,6 +279,33 @@ def gtfsfeed_to_df(gtfsfeed_path=None, validation=False, verbose=True,
                 'remove_stops_outsidebbox were set to None. These parameters '
                 'must be specified for validation.')
 
+    valid_days = ['monday', 'tuesday', 'wednesday', 'thursday',
+                  'friday', 'saturday', 'sunday']
+    if day is not None and day not in valid_days:
+        raise ValueError('Incorrect day specified. Must be one of lowercase '
+                         'strings: {}.'.format(valid_days))
+    if calendar_dates_lookup is not None:
+        if day is None:
+            raise ValueError('day must be specified to use '
+                             'calendar_dates_lookup.')
+        if not isinstance(calendar_dates_lookup, dict):
+            raise ValueError(
+                'calendar_dates_lookup parameter must be a dictionary.')
+
+    if cache_dir is not None:
+        if not isinstance(cache_dir, str):
+            raise ValueError('cache_dir must be a string.')
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+            log('{} does not exist. Directory was created'.format(cache_dir))
+        cache_params = {
+            'validation': validation,
+            'bbox': list(bbox) if bbox is not None else None,
+            'remove_stops_outsidebbox': remove_stops_outsidebbox,
+            'append_definitions': append_definitions,
+            'column_projection': column_projection, 'day': day,
+            'calendar_dates_lookup': calendar_dates_lookup}
+
     _standardize_txt(csv_rootpath=gtfsfeed_path)
 
     folderlist = [foldername for foldername in os.listdir(gtfsfeed_path) if
@@ -259,7 +323,6 @@ def gtfsfeed_to_df(gtfsfeed_path=None, validation=False, verbose=True,
                         os.listdir(os.path.join(gtfsfeed_path, folder)) if
                         textfilename.endswith(".txt")]
         required_gtfsfiles = config._GTFS_TXT_FILE_TYPES['required_files']
-        optional_gtfsfiles = config._GTFS_TXT_FILE_TYPES['optional_files']
         # either calendar or calendar_dates is required
         calendar_gtfsfiles = config._GTFS_TXT_FILE_TYPES['calendar_files']
 
@@ -280,106 +343,33 @@ def gtfsfeed_to_df(gtfsfeed_path=None, validation=False, verbose=True,
                         required_file,
                         os.path.join(gtfsfeed_path, folder)))
 
-        for textfile in required_gtfsfiles:
-            # TODO: refactor to simplify creation of DataFrames
-            if textfile == 'stops.txt':
-                stops_df = utils_format._read_gtfs_file(
-                        textfile_path=os.path.join(gtfsfeed_path, folder),
-                        textfile=textfile)
-            if textfile == 'routes.txt':
-                routes_df = utils_format._read_gtfs_file(
-                        textfile_path=os.path.join(gtfsfeed_path, folder),
-                        textfile=textfile)
-            if textfile == 'trips.txt':
-                trips_df = utils_format._read_gtfs_file(
-                        textfile_path=os.path.join(gtfsfeed_path, folder),
-                        textfile=textfile)
-            if textfile == 'stop_times.txt':
-                stop_times_df = utils_format._read_gtfs_file(
-                        textfile_path=os.path.join(gtfsfeed_path, folder),
-                        textfile=textfile)
-
-        for textfile in calendar_files:
-            # use both calendar and calendar_dates if they exist, otherwise
-            # if only one of them exists use the one that exists and set the
-            # other one that does not exist to a blank df
-            if textfile == 'calendar.txt':
-                calendar_df = utils_format._read_gtfs_file(
-                        textfile_path=os.path.join(gtfsfeed_path, folder),
-                        textfile=textfile)
-                # if only calendar, set calendar_dates as blank
-                # with default required columns
-                if len(calendar_files) == 1:
-                    default_cols = config._GTFS_READ_TXT_CONFIG[
-                        'calendar_dates']['min_required_cols']
-                    calendar_dates_df = pd.DataFrame(columns=default_cols)
-            else:
-                calendar_dates_df = utils_format._read_gtfs_file(
-                        textfile_path=os.path.join(gtfsfeed_path, folder),
-                        textfile=textfile)
-                # if only calendar_dates, set calendar as blank
-                # with default required columns
-                if len(calendar_files) == 1:
-                    default_cols = config._GTFS_READ_TXT_CONFIG[
-                        'calendar']['min_required_cols']
-                    calendar_df = pd.DataFrame(columns=default_cols)
-
-        for textfile in optional_gtfsfiles:
-            if textfile == 'agency.txt':
-                if textfile in textfilelist:
-                    agency_df = utils_format._read_gtfs_file(
-                        textfile_path=os.path.join(gtfsfeed_path, folder),
-                        textfile=textfile)
-                else:
-                    agency_df = pd.DataFrame()
-
-        stops_df, routes_df, trips_df, stop_times_df, calendar_df, \
-            calendar_dates_df = utils_format._add_unique_agencyid(
-                agency_df=agency_df,
-                stops_df=stops_df,
-                routes_df=routes_df,
-                trips_df=trips_df,
-                stop_times_df=stop_times_df,
-                calendar_df=calendar_df,
-                calendar_dates_df=calendar_dates_df,
-                feed_folder=os.path.join(gtfsfeed_path, folder),
-                nulls_as_folder=True)
-
+        feed_dfs = None
+        if cache_dir is not None:
+            cache_path = os.path.join(
+                cache_dir, '{}.h5'.format(os.path.split(folder)[1]))
+            cache_key = _feed_cache_key(
+                feed_path=os.path.join(gtfsfeed_path, folder),
+                textfilelist=textfilelist,
+                feed_number=index + 1,
+                params=cache_params)
+            feed_dfs = _read_feed_cache(
+                cache_path=cache_path, cache_key=cache_key)
+
+        if feed_dfs is None:
+            feed_dfs = _load_feed(
+                gtfsfeed_path=gtfsfeed_path, folder=folder,
+                feed_number=index + 1, textfilelist=textfilelist,
+                calendar_files=calendar_files, validation=validation,
+                verbose=verbose, bbox=bbox,
+                remove_stops_outsidebbox=remove_stops_outsidebbox,
+                append_definitions=append_definitions,
+                column_projection=column_projection, day=day,
+                calendar_dates_lookup=calendar_dates_lookup)
+            if cache_dir is not None:
+                _write_feed_cache(cache_path=cache_path, cache_key=cache_key,
+                                  feed_dfs=feed_dfs)
         stops_df, routes_df, trips_df, stop_times_df, calendar_df, \
-            calendar_dates_df = utils_format._add_unique_gtfsfeed_id(
-                stops_df=stops_df,
-                routes_df=routes_df,
-                trips_df=trips_df,
-                stop_times_df=stop_times_df,
-                calendar_df=calendar_df,
-                calendar_dates_df=calendar_dates_df,
-                feed_folder=folder,
-                feed_number=index + 1)
-
-        if validation:
-            stops_df = utils_validation._validate_gtfs(
-                stops_df=stops_df,
-                feed_folder=os.path.join(gtfsfeed_path, folder),
-                verbose=verbose,
-                bbox=bbox,
-                remove_stops_outsidebbox=remove_stops_outsidebbox)
-            if remove_stops_outsidebbox:
-                stops_inside_bbox = list(stops_df['stop_id'])
-                stop_times_df = stop_times_df[stop_times_df['stop_id'].isin(
-                    stops_inside_bbox)]
-
-        stops_df = utils_format._append_route_type(
-            stops_df=stops_df,
-            stop_times_df=stop_times_df,
-            routes_df=routes_df[['route_id', 'route_type']],
-            trips_df=trips_df[['trip_id', 'route_id']],
-            info_to_append='route_type_to_stops')
-        stop_times_df = utils_format._append_route_type(
-            stops_df=stops_df,
-            stop_times_df=stop_times_df,
-            routes_df=routes_df[['route_id', 'route_type']],
-            trips_df=trips_df[['trip_id', 'route_id']],
-            info_to_append='route_type_to_stop_times')
+            calendar_dates_df = feed_dfs
 
         merged_stops_df = merged_stops_df.append(
             stops_df, ignore_index=True)
@@ -397,6 +387,13 @@ def gtfsfeed_to_df(gtfsfeed_path=None, validation=False, verbose=True,
         # print break to visually separate each GTFS feed log
         log('--------------------------------')
 
+    if calendar_dates_lookup is not None and \
+            merged_calendar_dates_df.empty is False:
+        for col_name_key in calendar_dates_lookup.keys():
+            if col_name_key not in merged_calendar_dates_df.columns:
+                raise ValueError('Column: {} not found in calendar_dates '
+                                 'DataFrame.'.format(col_name_key))
+
     if append_definitions:
         merged_stops_df, merged_routes_df, merged_stop_times_df, \
             merged_trips_df = utils_format._add_txt_definitions(
@@ -406,7 +403,7 @@ def gtfsfeed_to_df(gtfsfeed_path=None, validation=False, verbose=True,
                 trips_df=merged_trips_df)
 
     merged_stop_times_df = utils_format._timetoseconds(
-        df=merged_stop_times_df, time_cols=['departure_time'])
+        df=merged_stop_times_df, time_cols=['departure_time', 'arrival_time'])
 
     # set gtfsfeeds_dfs object to merged GTFS dfs
     gtfsfeeds_dfs.stops = merged_stops_df
@@ -423,3 +420,390 @@ def gtfsfeed_to_df(gtfsfeed_path=None, validation=False, verbose=True,
     log('     Took {:,.2f} seconds'.format(time.time() - start_time))
 
     return gtfsfeeds_dfs
+
+
+def _load_feed(gtfsfeed_path, folder, feed_number, textfilelist,
+               calendar_files, validation=False, verbose=True, bbox=None,
+               remove_stops_outsidebbox=None, append_definitions=False,
+               column_projection=False, day=None,
+               calendar_dates_lookup=None):
+    """
+    Read and format the GTFS text files of a single GTFS feed as
+    DataFrames
+
+    Parameters
+    ----------
+    gtfsfeed_path : str
+        root path where all GTFS feeds are stored
+    folder : str
+        name of the GTFS feed folder in gtfsfeed_path
+    feed_number : int
+        number of the feed used to create its unique_feed_id
+    textfilelist : list
+        list of the GTFS text file names in the feed folder
+    calendar_files : list
+        list of the calendar text file names in the feed folder
+    validation : bool, optional
+        see gtfsfeed_to_df
+    verbose : bool, optional
+        see gtfsfeed_to_df
+    bbox : tuple, optional
+        see gtfsfeed_to_df
+    remove_stops_outsidebbox : bool, optional
+        see gtfsfeed_to_df
+    append_definitions : bool, optional
+        see gtfsfeed_to_df
+    column_projection : bool, optional
+        see gtfsfeed_to_df
+    day : str, optional
+        see gtfsfeed_to_df
+    calendar_dates_lookup : dict, optional
+        see gtfsfeed_to_df
+
+    Returns
+    -------
+    feed_dfs : tuple
+        stops, routes, trips, stop_times, calendar and calendar_dates
+        DataFrames of the feed
+    """
+    required_gtfsfiles = config._GTFS_TXT_FILE_TYPES['required_files']
+    optional_gtfsfiles = config._GTFS_TXT_FILE_TYPES['optional_files']
+
+    for textfile in required_gtfsfiles:
+        # TODO: refactor to simplify creation of DataFrames
+        if textfile == 'stops.txt':
+            stops_df = utils_format._read_gtfs_file(
+                textfile_path=os.path.join(gtfsfeed_path, folder),
+                textfile=textfile,
+                column_projection=column_projection,
+                append_definitions=append_definitions)
+        if textfile == 'routes.txt':
+            routes_df = utils_format._read_gtfs_file(
+                textfile_path=os.path.join(gtfsfeed_path, folder),
+                textfile=textfile,
+                column_projection=column_projection,
+                append_definitions=append_definitions)
+        if textfile == 'trips.txt':
+            trips_df = utils_format._read_gtfs_file(
+                textfile_path=os.path.join(gtfsfeed_path, folder),
+                textfile=textfile,
+                column_projection=column_projection,
+                append_definitions=append_definitions)
+
+    for textfile in calendar_files:
+        # use both calendar and calendar_dates if they exist, otherwise
+        # if only one of them exists use the one that exists and set the
+        # other one that does not exist to a blank df
+        if textfile == 'calendar.txt':
+            calendar_df = utils_format._read_gtfs_file(
+                textfile_path=os.path.join(gtfsfeed_path, folder),
+                textfile=textfile)
+            # if only calendar, set calendar_dates as blank
+            # with default required columns
+            if len(calendar_files) == 1:
+                default_cols = config._GTFS_READ_TXT_CONFIG[
+                    'calendar_dates']['min_required_cols']
+                calendar_dates_df = pd.DataFrame(columns=default_cols)
+        else:
+            calendar_dates_df = utils_format._read_gtfs_file(
+                textfile_path=os.path.join(gtfsfeed_path, folder),
+                textfile=textfile)
+            # if only calendar_dates, set calendar as blank
+            # with default required columns
+            if len(calendar_files) == 1:
+                default_cols = config._GTFS_READ_TXT_CONFIG[
+                    'calendar']['min_required_cols']
+                calendar_df = pd.DataFrame(columns=default_cols)
+
+    # stop_times is read after trips and calendar tables so that it can
+    # be filtered to the trips that run on the specified service day
+    row_filter = None
+    if day is not None:
+        row_filter = {'trip_id': _service_day_trip_ids(
+            trips_df=trips_df, calendar_df=calendar_df,
+            calendar_dates_df=calendar_dates_df, day=day,
+            calendar_dates_lookup=calendar_dates_lookup)}
+    stop_times_df = utils_format._read_gtfs_file(
+        textfile_path=os.path.join(gtfsfeed_path, folder),
+        textfile='stop_times.txt',
+        column_projection=column_projection,
+        append_definitions=append_definitions,
+        row_filter=row_filter)
+    # the agency and route type of stops are assigned using the trips of
+    # all days so that they do not depend on the day that is read
+    stop_trips_df = None
+    if day is not None:
+        stop_trips_df = _stop_trip_pairs(
+            textfile_path=os.path.join(gtfsfeed_path, folder),
+            trips_df=trips_df)
+
+    for textfile in optional_gtfsfiles:
+        if textfile == 'agency.txt':
+            if textfile in textfilelist:
+                agency_df = utils_format._read_gtfs_file(
+                    textfile_path=os.path.join(gtfsfeed_path, folder),
+                    textfile=textfile)
+            else:
+                agency_df = pd.DataFrame()
+
+    stops_df, routes_df, trips_df, stop_times_df, calendar_df, \
+        calendar_dates_df = utils_format._add_unique_agencyid(
+            agency_df=agency_df,
+            stops_df=stops_df,
+            routes_df=routes_df,
+            trips_df=trips_df,
+            stop_times_df=stop_times_df,
+            calendar_df=calendar_df,
+            calendar_dates_df=calendar_dates_df,
+            feed_folder=os.path.join(gtfsfeed_path, folder),
+            nulls_as_folder=True,
+            stop_trips_df=stop_trips_df)
+
+    stops_df, routes_df, trips_df, stop_times_df, calendar_df, \
+        calendar_dates_df = utils_format._add_unique_gtfsfeed_id(
+            stops_df=stops_df,
+            routes_df=routes_df,
+            trips_df=trips_df,
+            stop_times_df=stop_times_df,
+            calendar_df=calendar_df,
+            calendar_dates_df=calendar_dates_df,
+            feed_folder=folder,
+            feed_number=feed_number)
+
+    if validation:
+        stops_df = utils_validation._validate_gtfs(
+            stops_df=stops_df,
+            feed_folder=os.path.join(gtfsfeed_path, folder),
+            verbose=verbose,
+            bbox=bbox,
+            remove_stops_outsidebbox=remove_stops_outsidebbox)
+        if remove_stops_outsidebbox:
+            stops_inside_bbox = list(stops_df['stop_id'])
+            stop_times_df = stop_times_df[stop_times_df['stop_id'].isin(
+                stops_inside_bbox)]
+
+    stops_df, stop_times_df = utils_format._append_route_types(
+        stops_df=stops_df,
+        stop_times_df=stop_times_df,
+        routes_df=routes_df[['route_id', 'route_type']],
+        trips_df=trips_df[['trip_id', 'route_id']],
+        stop_trips_df=stop_trips_df)
+
+    return (stops_df, routes_df, trips_df, stop_times_df, calendar_df,
+            calendar_dates_df)
+
+
+def _service_day_trip_ids(trips_df, calendar_df, calendar_dates_df, day,
+                          calendar_dates_lookup=None):
+    """
+    Select the IDs of trips in a single GTFS feed that run on a day of the
+    week in calendar or that match the calendar_dates_lookup search
+    parameters in calendar_dates. The selection matches the trips that
+    create_transit_net will select for the same parameters.
+
+    Parameters
+    ----------
+    trips_df : pandas.DataFrame
+        trips DataFrame
+    calendar_df : pandas.DataFrame
+        calendar DataFrame
+    calendar_dates_df : pandas.DataFrame
+        calendar_dates DataFrame
+    day : {'monday', 'tuesday', 'wednesday', 'thursday',
+    'friday', 'saturday', 'sunday'}
+        day of the week to select trips for
+    calendar_dates_lookup : dict, optional
+        dictionary of the lookup column (key) as a string and corresponding
+        string (value) as string or list of strings to use to select
+        additional trips using the calendar_dates table
+
+    Returns
+    -------
+    trip_ids : pandas.Index
+    """
+    service_ids = []
+    if not calendar_df.empty:
+        service_ids.append(
+            calendar_df.loc[calendar_df[day] == 1, 'service_id'])
+    if calendar_dates_lookup is not None and not calendar_dates_df.empty:
+        for col_name_key, string_value in calendar_dates_lookup.items():
+            # other feeds may have the column, gtfsfeed_to_df raises an
+            # error if no feed has it
+            if col_name_key not in calendar_dates_df.columns:
+                log('     Column: {} not found in calendar_dates DataFrame '
+                    'of this feed. It will not be used to select trips for '
+                    'this feed.'.format(col_name_key), level=lg.WARNING)
+                continue
+            if not isinstance(string_value, list):
+                string_value = [string_value]
+            for text in string_value:
+                service_ids.append(calendar_dates_df.loc[
+                    calendar_dates_df[col_name_key].astype(str).str.match(
+                        text, case=False, na=False), 'service_id'])
+
+    if service_ids:
+        service_ids = pd.concat(service_ids).unique()
+    trip_ids = pd.Index(trips_df.loc[
+        trips_df['service_id'].isin(service_ids), 'trip_id'].unique())
+
+    log('     {:,} of {:,} trip(s) run on day: {}{}.'.format(
+        len(trip_ids), len(trips_df), day,
+        '' if calendar_dates_lookup is None else
+        ' or match calendar_dates_lookup: {}'.format(calendar_dates_lookup)))
+
+    return trip_ids
+
+
+def _stop_trip_pairs(textfile_path, trips_df, chunksize=500000):
+    """
+    Read the stop and trip ID pairs of all records in a GTFS feed's
+    stop_times.txt file in chunks keeping the first trip of each stop and
+    route pair
+
+    Parameters
+    ----------
+    textfile_path : str
+        directory of the stop_times.txt file
+    trips_df : pandas.DataFrame
+        trips DataFrame used to look up the route of each trip
+    chunksize : int, optional
+        number of records to read at a time
+
+    Returns
+    -------
+    stop_trips_df : pandas.DataFrame
+        DataFrame of stop_id and trip_id pairs in the order they first
+        appear in stop_times.txt
+    """
+    route_lookup = trips_df.drop_duplicates(
+        subset='trip_id', keep='first').set_index('trip_id')['route_id']
+    pair_cols = ['stop_id', 'trip_id']
+
+    chunk_list = []
+    reader = pd.read_csv(
+        os.path.join(textfile_path, 'stop_times.txt'), dtype=object,
+        usecols=lambda col: col.strip() in pair_cols, chunksize=chunksize)
+    for chunk in reader:
+        chunk.rename(columns=lambda x: x.strip(), inplace=True)
+        for col in pair_cols:
+            chunk[col] = chunk[col].str.strip()
+        chunk['route_id'] = chunk['trip_id'].map(route_lookup)
+        chunk_list.append(chunk.drop_duplicates(
+            subset=['stop_id', 'route_id'], keep='first'))
+
+    stop_trips_df = pd.concat(chunk_list, ignore_index=True)
+    stop_trips_df = stop_trips_df.drop_duplicates(
+        subset=['stop_id', 'route_id'], keep='first')
+    return stop_trips_df[pair_cols].reset_index(drop=True)
+
+
+_FEED_CACHE_TABLES = ['stops', 'routes', 'trips', 'stop_times', 'calendar',
+                      'calendar_dates']
+
+
+def _feed_cache_key(feed_path, textfilelist, feed_number, params):
+    """
+    Create the key of a GTFS feed in the processed feed cache as a hash of
+    the content of the feed's text files and of the parameters used to
+    process the feed
+
+    Parameters
+    ----------
+    feed_path : str
+        path to the GTFS feed text files
+    textfilelist : list
+        list of the GTFS text file names in feed_path
+    feed_number : int
+        number of the feed used to create its unique_feed_id
+    params : dict
+        dictionary of the gtfsfeed_to_df parameters used to process the feed
+
+    Returns
+    -------
+    cache_key : str
+    """
+    # imported here as urbanaccess/__init__.py imports this module before
+    # __version__ is defined
+    from urbanaccess import __version__
+
+    sha256 = hashlib.sha256()
+    sha256.update(json.dumps(
+        {'params': params, 'feed_number': feed_number,
+         'feed_folder': os.path.split(feed_path)[1],
+         'version': __version__},
+        sort_keys=True, default=str).encode('utf-8'))
+    for textfile in sorted(textfilelist):
+        sha256.update(textfile.encode('utf-8'))
+        with open(os.path.join(feed_path, textfile), 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _read_feed_cache(cache_path, cache_key):
+    """
+    Read the processed DataFrames of a GTFS feed from the processed feed
+    cache if the cache exists and was created with the same cache key
+
+    Parameters
+    ----------
+    cache_path : str
+        path to the feed's HDF5 cache file
+    cache_key : str
+        cache key of the feed from _feed_cache_key
+
+    Returns
+    -------
+    feed_dfs : tuple
+        stops, routes, trips, stop_times, calendar and calendar_dates
+        DataFrames of the feed or None if the feed is not in the cache or
+        it has changed
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with pd.HDFStore(cache_path, mode='r') as store:
+            if store.get('cache_key').iloc[0] != cache_key:
+                log('     Feed has changed since it was cached. Cache: {} '
+                    'will be updated.'.format(cache_path))
+                return None
+            feed_dfs = tuple(store.get(table) for table in
+                             _FEED_CACHE_TABLES)
+    except Exception:
+        log('     Unable to read cache: {}. Cache will be '
+            'updated.'.format(cache_path), level=lg.WARNING)
+        return None
+    log('     Feed has not changed. Processed feed read from cache: '
+        '{}'.format(cache_path))
+    return feed_dfs
+
+
+def _write_feed_cache(cache_path, cache_key, feed_dfs):
+    """
+    Write the processed DataFrames of a GTFS feed to the processed feed
+    cache
+
+    Parameters
+    ----------
+    cache_path : str
+        path to the feed's HDF5 cache file
+    cache_key : str
+        cache key of the feed from _feed_cache_key
+    feed_dfs : tuple
+        stops, routes, trips, stop_times, calendar and calendar_dates
+        DataFrames of the feed
+
+    Returns
+    -------
+    nothing
+    """
+    # the file is written to a temporary path first so that an interrupted
+    # write does not leave a partial cache. 'fixed' format is used to
+    # round trip object columns with mixed types as they were read
+    tmp_path = '{}.part'.format(cache_path)
+    with pd.HDFStore(tmp_path, mode='w') as store:
+        for table, df in zip(_FEED_CACHE_TABLES, feed_dfs):
+            store.put(table, df, format='fixed')
+        store.put('cache_key', pd.Series([cache_key]), format='fixed')
+    _replace(tmp_path, cache_path)
+    log('     Processed feed written to cache: {}'.format(cache_path))
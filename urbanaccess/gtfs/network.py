@@ -1,5 +1,8 @@
 from __future__ import division
 import os
+import shutil
+import tempfile
+import numpy as np
 import pandas as pd
 import time
 from datetime import datetime, timedelta
@@ -7,6 +10,8 @@ import logging as lg
 
 from urbanaccess.utils import log, df_to_hdf5, hdf5_to_df
 from urbanaccess.gtfs.utils_validation import _check_time_range_format
+from urbanaccess.gtfs.utils_format import _timetoseconds, _trip_codes, \
+    _is_trip_sorted, _sort_stop_times
 from urbanaccess.network import ua_network
 from urbanaccess import config
 from urbanaccess.gtfs.gtfsfeeds_dataframe import gtfsfeeds_dfs, \
@@ -14,6 +19,27 @@ from urbanaccess.gtfs.gtfsfeeds_dataframe import gtfsfeeds_dfs, \
 
 pd.options.mode.chained_assignment = None
 
+# route type multiplier parameter names used in edge impedance functions
+# and the GTFS route type they apply to, the single lookup used by both
+# edge_impedance_by_route_type and edge_impedance_scenarios
+_ROUTE_TYPE_MULTIPLIER_PARAMS = {'street_level_rail': 0,
+                                 'underground_rail': 1,
+                                 'intercity_rail': 2,
+                                 'bus': 3,
+                                 'ferry': 4,
+                                 'cable_car': 5,
+                                 'gondola': 6,
+                                 'funicular': 7,
+                                 'trolleybus': 11,
+                                 'monorail': 12}
+
+# approximate ratio of peak memory used while processing a partition of
+# stop times to the in-memory size of the partition, used to size partitions
+# in chunked mode. Interpolation, time difference, time window selection and
+# edge formatting were measured to allocate a peak of about 1.7 times the
+# deep memory usage of the partition, plus the partition read from disk
+_CHUNK_MEMORY_FACTOR = 3
+
 
 def create_transit_net(
         gtfsfeeds_dfs,
@@ -26,7 +52,9 @@ def create_transit_net(
         save_dir=config.settings.data_folder,
         save_filename=None,
         timerange_pad=None,
-        time_aware=False):
+        time_aware=False,
+        trip_attributes=None,
+        memory_budget=None):
     """
     Create a travel time weight network graph in units of
     minutes from GTFS data
@@ -69,7 +97,9 @@ def create_transit_net(
         if true, all processed GTFS DataFrames will
         be stored to disk in a HDF5 file
     save_dir : str, optional
-        directory to save the HDF5 file
+        directory to save the HDF5 file. In chunked mode the temporary HDF5
+        file of stop time and edge partitions is also created in this
+        directory
     save_filename : str, optional
         name to save the HDF5 file as
     timerange_pad: str, optional
@@ -79,10 +109,31 @@ def create_transit_net(
         '02:30:00' for a 2 hour and 30 minute pad.
     time_aware: bool, optional
         boolean to indicate whether the transit network should include
-        time information. If True, 'arrival_time' and 'departure_time' columns
-        from the stop_times table will be included in the transit edge table
-        where 'departure_time' is the departure time at node_id_from stop and
-        'arrival_time' is the arrival time at node_id_to stop
+        time information. If True, 'departure_time_sec' and
+        'arrival_time_sec' columns will be included in the transit edge table
+        as integer seconds past midnight where 'departure_time_sec' is the
+        departure time at node_id_from stop and 'arrival_time_sec' is the
+        arrival time at node_id_to stop. Use format_edge_times() to
+        add 24 hour clock formatted times for display
+    trip_attributes : list, optional
+        list of additional trip or route attribute column names from the
+        trips or routes DataFrames to append to the transit edge table such
+        as: ['direction_id', 'service_id', 'shape_id']. The 'unique_route_id'
+        and 'route_type' columns are always appended
+    memory_budget : int or float, optional
+        if specified, the transit network is created in chunked mode where
+        stop_times is partitioned by trip into an HDF5 file in a temporary
+        directory in save_dir and stop time interpolation, time difference,
+        time window selection and edge formatting are run one partition at
+        a time with the resulting edges appended to the same HDF5 file.
+        Value is the approximate memory budget in megabytes for the whole
+        run: the stop_times and trips DataFrames that stay in memory are
+        subtracted from it and the remainder is used to size each
+        partition. A warning is logged if the resulting edge table does not
+        fit in the budget when it is read back. In chunked mode the
+        stop_times_int DataFrame is not retained in the gtfsfeeds_dfs
+        object. The temporary directory is removed once the transit
+        network has been created
 
     Returns
     -------
@@ -115,9 +166,19 @@ def create_transit_net(
         raise ValueError('timerange_pad must be string.')
     if not isinstance(time_aware, bool):
         raise ValueError('time_aware must be bool.')
+    if trip_attributes is not None and not isinstance(trip_attributes, list):
+        raise ValueError('trip_attributes must be a list.')
     if overwrite_existing_stop_times_int and use_existing_stop_times_int:
         raise ValueError('overwrite_existing_stop_times_int and '
                          'use_existing_stop_times_int cannot both be True.')
+    if memory_budget is not None:
+        if not isinstance(memory_budget, (int, float)) or \
+                isinstance(memory_budget, bool) or memory_budget <= 0:
+            raise ValueError('memory_budget must be a positive number.')
+        if use_existing_stop_times_int or save_processed_gtfs:
+            raise ValueError('use_existing_stop_times_int and '
+                             'save_processed_gtfs cannot be True when '
+                             'memory_budget is specified.')
 
     columns = ['route_id',
                'direction_id',
@@ -138,36 +199,48 @@ def create_transit_net(
         day=day,
         calendar_dates_lookup=calendar_dates_lookup)
 
-    # proceed to calc stop_times_int if stop_times_int is already empty, or
-    # overwrite existing is True, or use existing is False
-    if gtfsfeeds_dfs.stop_times_int.empty or \
-            overwrite_existing_stop_times_int or use_existing_stop_times_int \
-            is False:
-        if overwrite_existing_stop_times_int:
-            log('   Overwriting existing stop_times_int DataFrame...')
-        gtfsfeeds_dfs.stop_times_int = _interpolate_stop_times(
-            stop_times_df=gtfsfeeds_dfs.stop_times,
-            calendar_selected_trips_df=calendar_selected_trips_df)
-
-        gtfsfeeds_dfs.stop_times_int = _time_difference(
-            stop_times_df=gtfsfeeds_dfs.stop_times_int)
-
-        if save_processed_gtfs:
-            save_processed_gtfs_data(gtfsfeeds_dfs=gtfsfeeds_dfs,
-                                     dir=save_dir, filename=save_filename)
-
-    if use_existing_stop_times_int:
-        log('   Using existing stop_times_int DataFrame...')
-
-    selected_interpolated_stop_times_df = _time_selector(
-        df=gtfsfeeds_dfs.stop_times_int,
-        starttime=timerange[0],
-        endtime=timerange[1],
-        timerange_pad=timerange_pad)
-
-    final_edge_table = _format_transit_net_edge(
-        stop_times_df=selected_interpolated_stop_times_df,
-        time_aware=time_aware)
+    if memory_budget is not None:
+        final_edge_table, selected_interpolated_stop_times_df = \
+            _create_transit_edges_chunked(
+                stop_times_df=gtfsfeeds_dfs.stop_times,
+                calendar_selected_trips_df=calendar_selected_trips_df,
+                timerange=timerange,
+                timerange_pad=timerange_pad,
+                time_aware=time_aware,
+                memory_budget=memory_budget,
+                save_dir=save_dir)
+    else:
+        # proceed to calc stop_times_int if stop_times_int is already empty,
+        # or overwrite existing is True, or use existing is False
+        if gtfsfeeds_dfs.stop_times_int.empty or \
+                overwrite_existing_stop_times_int or \
+                use_existing_stop_times_int is False:
+            if overwrite_existing_stop_times_int:
+                log('   Overwriting existing stop_times_int DataFrame...')
+            gtfsfeeds_dfs.stop_times_int = _interpolate_stop_times(
+                stop_times_df=gtfsfeeds_dfs.stop_times,
+                calendar_selected_trips_df=calendar_selected_trips_df)
+
+            gtfsfeeds_dfs.stop_times_int = _time_difference(
+                stop_times_df=gtfsfeeds_dfs.stop_times_int)
+
+            if save_processed_gtfs:
+                save_processed_gtfs_data(
+                    gtfsfeeds_dfs=gtfsfeeds_dfs, dir=save_dir,
+                    filename=save_filename)
+
+        if use_existing_stop_times_int:
+            log('   Using existing stop_times_int DataFrame...')
+
+        selected_interpolated_stop_times_df = _time_selector(
+            df=gtfsfeeds_dfs.stop_times_int,
+            starttime=timerange[0],
+            endtime=timerange[1],
+            timerange_pad=timerange_pad)
+
+        final_edge_table = _format_transit_net_edge(
+            stop_times_df=selected_interpolated_stop_times_df,
+            time_aware=time_aware)
 
     transit_edges = _convert_imp_time_units(
         df=final_edge_table, time_col='weight', convert_to='minutes')
@@ -178,11 +251,13 @@ def create_transit_net(
 
     transit_nodes = _format_transit_net_nodes(df=final_selected_stops)
 
-    transit_edges = _route_type_to_edge(
-        transit_edge_df=transit_edges, stop_time_df=gtfsfeeds_dfs.stop_times)
-
-    transit_edges = _route_id_to_edge(
-        transit_edge_df=transit_edges, trips_df=gtfsfeeds_dfs.trips)
+    edge_attributes = ['unique_route_id', 'route_type']
+    if trip_attributes is not None:
+        edge_attributes.extend(
+            [col for col in trip_attributes if col not in edge_attributes])
+    transit_edges = _trip_attributes_to_edge(
+        transit_edge_df=transit_edges, trips_df=gtfsfeeds_dfs.trips,
+        routes_df=gtfsfeeds_dfs.routes, columns=edge_attributes)
 
     # assign node and edge net type
     transit_nodes['net_type'] = 'transit'
@@ -510,8 +585,7 @@ def _interpolate_stop_times(stop_times_df, calendar_selected_trips_df):
              stop_times_df['stop_sequence'].isnull().sum()),
             level=lg.WARNING)
 
-    stop_times_df.sort_values(by=['unique_trip_id', 'stop_sequence'],
-                              inplace=True)
+    stop_times_df = _sort_stop_times(stop_times_df)
     # make list of unique trip IDs from the calendar_selected_trips_df
     uniquetriplist = calendar_selected_trips_df[
         'unique_trip_id'].unique().tolist()
@@ -710,9 +784,18 @@ def _time_difference(stop_times_df):
     """
     start_time = time.time()
 
-    # calculate difference between consecutive records grouping by trip ID
-    stop_times_df['timediff'] = stop_times_df.groupby('unique_trip_id')[
-        'departure_time_sec_interpolate'].diff()
+    # calculate difference between consecutive records grouping by trip ID,
+    # when stop times are sorted by trip and stop sequence a single
+    # difference over the whole column is taken and the first record of
+    # each trip is masked
+    trip_codes = _trip_codes(stop_times_df)
+    if _is_trip_sorted(stop_times_df, trip_codes=trip_codes):
+        timediff = stop_times_df['departure_time_sec_interpolate'].diff()
+        timediff[np.r_[True, trip_codes[1:] != trip_codes[:-1]]] = np.nan
+        stop_times_df['timediff'] = timediff
+    else:
+        stop_times_df['timediff'] = stop_times_df.groupby('unique_trip_id')[
+            'departure_time_sec_interpolate'].diff()
     log('Difference between stop times has been successfully calculated. '
         'Took {:,.2f} seconds.'.format(time.time() - start_time))
 
@@ -820,10 +903,12 @@ def _format_transit_net_edge(stop_times_df, time_aware=False):
         time and day
     time_aware: bool, optional
         boolean to indicate whether the transit network should include
-        time information. If True, 'arrival_time' and 'departure_time' columns
-        from the stop_times table will be included in the transit edge table
-        where 'departure_time' is the departure time at node_id_from stop and
-        'arrival_time' is the arrival time at node_id_to stop
+        time information. If True, 'departure_time_sec' and
+        'arrival_time_sec' columns will be included in the transit edge table
+        as integer seconds past midnight where 'departure_time_sec' is the
+        departure time at node_id_from stop and 'arrival_time_sec' is the
+        arrival time at node_id_to stop. Use format_edge_times() to
+        add 24 hour clock formatted times for display
 
     Returns
     -------
@@ -838,60 +923,65 @@ def _format_transit_net_edge(stop_times_df, time_aware=False):
     # subset to only columns needed for processing
     cols_of_interest = ['unique_trip_id', 'stop_id', 'unique_stop_id',
                         'timediff', 'stop_sequence', 'unique_agency_id',
-                        'trip_id', 'arrival_time', 'departure_time']
-    stop_times_df = stop_times_df[cols_of_interest]
-
-    # set columns for new df for data needed by Pandana for edges
-    merged_edge = []
-
-    stop_times_df.sort_values(by=['unique_trip_id', 'stop_sequence'],
-                              inplace=True)
-
+                        'trip_id']
     if time_aware:
         log('   time_aware is True, also adding arrival and departure '
             'stop times to edges...')
+        if 'arrival_time_sec' not in stop_times_df.columns:
+            stop_times_df = _timetoseconds(
+                df=stop_times_df.copy(), time_cols=['arrival_time'])
+        cols_of_interest.extend(
+            ['departure_time_sec_interpolate', 'arrival_time_sec'])
+    # keep the trip codes from sorting the stop times when interpolating
+    if 'trip_code' in stop_times_df.columns:
+        cols_of_interest.append('trip_code')
+    stop_times_df = stop_times_df[cols_of_interest]
 
-    for trip, tmp_trip_df in stop_times_df.groupby(['unique_trip_id']):
-        # if 'time_aware', also create arrival and departure time cols
-        if time_aware:
-            edge_df = pd.DataFrame({
-                "node_id_from": tmp_trip_df['unique_stop_id'].iloc[:-1].values,
-                "node_id_to": tmp_trip_df['unique_stop_id'].iloc[1:].values,
-                "weight": tmp_trip_df['timediff'].iloc[1:].values,
-                "unique_agency_id":
-                    tmp_trip_df['unique_agency_id'].iloc[1:].values,
-                # set unique trip ID without edge order to join other data
-                # later
-                "unique_trip_id": trip,
-                # departure_time at node_id_from stop
-                "departure_time":
-                    tmp_trip_df['departure_time'].iloc[:-1].values,
-                # arrival_time at node_id_to stop
-                "arrival_time":
-                    tmp_trip_df['arrival_time'].iloc[1:].values
-            })
-        else:
-            edge_df = pd.DataFrame({
-                "node_id_from": tmp_trip_df['unique_stop_id'].iloc[:-1].values,
-                "node_id_to": tmp_trip_df['unique_stop_id'].iloc[1:].values,
-                "weight": tmp_trip_df['timediff'].iloc[1:].values,
-                "unique_agency_id":
-                    tmp_trip_df['unique_agency_id'].iloc[1:].values,
-                # set unique trip ID without edge order to join other data
-                # later
-                "unique_trip_id": trip
-            })
-
-        # Set current trip ID to edge ID column adding edge order at
-        # end of string
-        edge_df['sequence'] = (edge_df.index + 1).astype(int)
-
-        # append completed formatted edge table to master edge table
-        merged_edge.append(edge_df)
-
-    merged_edge_df = pd.concat(merged_edge, ignore_index=True)
-    merged_edge_df['sequence'] = merged_edge_df['sequence'].astype(
-        int, copy=False)
+    if time_aware:
+        # stops without a scheduled arrival time arrive at their
+        # interpolated departure time
+        stop_times_df['arrival_time_sec'] = stop_times_df[
+            'arrival_time_sec'].fillna(
+            stop_times_df['departure_time_sec_interpolate']).astype('int64')
+        stop_times_df['departure_time_sec_interpolate'] = stop_times_df[
+            'departure_time_sec_interpolate'].astype('int64')
+
+    stop_times_df = _sort_stop_times(stop_times_df)
+
+    # build all edges at once from consecutive stop time records, records
+    # that are the last stop of one trip and the first stop of the next trip
+    # do not form an edge
+    trip_codes = _trip_codes(stop_times_df)
+    same_trip = trip_codes[1:] == trip_codes[:-1]
+    from_pos = np.flatnonzero(same_trip)
+    to_pos = from_pos + 1
+
+    def _values(col, positions):
+        return stop_times_df[col].to_numpy()[positions]
+
+    merged_edge_df = pd.DataFrame({
+        "node_id_from": _values('unique_stop_id', from_pos),
+        "node_id_to": _values('unique_stop_id', to_pos),
+        "weight": _values('timediff', to_pos),
+        "unique_agency_id": _values('unique_agency_id', to_pos),
+        # set unique trip ID without edge order to join other data later
+        "unique_trip_id": _values('unique_trip_id', from_pos)})
+    # if 'time_aware', also create arrival and departure time cols
+    if time_aware:
+        # departure time at node_id_from stop in seconds
+        merged_edge_df['departure_time_sec'] = _values(
+            'departure_time_sec_interpolate', from_pos)
+        # arrival time at node_id_to stop in seconds
+        merged_edge_df['arrival_time_sec'] = _values(
+            'arrival_time_sec', to_pos)
+
+    # set edge order within each trip starting at 1
+    edge_trip_codes = trip_codes[from_pos]
+    positions = np.arange(len(from_pos))
+    trip_start = np.r_[True, edge_trip_codes[1:] != edge_trip_codes[:-1]]
+    merged_edge_df['sequence'] = (
+        positions - np.maximum.accumulate(
+            np.where(trip_start, positions, 0)) + 1).astype(int)
     # create a unique sequential edge ID
     # TODO: consider changing col name to 'edge_id' for clarity
     merged_edge_df['id'] = (
@@ -904,6 +994,217 @@ def _format_transit_net_edge(stop_times_df, time_aware=False):
     return merged_edge_df
 
 
+def _create_transit_edges_chunked(stop_times_df, calendar_selected_trips_df,
+                                  timerange, timerange_pad, time_aware,
+                                  memory_budget, save_dir):
+    """
+    Create the transit edge table out-of-core by writing stop times
+    partitioned by trip to an HDF5 file in a temporary directory and
+    running stop time interpolation, time difference, time window selection
+    and edge formatting one partition at a time with the resulting edges
+    appended to the same HDF5 file
+
+    Parameters
+    ----------
+    stop_times_df : pandas.DataFrame
+        stop times DataFrame
+    calendar_selected_trips_df : pandas.DataFrame
+        DataFrame of trips that run on specific day
+    timerange : list
+        time range to extract transit schedule from in a list with time
+        1 and time 2 as strings
+    timerange_pad: str
+        string indicating the number of hours minutes seconds to pad after the
+        end of the time interval specified in 'timerange'
+    time_aware: bool
+        boolean to indicate whether the transit network should include
+        time information
+    memory_budget : int or float
+        approximate memory budget in megabytes for the run including the
+        stop_times and trips DataFrames that are held in memory
+    save_dir : str
+        directory to create the temporary directory of the HDF5 file in.
+        The temporary directory is removed once the edge table is created
+
+    Returns
+    -------
+    edge_df : pandas.DataFrame
+    selected_stops_df : pandas.DataFrame
+        DataFrame with the unique_stop_id of all stops in the selected
+        stop times
+    """
+    start_time = time.time()
+
+    calendar_selected_trips_df['unique_trip_id'] = (
+        calendar_selected_trips_df['trip_id'].str.cat(
+            calendar_selected_trips_df['unique_agency_id'].astype('str'),
+            sep='_'))
+    unique_trip_ids = stop_times_df['trip_id'].str.cat(
+        stop_times_df['unique_agency_id'].astype('str'), sep='_')
+    in_schedule = unique_trip_ids.isin(
+        calendar_selected_trips_df['unique_trip_id']).values
+    if not in_schedule.any():
+        raise ValueError('No matching trip_ids where found. Suggest checking '
+                         'for differences between trip_id values in '
+                         'stop_times and trips GTFS files.')
+    unique_trip_ids = unique_trip_ids[in_schedule]
+
+    # the stop_times and trips DataFrames stay in memory for the whole run,
+    # the rest of the budget is used to size partitions so the
+    # interpolation and edge formatting intermediates of a partition fit in
+    # it, whole trips are always kept in the same partition
+    budget_bytes = memory_budget * 1e6
+    resident_bytes = (stop_times_df.memory_usage(deep=True).sum() +
+                      calendar_selected_trips_df.memory_usage(deep=True).sum())
+    if resident_bytes >= budget_bytes:
+        raise ValueError(
+            'memory_budget of {:,} MB is smaller than the {:,.2f} MB used by '
+            'the stop_times and trips DataFrames.'.format(
+                memory_budget, resident_bytes / 1e6))
+    row_bytes = stop_times_df.memory_usage(deep=True).sum() / max(
+        len(stop_times_df), 1)
+    rows_per_partition = max(int(
+        (budget_bytes - resident_bytes) /
+        (row_bytes * _CHUNK_MEMORY_FACTOR)), 1)
+    trip_counts = unique_trip_ids.value_counts(sort=False).sort_index()
+    trip_partition = pd.Series(
+        (trip_counts.cumsum().values - trip_counts.values) //
+        rows_per_partition, index=trip_counts.index)
+    row_partition = trip_partition.reindex(unique_trip_ids.values).values
+    del unique_trip_ids
+    partition_ids = np.unique(row_partition)
+
+    log('Creating transit edges in chunked mode with a memory budget of '
+        '{:,} MB: {:,} stop time records in {:,} trips were split into {:,} '
+        'partition(s)...'.format(memory_budget, len(row_partition),
+                                 len(trip_counts), len(partition_ids)))
+
+    trips_by_partition = calendar_selected_trips_df.groupby(
+        calendar_selected_trips_df['unique_trip_id'].map(
+            trip_partition)).indices
+    order = np.argsort(row_partition, kind='stable')
+    bounds = np.searchsorted(row_partition[order], partition_ids)
+    bounds = np.append(bounds, len(order))
+    positions = np.flatnonzero(in_schedule)
+
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+    # each run uses its own directory so runs that share a save_dir do not
+    # overwrite each other's file
+    store_dir = tempfile.mkdtemp(prefix='transit_net_chunks_', dir=save_dir)
+    store_path = os.path.join(store_dir, 'transit_net_chunks.h5')
+    edge_keys = []
+    edge_bytes = 0
+    selected_stop_ids = []
+    try:
+        with pd.HDFStore(store_path, mode='w') as store:
+            for i, partition_id in enumerate(partition_ids):
+                store.put('stop_times/part_{}'.format(i),
+                          stop_times_df.iloc[
+                              positions[order[bounds[i]:bounds[i + 1]]]],
+                          format='table')
+            del order, positions
+
+            for i, partition_id in enumerate(partition_ids):
+                log('Processing partition {:,} of {:,}...'.format(
+                    i + 1, len(partition_ids)))
+                stop_times_int = _interpolate_stop_times(
+                    stop_times_df=store['stop_times/part_{}'.format(i)],
+                    calendar_selected_trips_df=calendar_selected_trips_df.iloc[
+                        trips_by_partition[partition_id]].copy())
+                stop_times_int = _time_difference(
+                    stop_times_df=stop_times_int)
+                selected_stop_times = _time_selector(
+                    df=stop_times_int,
+                    starttime=timerange[0],
+                    endtime=timerange[1],
+                    timerange_pad=timerange_pad)
+                del stop_times_int
+                if selected_stop_times.empty:
+                    continue
+                selected_stop_ids.append(
+                    selected_stop_times['unique_stop_id'].unique())
+                edge_part = _format_transit_net_edge(
+                    stop_times_df=selected_stop_times,
+                    time_aware=time_aware)
+                del selected_stop_times
+                key = 'transit_edges/part_{}'.format(i)
+                store.put(key, edge_part, format='table')
+                edge_keys.append(key)
+                edge_bytes += edge_part.memory_usage(deep=True).sum()
+                del edge_part
+
+            if not edge_keys:
+                raise ValueError('No stop times were found in the time range '
+                                 'specified: {}.'.format(timerange))
+            # the edge partitions and the edge table are both held in memory
+            # while the edge table is read back
+            if resident_bytes + 2 * edge_bytes > budget_bytes:
+                log('The {:,.2f} MB transit edge table does not fit in the '
+                    'memory budget of {:,} MB with the stop_times and trips '
+                    'DataFrames. It is read into memory anyway as it is '
+                    'returned.'.format(edge_bytes / 1e6, memory_budget),
+                    level=lg.WARNING)
+            edge_df = pd.concat([store[key] for key in edge_keys],
+                                ignore_index=True)
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    selected_stops_df = pd.DataFrame(
+        {'unique_stop_id': np.unique(np.concatenate(selected_stop_ids))})
+
+    log('Chunked transit edge creation completed. {:,} edges created from '
+        '{:,} partition(s). Took {:,.2f} seconds.'.format(
+         len(edge_df), len(partition_ids), time.time() - start_time))
+
+    return edge_df, selected_stops_df
+
+
+def format_edge_times(transit_edge_df, time_cols=None):
+    """
+    Format the seconds past midnight time columns of a time aware transit
+    edge table as 24 hour clock strings for display. The formatted columns
+    are named after the time columns without the '_sec' suffix
+
+    Parameters
+    ----------
+    transit_edge_df : pandas.DataFrame
+        transit edge DataFrame created with time_aware set to True
+    time_cols : list, optional
+        list of seconds past midnight columns to format. Default is
+        ['departure_time_sec', 'arrival_time_sec']
+
+    Returns
+    -------
+    transit_edge_df : pandas.DataFrame
+        copy of transit_edge_df with the 24 hour clock formatted columns
+    """
+    if time_cols is None:
+        time_cols = ['departure_time_sec', 'arrival_time_sec']
+    if not isinstance(time_cols, list):
+        raise ValueError('time_cols must be a list.')
+    missing_cols = [col for col in time_cols
+                    if col not in transit_edge_df.columns]
+    if missing_cols:
+        raise ValueError('Column(s): {} were not found in transit_edge_df. '
+                         'The transit network must be created with '
+                         'time_aware set to True.'.format(missing_cols))
+
+    transit_edge_df = transit_edge_df.copy()
+    for col in time_cols:
+        seconds = transit_edge_df[col]
+        has_time = seconds.notnull()
+        seconds = seconds[has_time].astype('int64')
+        formatted = (
+            (seconds // 3600).astype(str).str.zfill(2) + ':' +
+            (seconds % 3600 // 60).astype(str).str.zfill(2) + ':' +
+            (seconds % 60).astype(str).str.zfill(2))
+        transit_edge_df[col[:-4] if col.endswith('_sec') else col] = \
+            formatted.reindex(transit_edge_df.index)
+
+    return transit_edge_df
+
+
 def _convert_imp_time_units(df, time_col='weight', convert_to='minutes'):
     """
     Convert the travel time impedance units
@@ -1023,44 +1324,108 @@ def _format_transit_net_nodes(df):
     return final_node_df
 
 
-def _route_type_to_edge(transit_edge_df, stop_time_df):
+def _trip_attributes_to_edge(transit_edge_df, trips_df, routes_df,
+                             columns=None):
     """
-    Append route type information to transit edge table
+    Append trip and route attributes to transit edge table in a single join
+    using a trip level look up table
 
     Parameters
     ----------
     transit_edge_df : pandas.DataFrame
         transit edge DataFrame
-    stop_time_df : pandas.DataFrame
-        stop time DataFrame
+    trips_df : pandas.DataFrame
+        trips DataFrame
+    routes_df : pandas.DataFrame
+        routes DataFrame
+    columns : list, optional
+        list of attribute column names to append. Columns can be
+        'unique_route_id' or any column in trips_df or routes_df such as:
+        'route_id', 'route_type', 'direction_id', 'service_id', 'shape_id'
+        or 'agency_id'. If None, defaults to: ['unique_route_id',
+        'route_type']. Existing columns with the same name in
+        transit_edge_df will be replaced
 
     Returns
     -------
-    transit_edge_df_w_routetype : pandas.DataFrame
+    transit_edge_df_w_attributes : pandas.DataFrame
 
     """
     start_time = time.time()
 
-    # create unique trip IDs
-    stop_time_df['unique_trip_id'] = (
-        stop_time_df['trip_id'].str.cat(
-            stop_time_df['unique_agency_id'].astype('str'), sep='_'))
-
-    # join route_id to the edge table
-    merged_df = pd.merge(
-        transit_edge_df, stop_time_df[['unique_trip_id', 'route_type']],
-        how='left', on='unique_trip_id', sort=False, copy=False)
-    merged_df.drop_duplicates(
-        subset='unique_trip_id', keep='first', inplace=True)
-    # need to get unique records here to have a one to one join -
-    # this serves as the look up table
-    # join the look up table created above to the table of interest
-    transit_edge_df_w_routetype = pd.merge(
-        transit_edge_df, merged_df[['route_type', 'unique_trip_id']],
-        how='left', on='unique_trip_id', sort=False, copy=False)
-
-    log('Route type successfully joined to transit edges. '
-        'Took {:,.2f} seconds.'.format(time.time() - start_time))
+    if columns is None:
+        columns = ['unique_route_id', 'route_type']
+    if not isinstance(columns, list):
+        raise ValueError('columns must be a list.')
+    trip_key_cols = ['trip_id', 'unique_agency_id']
+    route_cols = []
+    for col in columns:
+        if col == 'unique_route_id' or col in trip_key_cols or \
+                col in trips_df.columns:
+            continue
+        if col in routes_df.columns:
+            route_cols.append(col)
+        else:
+            raise ValueError('Column: {} was not found in trips or routes '
+                             'DataFrames.'.format(col))
+
+    agency_ids = trips_df['unique_agency_id'].astype('str')
+    trip_ids = trips_df['trip_id'].astype('str').str.cat(agency_ids, sep='_')
+    trip_route_ids = trips_df['route_id'].astype('str').str.cat(
+        agency_ids, sep='_')
+
+    # trip level look up table of all requested attributes
+    trip_lookup = pd.DataFrame(index=trip_ids.values)
+    for col in columns:
+        if col == 'unique_route_id':
+            trip_lookup[col] = trip_route_ids.values
+        elif col in trips_df.columns and col not in route_cols:
+            trip_lookup[col] = trips_df[col].values
+    if route_cols:
+        route_lookup = routes_df[route_cols].copy()
+        route_lookup.index = routes_df['route_id'].astype('str').str.cat(
+            routes_df['unique_agency_id'].astype('str'), sep='_').values
+        route_lookup = route_lookup[
+            ~route_lookup.index.duplicated(keep='first')]
+        route_lookup = route_lookup.reindex(trip_route_ids.values)
+        for col in route_cols:
+            trip_lookup[col] = route_lookup[col].values
+    trip_lookup = trip_lookup[~trip_lookup.index.duplicated(keep='first')]
+
+    # attach all attributes to the edges with one indexed look up
+    edge_attributes = trip_lookup.reindex(
+        transit_edge_df['unique_trip_id'].values)
+    transit_edge_df_w_attributes = transit_edge_df
+    for col in columns:
+        transit_edge_df_w_attributes[col] = edge_attributes[col].values
+
+    log('Trip attribute(s): {} successfully joined to transit edges. '
+        'Took {:,.2f} seconds.'.format(columns, time.time() - start_time))
+
+    return transit_edge_df_w_attributes
+
+
+def _route_type_to_edge(transit_edge_df, trips_df, routes_df):
+    """
+    Append route type information to transit edge table
+
+    Parameters
+    ----------
+    transit_edge_df : pandas.DataFrame
+        transit edge DataFrame
+    trips_df : pandas.DataFrame
+        trips DataFrame
+    routes_df : pandas.DataFrame
+        routes DataFrame
+
+    Returns
+    -------
+    transit_edge_df_w_routetype : pandas.DataFrame
+
+    """
+    transit_edge_df_w_routetype = _trip_attributes_to_edge(
+        transit_edge_df=transit_edge_df, trips_df=trips_df,
+        routes_df=routes_df, columns=['route_type'])
 
     return transit_edge_df_w_routetype
 
@@ -1081,23 +1446,12 @@ def _route_id_to_edge(transit_edge_df, trips_df):
     transit_edge_df_with_routes : pandas.DataFrame
 
     """
-    start_time = time.time()
-
-    if 'unique_route_id' not in transit_edge_df.columns:
-        # create unique trip and route IDs
-        trips_df['unique_trip_id'] = (
-            trips_df['trip_id'].str.cat(
-                trips_df['unique_agency_id'].astype('str'), sep='_'))
-        trips_df['unique_route_id'] = (
-            trips_df['route_id'].str.cat(
-                trips_df['unique_agency_id'].astype('str'), sep='_'))
+    if 'unique_route_id' in transit_edge_df.columns:
+        return transit_edge_df
 
-        transit_edge_df_with_routes = pd.merge(
-            transit_edge_df, trips_df[['unique_trip_id', 'unique_route_id']],
-            how='left', on='unique_trip_id', sort=False, copy=False)
-
-    log('Route ID successfully joined to transit edges. '
-        'Took {:,.2f} seconds.'.format(time.time() - start_time))
+    transit_edge_df_with_routes = _trip_attributes_to_edge(
+        transit_edge_df=transit_edge_df, trips_df=trips_df,
+        routes_df=pd.DataFrame(), columns=['unique_route_id'])
 
     return transit_edge_df_with_routes
 
@@ -1114,7 +1468,8 @@ def edge_impedance_by_route_type(
         gondola=None,
         funicular=None,
         trolleybus=None,
-        monorail=None):
+        monorail=None,
+        multiplier_table=None):
     """
     Penalize transit edge travel time based on transit mode type
 
@@ -1145,6 +1500,12 @@ def edge_impedance_by_route_type(
         factor between -1 to 1 to multiply against travel time
     monorail : float, optional
         factor between -1 to 1 to multiply against travel time
+    multiplier_table : pandas.DataFrame, optional
+        DataFrame of per route or per agency factors with a 'multiplier'
+        column and either a 'unique_route_id' or 'unique_agency_id' column
+        that matches the same column in transit_edge_df. Factors in this
+        table take precedence over the route type factors for the edges
+        they match
 
     Returns
     -------
@@ -1164,73 +1525,225 @@ def edge_impedance_by_route_type(
                              'DataFrame and is required.'.format(col))
 
     # build route type lookup dict
-    route_type_dict = config._ROUTES_MODE_TYPE_LOOKUP.copy()
-    var_mode_id_lookup = {0: street_level_rail,
-                          1: underground_rail,
-                          2: intercity_rail,
-                          3: bus,
-                          4: ferry,
-                          5: cable_car,
-                          6: gondola,
-                          7: funicular,
-                          11: trolleybus,
-                          12: monorail}
+    route_type_desc = config._ROUTES_MODE_TYPE_LOOKUP.copy()
+    multiplier_params = {'street_level_rail': street_level_rail,
+                         'underground_rail': underground_rail,
+                         'intercity_rail': intercity_rail,
+                         'bus': bus,
+                         'ferry': ferry,
+                         'cable_car': cable_car,
+                         'gondola': gondola,
+                         'funicular': funicular,
+                         'trolleybus': trolleybus,
+                         'monorail': monorail}
+    var_mode_id_lookup = {
+        route_type: multiplier_params[name] for name, route_type in
+        _ROUTE_TYPE_MULTIPLIER_PARAMS.items()}
     # ensure consistency btw the keys in the config obj and the keys
     # used in this function in case changes are made in the config obj
-    if set(sorted(route_type_dict.keys())) != set(
-            sorted(var_mode_id_lookup.keys())):
-        ValueError('ROUTES_MODE_TYPE_LOOKUP keys do not match keys in '
-                   'var_mode_id_lookup. Keys must match.')
-    for key, value in route_type_dict.items():
-        route_type_dict[key] = {'name': value,
-                                'multiplier': var_mode_id_lookup[key]}
-
-    # create the dict to pass to value_counts()
-    route_type_desc = route_type_dict.copy()
-    for key, val in route_type_dict.items():
-        route_type_desc[key] = val['name']
+    if set(route_type_desc.keys()) != set(var_mode_id_lookup.keys()):
+        raise ValueError('ROUTES_MODE_TYPE_LOOKUP keys do not match keys in '
+                         'var_mode_id_lookup. Keys must match.')
+
+    route_type_multipliers = {}
+    for route_type, multiplier in var_mode_id_lookup.items():
+        if multiplier is None:
+            continue
+        if not isinstance(multiplier, float):
+            raise ValueError('One or more multiplier variables are not '
+                             'float.')
+        # warn if multiplier is not within optimal range
+        if not -1 <= multiplier <= 1:
+            log('WARNING: Multiplier value of: {} should be a '
+                'value between -1 and 1.'.format(multiplier),
+                level=lg.WARNING)
+        route_type_multipliers[route_type] = multiplier
+
+    table_key_col = None
+    if multiplier_table is not None:
+        table_key_col = _check_multiplier_table(multiplier_table,
+                                                transit_edge_df)
 
     # check count of records for each route type
+    route_type_cnts = transit_edge_df['route_type'].value_counts(
+        dropna=False)
     log('Route type distribution as percentage of transit mode:')
     summary_stat = transit_edge_df['route_type'].map(
         route_type_desc.get).value_counts(normalize=True, dropna=False) * 100
     log(summary_stat)
 
-    travel_time_col = transit_edge_df[travel_time_col_name]
+    # warn if route type is not found in DataFrame
+    for route_type, multiplier in route_type_multipliers.items():
+        if route_type not in route_type_cnts.index:
+            log('WARNING: Route type: {} with specified multiplier value '
+                'of: {} was not found in the specified edge '
+                'DataFrame.'.format(
+                    route_type_desc[route_type], multiplier),
+                level=lg.WARNING)
+
+    # build one multiplier per edge, edges without a multiplier are null
+    edge_multiplier = transit_edge_df['route_type'].map(
+        route_type_multipliers)
+    if table_key_col is not None:
+        table_multiplier = transit_edge_df[table_key_col].map(
+            multiplier_table.set_index(table_key_col)['multiplier'])
+        edge_multiplier = table_multiplier.fillna(edge_multiplier)
+
+    adjusted = edge_multiplier.notnull()
+    if adjusted.any():
+        travel_time_col = transit_edge_df[travel_time_col_name]
+        transit_edge_df[travel_time_col_name] = travel_time_col + (
+            travel_time_col * edge_multiplier.fillna(0))
+        for route_type, multiplier in route_type_multipliers.items():
+            if route_type in route_type_cnts.index:
+                log('Adjusted {} transit edge impedance based on mode '
+                    'type penalty coefficient: {}.'.format(
+                        route_type_desc[route_type], multiplier))
+        if table_key_col is not None:
+            log('Adjusted {:,} transit edge(s) impedance based on {} '
+                'penalty coefficients in multiplier_table.'.format(
+                    table_multiplier.notnull().sum(), table_key_col))
+
+    log('Transit edge impedance mode type penalty calculation complete.')
+    return transit_edge_df
+
+
+def edge_impedance_scenarios(
+        transit_edge_df,
+        scenarios,
+        travel_time_col_name='weight'):
+    """
+    Penalize transit edge travel time based on transit mode type for
+    multiple scenarios at once. Each scenario writes a travel time column
+    named: travel_time_col_name + '_s' + scenario number (for example:
+    weight_s1, weight_s2) so a single transit edge table can hold the
+    travel times of all scenarios without copying the table per scenario.
+
+    Parameters
+    ----------
+    transit_edge_df : pandas.DataFrame
+        transit edge DataFrame
+    scenarios : list
+        list of dicts, one per scenario, of route type multiplier factors
+        between -1 to 1 to multiply against travel time where keys are the
+        route type parameter names used in edge_impedance_by_route_type:
+        'street_level_rail', 'underground_rail', 'intercity_rail', 'bus',
+        'ferry', 'cable_car', 'gondola', 'funicular', 'trolleybus' and
+        'monorail'. Route types not in a scenario are not adjusted.
+        For example: [{'bus': 0.5}, {'bus': 0.5, 'underground_rail': -0.2}]
+    travel_time_col_name : str, optional
+        name of travel time column to apply multiplier factors to,
+        default column name is 'weight'
 
-    for route_type, route_vals in route_type_dict.items():
-        if route_vals['multiplier'] is not None:
-            if not isinstance(route_vals['multiplier'], float):
+    Returns
+    -------
+    transit_edge_df : pandas.DataFrame
+        Returns transit_edge_df with a travel time column per scenario
+    """
+    start_time = time.time()
+
+    if not isinstance(travel_time_col_name, str):
+        raise ValueError('travel_time_col_name must be a string.')
+    for col in [travel_time_col_name, 'route_type']:
+        if col in transit_edge_df.columns:
+            if not pd.api.types.is_numeric_dtype(transit_edge_df[col]):
+                raise ValueError('{} must be a number.'.format(col))
+        else:
+            raise ValueError('Column: {} was not found in transit_edge_df '
+                             'DataFrame and is required.'.format(col))
+    if not isinstance(scenarios, list) or len(scenarios) == 0 or \
+            not all(isinstance(scenario, dict) for scenario in scenarios):
+        raise ValueError('scenarios must be a list of one or more dicts.')
+
+    codes, route_types = pd.factorize(transit_edge_df['route_type'])
+    route_types = pd.Index(route_types)
+
+    # multiplier matrix of route type by scenario, the last row is used for
+    # edges without a route type as their factorized code is -1
+    multipliers = np.zeros((len(route_types) + 1, len(scenarios)))
+    for scenario_num, scenario in enumerate(scenarios):
+        for name, multiplier in scenario.items():
+            if name not in _ROUTE_TYPE_MULTIPLIER_PARAMS:
+                raise ValueError(
+                    '{} is not a valid route type parameter name. Valid '
+                    'names are: {}.'.format(
+                        name, list(_ROUTE_TYPE_MULTIPLIER_PARAMS.keys())))
+            if not isinstance(multiplier, float):
                 raise ValueError('One or more multiplier variables are not '
                                  'float.')
-
-            # warn if multiplier is not within optimal range
-            if not -1 <= route_vals['multiplier'] <= 1:
+            if not -1 <= multiplier <= 1:
                 log('WARNING: Multiplier value of: {} should be a '
-                    'value between -1 and 1.'.format(route_vals['multiplier']),
+                    'value between -1 and 1.'.format(multiplier),
                     level=lg.WARNING)
-            route_type_cnt = len(
-                transit_edge_df[transit_edge_df['route_type'] == route_type])
-
-            # warn if route type is not found in DataFrame
-            if route_type_cnt == 0 and route_vals['multiplier'] is not None:
+            position = route_types.get_indexer(
+                [_ROUTE_TYPE_MULTIPLIER_PARAMS[name]])[0]
+            if position < 0:
                 log('WARNING: Route type: {} with specified multiplier value '
-                    'of: {} was not found in the specified edge '
-                    'DataFrame.'.format(
-                     route_vals['name'], route_vals['multiplier']),
+                    'of: {} in scenario: {} was not found in the specified '
+                    'edge DataFrame.'.format(
+                        name, multiplier, scenario_num + 1),
                     level=lg.WARNING)
+                continue
+            multipliers[position, scenario_num] = multiplier
+
+    travel_time = transit_edge_df[travel_time_col_name].to_numpy(
+        dtype=float)
+    scenario_travel_time = travel_time[:, np.newaxis] * (
+        1 + multipliers[codes])
+
+    for scenario_num in range(len(scenarios)):
+        transit_edge_df['{}_s{}'.format(
+            travel_time_col_name, scenario_num + 1)] = \
+            scenario_travel_time[:, scenario_num]
+
+    log('Transit edge impedance computed for {:,} scenario(s) in columns: '
+        '{}_s1 to {}_s{}. Took {:,.2f} seconds.'.format(
+            len(scenarios), travel_time_col_name, travel_time_col_name,
+            len(scenarios), time.time() - start_time))
+    return transit_edge_df
 
-            if route_type_cnt > 0:
-                transit_edge_df[travel_time_col_name][
-                    transit_edge_df['route_type'] == route_type] = \
-                    travel_time_col + (
-                            travel_time_col * route_vals['multiplier'])
-                log('Adjusted {} transit edge impedance based on mode '
-                    'type penalty coefficient: {}.'.format(
-                        route_vals['name'], route_vals['multiplier']))
 
-    log('Transit edge impedance mode type penalty calculation complete.')
-    return transit_edge_df
+def _check_multiplier_table(multiplier_table, transit_edge_df):
+    """
+    Check a per route or per agency multiplier table for expected schema
+
+    Parameters
+    ----------
+    multiplier_table : pandas.DataFrame
+        DataFrame of per route or per agency factors
+    transit_edge_df : pandas.DataFrame
+        transit edge DataFrame
+
+    Returns
+    -------
+    key_col : str
+        name of the column used to match the multiplier table to
+        transit_edge_df
+    """
+    if not isinstance(multiplier_table, pd.DataFrame):
+        raise ValueError('multiplier_table must be a pandas.DataFrame.')
+    key_cols = [col for col in ['unique_route_id', 'unique_agency_id']
+                if col in multiplier_table.columns]
+    if len(key_cols) != 1 or 'multiplier' not in multiplier_table.columns:
+        raise ValueError(
+            'multiplier_table must have a multiplier column and one of '
+            'either a unique_route_id or unique_agency_id column.')
+    key_col = key_cols[0]
+    if key_col not in transit_edge_df.columns:
+        raise ValueError('Column: {} was not found in transit_edge_df '
+                         'DataFrame and is required to use '
+                         'multiplier_table.'.format(key_col))
+    if not pd.api.types.is_numeric_dtype(multiplier_table['multiplier']):
+        raise ValueError('multiplier_table multiplier column must be a '
+                         'number.')
+    if multiplier_table[key_col].duplicated().any():
+        raise ValueError('multiplier_table {} values must be '
+                         'unique.'.format(key_col))
+    out_of_range = ~multiplier_table['multiplier'].between(-1, 1)
+    if out_of_range.any():
+        log('WARNING: {:,} multiplier_table multiplier value(s) are not '
+            'between -1 and 1.'.format(out_of_range.sum()), level=lg.WARNING)
+    return key_col
 
 
 def save_processed_gtfs_data(
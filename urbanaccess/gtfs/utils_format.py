@@ -9,7 +9,9 @@ from urbanaccess.utils import log
 from urbanaccess import config
 
 
-def _read_gtfs_file(textfile_path, textfile):
+def _read_gtfs_file(textfile_path, textfile, column_projection=False,
+                    append_definitions=False, row_filter=None,
+                    chunksize=500000):
     """
     Read GTFS text file as a pandas.DataFrame
 
@@ -19,6 +21,21 @@ def _read_gtfs_file(textfile_path, textfile):
         directory of text file
     textfile : str
         name of text file
+    column_projection : bool, optional
+        if true, only the columns used by UrbanAccess will be read for
+        text files that define optional used columns in the read
+        configuration, all other columns in the file will not be read
+    append_definitions : bool, optional
+        if true and column_projection is true, columns that are used to
+        append GTFS definitions will also be read
+    row_filter : dict, optional
+        dictionary of a column name (key) and a collection of values (value)
+        to keep. If specified, the file is read in chunks and only records
+        whose value in the column, without leading and trailing spaces, is
+        in the collection are kept so that the full file is never held in
+        memory. Example: {'trip_id': ['1', '2']}
+    chunksize : int, optional
+        number of records to read at a time when row_filter is specified
 
     Returns
     -------
@@ -47,6 +64,13 @@ def _read_gtfs_file(textfile_path, textfile):
         file_name]['remove_whitespace']
     min_required_cols = config._GTFS_READ_TXT_CONFIG[
         file_name]['min_required_cols']
+    opt_used_cols = config._GTFS_READ_TXT_CONFIG[
+        file_name]['opt_used_cols']
+    definition_cols = config._GTFS_READ_TXT_CONFIG[
+        file_name]['definition_cols']
+    # copy so the read config is not modified by optional dtypes below
+    if req_dtypes is not None:
+        req_dtypes = req_dtypes.copy()
 
     if min_required_cols is not None or opt_dtypes is not None:
         # get list of cols in file
@@ -71,10 +95,34 @@ def _read_gtfs_file(textfile_path, textfile):
             if col_name in col_list:
                 req_dtypes.update({col_name: dtype})
 
-    df = pd.read_csv(file_path, dtype=req_dtypes, low_memory=False)
+    # only read the columns that are used if requested, column names are
+    # matched without leading and trailing spaces as these are removed
+    # after the file is read
+    usecols = None
+    if column_projection and opt_used_cols is not None:
+        keep_cols = set(min_required_cols or []) | set(opt_used_cols)
+        keep_cols.update(req_dtypes or {})
+        keep_cols.update(numeric_converter or [])
+        if append_definitions and definition_cols is not None:
+            keep_cols.update(definition_cols)
+
+        def usecols(col):
+            return col.strip() in keep_cols
+
+    if row_filter is None:
+        df = pd.read_csv(file_path, dtype=req_dtypes, low_memory=False,
+                         usecols=usecols)
+        raw_record_cnt = len(df)
+    else:
+        df, raw_record_cnt = _read_filtered_chunks(
+            file_path=file_path, dtype=req_dtypes, usecols=usecols,
+            row_filter=row_filter, chunksize=chunksize)
+        log('     {:,} of {:,} record(s) in {} matched the row filter on '
+            'column(s): {}.'.format(len(df), raw_record_cnt, textfile,
+                                    list(row_filter.keys())))
 
     # print warning or raise error when table is empty depending on the table
-    if df.empty:
+    if raw_record_cnt == 0:
         cal_file_warnings = {'calendar': 'calendar_dates.txt',
                              'calendar_dates': 'calendar.txt'}
         if file_name in cal_file_warnings.keys():
@@ -104,8 +152,163 @@ def _read_gtfs_file(textfile_path, textfile):
     return df
 
 
+def _read_filtered_chunks(file_path, dtype, usecols, row_filter,
+                          chunksize):
+    """
+    Read a text file in chunks keeping only records that match a filter
+
+    Parameters
+    ----------
+    file_path : str
+        full path and filename of file to read
+    dtype : dict
+        dictionary of column names and dtypes to read columns as
+    usecols : callable
+        function that returns true for the column names to read or None to
+        read all columns
+    row_filter : dict
+        dictionary of a column name (key) and a collection of values (value)
+        to keep
+    chunksize : int
+        number of records to read at a time
+
+    Returns
+    -------
+    df : pandas.DataFrame
+    raw_record_cnt : int
+        total number of records in the file before filtering
+    """
+    if not isinstance(row_filter, dict):
+        raise ValueError('row_filter must be a dict.')
+    filter_values = {col: pd.Index(pd.unique(pd.Series(
+        list(values), dtype=object).astype(str).str.strip())) for
+        col, values in row_filter.items()}
+
+    chunk_list = []
+    raw_record_cnt = 0
+    reader = pd.read_csv(file_path, dtype=dtype, usecols=usecols,
+                         chunksize=chunksize, low_memory=False)
+    for chunk in reader:
+        raw_record_cnt += len(chunk)
+        chunk.rename(columns=lambda x: x.strip(), inplace=True)
+        keep = np.ones(len(chunk), dtype=bool)
+        for col, values in filter_values.items():
+            if col not in chunk.columns:
+                raise ValueError('row_filter column: {} was not found in '
+                                 '{}.'.format(col, file_path))
+            keep &= chunk[col].astype(str).str.strip().isin(values).values
+        chunk_list.append(chunk.loc[keep])
+
+    if chunk_list:
+        df = pd.concat(chunk_list, ignore_index=True)
+    else:
+        df = pd.read_csv(file_path, dtype=dtype, usecols=usecols)
+    return df, raw_record_cnt
+
+
+def _route_agency_lookup(routes_df, agency_df):
+    """
+    Create a route ID to unique agency ID look up table
+
+    Parameters
+    ----------
+    routes_df : pandas:DataFrame
+        routes DataFrame
+    agency_df : pandas:DataFrame
+        agency DataFrame
+
+    Returns
+    -------
+    route_agency_lookup : pandas.Series
+        unique agency ID indexed by route ID. Routes without a matching
+        agency have a 'nan' value
+    """
+    agency_df = agency_df.drop_duplicates(subset='agency_id', keep='first')
+    agency_lookup = pd.Series(
+        _generate_unique_agency_id(agency_df, 'agency_name').values,
+        index=agency_df['agency_id'].values)
+    routes_df = routes_df.drop_duplicates(subset='route_id', keep='first')
+    route_agency_lookup = pd.Series(
+        routes_df['agency_id'].map(agency_lookup).fillna('nan').values,
+        index=routes_df['route_id'].values)
+    return route_agency_lookup
+
+
+def _trip_agency_lookup(trips_df, route_agency_lookup):
+    """
+    Create a trip ID to unique agency ID look up table
+
+    Parameters
+    ----------
+    trips_df : pandas:DataFrame
+        trips DataFrame
+    route_agency_lookup : pandas.Series
+        unique agency ID indexed by route ID
+
+    Returns
+    -------
+    trip_agency_lookup : pandas.Series
+        unique agency ID indexed by trip ID. Trips without a matching
+        agency have a 'nan' value
+    """
+    trips_df = trips_df.drop_duplicates(subset='trip_id', keep='first')
+    trip_agency_lookup = pd.Series(
+        trips_df['route_id'].map(route_agency_lookup).fillna('nan').values,
+        index=trips_df['trip_id'].values)
+    return trip_agency_lookup
+
+
+def _agencyid_by_key(df, key_col, key_agency_df, table_name, feed_folder):
+    """
+    Assign unique agency ID to a DataFrame using a table of key and unique
+    agency ID pairs. If a key is associated with more than one agency the
+    DataFrame records are duplicated for each agency using a one to many
+    join.
+
+    Parameters
+    ----------
+    df : pandas:DataFrame
+        DataFrame to assign unique agency ID to
+    key_col : str
+        name of the key column in df and key_agency_df
+    key_agency_df : pandas:DataFrame
+        DataFrame of key_col and unique_agency_id pairs
+    table_name : str
+        name of the GTFS table df represents
+    feed_folder : str
+        name of GTFS feed folder
+
+    Returns
+    -------
+    merged_df : pandas.DataFrame
+    """
+    key_agency_df = key_agency_df.drop_duplicates(
+        [key_col, 'unique_agency_id'])
+    # keep keys that do not show up in key_agency_df for accounting purposes
+    merged_df = pd.merge(df[[key_col]], key_agency_df, how='left',
+                         on=key_col, sort=False, copy=False)
+    merged_df['unique_agency_id'].fillna('nan', inplace=True)
+    merged_df.drop_duplicates([key_col, 'unique_agency_id'], inplace=True)
+
+    # check if keys are associated with more than one agency
+    if merged_df[key_col].duplicated().any():
+        feed_name = os.path.split(feed_folder)[1]
+        log('GTFS feed: {!s}, {} uses the same {} across multiple '
+            'agency_ids. This feed {} table will be modified from its '
+            'original format to provide {}s for each agency using a one to '
+            'many join.'.format(feed_name, table_name, key_col, table_name,
+                                key_col))
+        merged_df = merged_df.merge(df, 'left', on=key_col)
+    else:
+        merged_df = pd.merge(df, merged_df, how='left', on=key_col,
+                             sort=False, copy=False)
+
+    return merged_df
+
+
 def _calendar_dates_agencyid(calendar_dates_df, routes_df,
-                             trips_df, agency_df, feed_folder):
+                             trips_df, agency_df, feed_folder,
+                             route_agency_lookup=None):
     """
     Assign unique agency ID to calendar dates DataFrame
 
@@ -121,51 +324,31 @@ def _calendar_dates_agencyid(calendar_dates_df, routes_df,
         agency DataFrame
     feed_folder : str
         name of GTFS feed folder
+    route_agency_lookup : pandas.Series, optional
+        unique agency ID indexed by route ID. If None, it will be created
+        from routes_df and agency_df
 
     Returns
     -------
     merged_df : pandas.DataFrame
     """
-    tmp1 = pd.merge(routes_df, agency_df, how='left', on='agency_id',
-                    sort=False, copy=False)
-    tmp2 = pd.merge(trips_df, tmp1, how='left', on='route_id', sort=False,
-                    copy=False)
-    merged_df = pd.merge(calendar_dates_df, tmp2, how='left', on='service_id',
-                         sort=False, copy=False)
-
-    merged_df['unique_agency_id'] = _generate_unique_agency_id(
-        merged_df, 'agency_name')
-
-    group = merged_df[['service_id', 'unique_agency_id']].groupby([
-        'service_id', 'unique_agency_id']).size()
-    group_counts = group.reset_index(level=1)
-    # check if service_ids are associated with more than one agency
-
-    if any(group_counts.index.value_counts().values > 1):
-        feed_name = os.path.split(feed_folder)[1]
-        log('GTFS feed: {!s}, calendar_dates uses the same service_id across '
-            'multiple agency_ids. This feed calendar_dates table will be '
-            'modified from its original format to provide service_ids for '
-            'each agency using a one to many join.'.format(feed_name))
-
-        tmp = merged_df[['service_id', 'unique_agency_id']].drop_duplicates(
-            ['service_id', 'unique_agency_id'], inplace=False)
-        merged_df = tmp.merge(calendar_dates_df, 'left', on='service_id')
-
-    else:
-
-        merged_df.drop_duplicates(subset='service_id', keep='first',
-                                  inplace=True)
-        merged_df = pd.merge(calendar_dates_df,
-                             merged_df[['unique_agency_id', 'service_id']],
-                             how='left',
-                             on='service_id', sort=False, copy=False)
+    if route_agency_lookup is None:
+        route_agency_lookup = _route_agency_lookup(routes_df, agency_df)
+    service_agency_df = pd.DataFrame(
+        {'service_id': trips_df['service_id'].values,
+         'unique_agency_id': trips_df['route_id'].map(
+             route_agency_lookup).values})
+
+    merged_df = _agencyid_by_key(
+        df=calendar_dates_df, key_col='service_id',
+        key_agency_df=service_agency_df, table_name='calendar_dates',
+        feed_folder=feed_folder)
 
     return merged_df
 
 
 def _calendar_agencyid(calendar_df, routes_df, trips_df,
-                       agency_df, feed_folder):
+                       agency_df, feed_folder, route_agency_lookup=None):
     """
     Assign unique agency ID to calendar DataFrame
 
@@ -181,53 +364,31 @@ def _calendar_agencyid(calendar_df, routes_df, trips_df,
         agency DataFrame
     feed_folder : str
         name of GTFS feed folder
+    route_agency_lookup : pandas.Series, optional
+        unique agency ID indexed by route ID. If None, it will be created
+        from routes_df and agency_df
 
     Returns
     -------
     merged_df : pandas.DataFrame
     """
-    tmp1 = pd.merge(routes_df, agency_df, how='left', on='agency_id',
-                    sort=False, copy=False)
-    tmp2 = pd.merge(trips_df, tmp1, how='left', on='route_id', sort=False,
-                    copy=False)
-    # do another merge to account for service IDs that may not be utilized
-    # across all GTFS files for accounting purposes so we keep those that
-    # dont show up after merge
-    merged_df = pd.merge(calendar_df[['service_id']], tmp2, how='left',
-                         on='service_id', sort=False, copy=False)
-    merged_df['unique_agency_id'] = _generate_unique_agency_id(
-        merged_df, 'agency_name')
-
-    group = merged_df[['service_id', 'unique_agency_id']].groupby([
-        'service_id', 'unique_agency_id']).size()
-    group_counts = group.reset_index(level=1)
-    # check if service_ids are associated with more than one agency
-    if any(group_counts.index.value_counts().values > 1):
-        feed_name = os.path.split(feed_folder)[1]
-        log('GTFS feed: {!s}, calendar uses the same service_id across '
-            'multiple agency_ids. This feed calendar table will be '
-            'modified from its original format to provide service_ids for '
-            'each agency using a one to many join.'.format(feed_name))
-
-        tmp = merged_df[
-            ['service_id', 'unique_agency_id']].drop_duplicates(
-            ['service_id', 'unique_agency_id'], inplace=False)
-        merged_df = tmp.merge(calendar_df, 'left', on='service_id')
-
-    else:
-
-        merged_df.drop_duplicates(subset='service_id',
-                                  keep='first',
-                                  inplace=True)
-        merged_df = pd.merge(calendar_df,
-                             merged_df[['unique_agency_id', 'service_id']],
-                             how='left',
-                             on='service_id', sort=False, copy=False)
+    if route_agency_lookup is None:
+        route_agency_lookup = _route_agency_lookup(routes_df, agency_df)
+    service_agency_df = pd.DataFrame(
+        {'service_id': trips_df['service_id'].values,
+         'unique_agency_id': trips_df['route_id'].map(
+             route_agency_lookup).values})
+
+    merged_df = _agencyid_by_key(
+        df=calendar_df, key_col='service_id',
+        key_agency_df=service_agency_df, table_name='calendar',
+        feed_folder=feed_folder)
 
     return merged_df
 
 
-def _trips_agencyid(trips_df, routes_df, agency_df):
+def _trips_agencyid(trips_df, routes_df, agency_df,
+                    trip_agency_lookup=None):
     """
     Assign unique agency ID to trips DataFrame
 
@@ -239,27 +400,27 @@ def _trips_agencyid(trips_df, routes_df, agency_df):
         routes DataFrame
     agency_df : pandas:DataFrame
         agency DataFrame
+    trip_agency_lookup : pandas.Series, optional
+        unique agency ID indexed by trip ID. If None, it will be created
+        from trips_df, routes_df and agency_df
 
     Returns
     -------
     merged_df : pandas.DataFrame
     """
-    tmp1 = pd.merge(routes_df, agency_df, how='left', on='agency_id',
-                    sort=False, copy=False)
-    merged_df = pd.merge(trips_df[['trip_id', 'route_id']], tmp1, how='left',
-                         on='route_id', sort=False, copy=False)
-    merged_df['unique_agency_id'] = _generate_unique_agency_id(
-        merged_df, 'agency_name')
-    merged_df.drop_duplicates(subset='trip_id', keep='first', inplace=True)
-
-    merged_df = pd.merge(trips_df, merged_df[['unique_agency_id', 'trip_id']],
-                         how='left', on='trip_id',
-                         sort=False, copy=False)
+    if trip_agency_lookup is None:
+        trip_agency_lookup = _trip_agency_lookup(
+            trips_df, _route_agency_lookup(routes_df, agency_df))
+
+    merged_df = trips_df.copy()
+    merged_df['unique_agency_id'] = merged_df['trip_id'].map(
+        trip_agency_lookup).fillna('nan')
     return merged_df
 
 
 def _stops_agencyid(stops_df, trips_df, routes_df,
-                    stop_times_df, agency_df, feed_folder):
+                    stop_times_df, agency_df, feed_folder,
+                    trip_agency_lookup=None):
     """
     Assign unique agency ID to stops DataFrame
 
@@ -277,50 +438,30 @@ def _stops_agencyid(stops_df, trips_df, routes_df,
         agency DataFrame
     feed_folder : str
         name of GTFS feed folder
+    trip_agency_lookup : pandas.Series, optional
+        unique agency ID indexed by trip ID. If None, it will be created
+        from trips_df, routes_df and agency_df
 
     Returns
     -------
     merged_df : pandas.DataFrame
     """
-    tmp1 = pd.merge(routes_df, agency_df, how='left', on='agency_id',
-                    sort=False, copy=False)
-    tmp2 = pd.merge(trips_df, tmp1, how='left', on='route_id', sort=False,
-                    copy=False)
-    tmp3 = pd.merge(stop_times_df, tmp2, how='left', on='trip_id', sort=False,
-                    copy=False)
-    # do another merge to account for stops that may not be utilized across all
-    # GTFS files for accounting purposes so we keep those that dont show up
-    # after merge
-    merged_df = pd.merge(stops_df[['stop_id']], tmp3, how='left', on='stop_id',
-                         sort=False, copy=False)
-    merged_df['unique_agency_id'] = _generate_unique_agency_id(
-        merged_df, 'agency_name')
-
-    group = merged_df[['stop_id', 'unique_agency_id']].groupby([
-        'stop_id', 'unique_agency_id']).size()
-    group_counts = group.reset_index(level=1)
-    # check if stop_ids are associated with more than one agency
-    if any(group_counts.index.value_counts().values > 1):
-        feed_name = os.path.split(feed_folder)[1]
-        log('GTFS feed: {!s}, stops uses the same stop_id across '
-            'multiple agency_ids. This feed stops table will be '
-            'modified from its original format to provide stop_ids for '
-            'each agency using a one to many join.'.format(feed_name))
-
-        tmp = merged_df[['stop_id', 'unique_agency_id']].drop_duplicates(
-            ['stop_id', 'unique_agency_id'], inplace=False)
-        merged_df = tmp.merge(stops_df, 'left', on='stop_id')
+    if trip_agency_lookup is None:
+        trip_agency_lookup = _trip_agency_lookup(
+            trips_df, _route_agency_lookup(routes_df, agency_df))
+    stop_agency_df = pd.DataFrame(
+        {'stop_id': stop_times_df['stop_id'].values,
+         'unique_agency_id': stop_times_df['trip_id'].map(
+             trip_agency_lookup).values})
+
+    merged_df = _agencyid_by_key(
+        df=stops_df, key_col='stop_id', key_agency_df=stop_agency_df,
+        table_name='stops', feed_folder=feed_folder)
 
-    else:
-        merged_df.drop_duplicates(subset='stop_id', keep='first', inplace=True)
-        merged_df = pd.merge(stops_df,
-                             merged_df[['unique_agency_id', 'stop_id']],
-                             how='left', on='stop_id',
-                             sort=False, copy=False)
     return merged_df
 
 
-def _routes_agencyid(routes_df, agency_df):
+def _routes_agencyid(routes_df, agency_df, route_agency_lookup=None):
     """
     Assign unique agency ID to routes DataFrame
 
@@ -330,25 +471,25 @@ def _routes_agencyid(routes_df, agency_df):
         routes DataFrame
     agency_df : pandas:DataFrame
         agency DataFrame
+    route_agency_lookup : pandas.Series, optional
+        unique agency ID indexed by route ID. If None, it will be created
+        from routes_df and agency_df
 
     Returns
     -------
     merged_df : pandas.DataFrame
     """
-    merged_df = pd.merge(routes_df[['route_id', 'agency_id']], agency_df,
-                         how='left', on='agency_id', sort=False, copy=False)
-    merged_df['unique_agency_id'] = _generate_unique_agency_id(
-        merged_df, 'agency_name')
-
-    merged_df = pd.merge(routes_df,
-                         merged_df[['unique_agency_id', 'route_id']],
-                         how='left', on='route_id',
-                         sort=False, copy=False)
+    if route_agency_lookup is None:
+        route_agency_lookup = _route_agency_lookup(routes_df, agency_df)
+
+    merged_df = routes_df.copy()
+    merged_df['unique_agency_id'] = merged_df['route_id'].map(
+        route_agency_lookup).fillna('nan')
     return merged_df
 
 
 def _stop_times_agencyid(stop_times_df, routes_df, trips_df,
-                         agency_df):
+                         agency_df, trip_agency_lookup=None):
     """
     Assign unique agency ID to stop times DataFrame
 
@@ -362,24 +503,21 @@ def _stop_times_agencyid(stop_times_df, routes_df, trips_df,
         trips DataFrame
     agency_df : pandas:DataFrame
         agency DataFrame
+    trip_agency_lookup : pandas.Series, optional
+        unique agency ID indexed by trip ID. If None, it will be created
+        from trips_df, routes_df and agency_df
 
     Returns
     -------
     merged_df : pandas.DataFrame
     """
-    tmp1 = pd.merge(routes_df, agency_df, how='left', on='agency_id',
-                    sort=False, copy=False)
-    tmp2 = pd.merge(trips_df[['trip_id', 'route_id']], tmp1, how='left',
-                    on='route_id', sort=False, copy=False)
-    merged_df = pd.merge(stop_times_df, tmp2, how='left', on='trip_id',
-                         sort=False, copy=False)
-    merged_df['unique_agency_id'] = _generate_unique_agency_id(
-        merged_df, 'agency_name')
-    merged_df.drop_duplicates(subset='trip_id', keep='first', inplace=True)
-
-    merged_df = pd.merge(stop_times_df,
-                         merged_df[['unique_agency_id', 'trip_id']],
-                         how='left', on='trip_id', sort=False, copy=False)
+    if trip_agency_lookup is None:
+        trip_agency_lookup = _trip_agency_lookup(
+            trips_df, _route_agency_lookup(routes_df, agency_df))
+
+    merged_df = stop_times_df.copy()
+    merged_df['unique_agency_id'] = merged_df['trip_id'].map(
+        trip_agency_lookup).fillna('nan')
 
     return merged_df
 
@@ -387,7 +525,7 @@ def _stop_times_agencyid(stop_times_df, routes_df, trips_df,
 def _add_unique_agencyid(agency_df, stops_df, routes_df,
                          trips_df, stop_times_df, calendar_df,
                          calendar_dates_df, feed_folder,
-                         nulls_as_folder=True):
+                         nulls_as_folder=True, stop_trips_df=None):
     """
     Create an unique agency ID for all GTFS feed DataFrames to enable unique
     relational table keys. Pathways to create the unique agency ID are:
@@ -430,6 +568,9 @@ def _add_unique_agencyid(agency_df, stops_df, routes_df,
     nulls_as_folder : bool, optional
         if true, GTFS feeds where the agency ID is null, the GTFS folder
         name will be used as the unique agency ID
+    stop_trips_df : pandas:DataFrame, optional
+        DataFrame of stop_id and trip_id pairs used to assign unique agency
+        ID to stops. If None, stop_times_df is used
     Returns
     -------
     stops_df, routes_df, trips_df, stop_times_df, calendar_df,
@@ -540,57 +681,63 @@ def _add_unique_agencyid(agency_df, stops_df, routes_df,
                 raise ValueError(
                     'Null values found in agency_id and agency_name.')
 
-            # subset DataFrames to only cols of interest for processing
-            subset_agency_df = agency_df[['agency_id', 'agency_name']]
-            subset_routes_df = routes_df[['route_id', 'agency_id']]
-            subset_stop_times_df = stop_times_df[['trip_id', 'stop_id']]
-            subset_trips_df = trips_df[['trip_id', 'route_id']]
-            subset_trips_df_w_sid = trips_df[
-                ['trip_id', 'route_id', 'service_id']]
-
-            # below, apply the unique agency ID to all GTFS dfs via
-            # merge operations
+            # build the route to agency and trip to agency look up tables
+            # once and map them onto each table, stop_times and trips only
+            # receive one mapped column
+            route_agency_lookup = _route_agency_lookup(
+                routes_df=routes_df[['route_id', 'agency_id']],
+                agency_df=agency_df[['agency_id', 'agency_name']])
+            trip_agency_lookup = _trip_agency_lookup(
+                trips_df=trips_df[['trip_id', 'route_id']],
+                route_agency_lookup=route_agency_lookup)
 
             # if optional calendar_dates_df is not empty then process it
             if calendar_dates_df.empty is False:
                 calendar_dates_replacement_df = _calendar_dates_agencyid(
                     calendar_dates_df=calendar_dates_df,
-                    routes_df=subset_routes_df,
-                    trips_df=subset_trips_df_w_sid,
-                    agency_df=subset_agency_df,
-                    feed_folder=feed_folder)
+                    routes_df=routes_df,
+                    trips_df=trips_df,
+                    agency_df=agency_df,
+                    feed_folder=feed_folder,
+                    route_agency_lookup=route_agency_lookup)
 
             # if optional calendar_df is not empty then process it
             if calendar_df.empty is False:
                 calendar_replacement_df = _calendar_agencyid(
                     calendar_df=calendar_df,
-                    routes_df=subset_routes_df,
-                    trips_df=subset_trips_df_w_sid,
-                    agency_df=subset_agency_df,
-                    feed_folder=feed_folder)
-
-            trips_replacement_df = _trips_agencyid(
-                trips_df=trips_df,
-                routes_df=subset_routes_df,
-                agency_df=subset_agency_df)
+                    routes_df=routes_df,
+                    trips_df=trips_df,
+                    agency_df=agency_df,
+                    feed_folder=feed_folder,
+                    route_agency_lookup=route_agency_lookup)
 
             stops_replacement_df = _stops_agencyid(
                 stops_df=stops_df,
-                trips_df=subset_trips_df,
-                routes_df=subset_routes_df,
-                stop_times_df=subset_stop_times_df,
-                agency_df=subset_agency_df,
-                feed_folder=feed_folder)
+                trips_df=trips_df,
+                routes_df=routes_df,
+                stop_times_df=stop_times_df if stop_trips_df is None else
+                stop_trips_df,
+                agency_df=agency_df,
+                feed_folder=feed_folder,
+                trip_agency_lookup=trip_agency_lookup)
+
+            trips_replacement_df = _trips_agencyid(
+                trips_df=trips_df,
+                routes_df=routes_df,
+                agency_df=agency_df,
+                trip_agency_lookup=trip_agency_lookup)
 
             routes_replacement_df = _routes_agencyid(
                 routes_df=routes_df,
-                agency_df=subset_agency_df)
+                agency_df=agency_df,
+                route_agency_lookup=route_agency_lookup)
 
             stop_times_replacement_df = _stop_times_agencyid(
                 stop_times_df=stop_times_df,
-                routes_df=subset_routes_df,
-                trips_df=subset_trips_df,
-                agency_df=subset_agency_df)
+                routes_df=routes_df,
+                trips_df=trips_df,
+                agency_df=agency_df,
+                trip_agency_lookup=trip_agency_lookup)
 
             # update the df_dict dfs with the new dfs with unique agency IDs
             df_dict = {'stops': stops_replacement_df,
@@ -791,6 +938,100 @@ def _timetoseconds(df, time_cols):
     return final_df
 
 
+def _trip_codes(df, trip_col='unique_trip_id'):
+    """
+    Encode trip IDs as integer codes that sort in the same order as the
+    trip ID strings. The codes in the trip_code column added by
+    _sort_stop_times() are reused when the column exists
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        stop times DataFrame
+    trip_col : str, optional
+        name of the trip ID column
+
+    Returns
+    -------
+    codes : numpy.ndarray
+    """
+    if trip_col == 'unique_trip_id' and 'trip_code' in df.columns:
+        return df['trip_code'].to_numpy()
+    return pd.factorize(df[trip_col], sort=True)[0]
+
+
+def _is_trip_sorted(df, trip_col='unique_trip_id',
+                    sequence_col='stop_sequence', trip_codes=None):
+    """
+    Check in a single pass whether stop times are sorted by trip and
+    stop sequence
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        stop times DataFrame
+    trip_col : str, optional
+        name of the trip ID column
+    sequence_col : str, optional
+        name of the stop sequence column
+    trip_codes : numpy.ndarray, optional
+        integer trip codes from _trip_codes(), computed if not specified
+
+    Returns
+    -------
+    is_sorted : bool
+    """
+    if trip_codes is None:
+        trip_codes = _trip_codes(df, trip_col)
+    trip_step = np.diff(trip_codes)
+    if (trip_step < 0).any():
+        return False
+    sequence = df[sequence_col].to_numpy(dtype=float)
+    # null stop sequences are sorted to the end of their trip
+    is_null = np.isnan(sequence)
+    in_order = (np.diff(sequence) >= 0) | is_null[1:]
+    in_order &= ~(is_null[:-1] & ~is_null[1:])
+    return bool(in_order[trip_step == 0].all())
+
+
+def _sort_stop_times(df, trip_col='unique_trip_id',
+                     sequence_col='stop_sequence'):
+    """
+    Sort stop times by trip and stop sequence using integer trip codes,
+    skipping the sort when the stop times are already sorted. The codes are
+    kept in a trip_code column so that later steps that subset the stop
+    times do not have to encode the trip IDs again
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        stop times DataFrame
+    trip_col : str, optional
+        name of the trip ID column
+    sequence_col : str, optional
+        name of the stop sequence column
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        sorted stop times DataFrame with a trip_code column, the same object
+        as the input if it was already sorted and had a trip_code column
+    """
+    trip_codes = _trip_codes(df, trip_col)
+    if trip_col == 'unique_trip_id' and 'trip_code' not in df.columns:
+        df = df.assign(trip_code=trip_codes)
+    if _is_trip_sorted(df, trip_col=trip_col, sequence_col=sequence_col,
+                       trip_codes=trip_codes):
+        return df
+    start_time = time.time()
+    order = np.lexsort((df[sequence_col].to_numpy(dtype=float), trip_codes))
+    df = df.iloc[order]
+    log('Sorted {:,} stop time records by {} and {}. '
+        'Took {:,.2f} seconds.'.format(len(df), trip_col, sequence_col,
+                                       time.time() - start_time))
+    return df
+
+
 def _apply_gtfs_definition(df, desc_dict):
     """
     Helper function to apply a dictionary with value to description mappings
@@ -902,33 +1143,67 @@ def _append_route_type(stops_df, stop_times_df, routes_df,
     if info_to_append not in valid_info_to_append:
         raise ValueError('{} is not a valid parameter.'.format(info_to_append))
 
-    if info_to_append == 'route_type_to_stops':
-        tmp1 = pd.merge(trips_df, routes_df, how='left', on='route_id',
-                        sort=False, copy=False)
-        merged_df = pd.merge(stop_times_df, tmp1, how='left', on='trip_id',
-                             sort=False, copy=False)
-        merged_df.drop_duplicates(subset='stop_id', keep='first', inplace=True)
+    stops_w_route_type, stop_times_w_route_type = _append_route_types(
+        stops_df=stops_df, stop_times_df=stop_times_df.copy(),
+        routes_df=routes_df, trips_df=trips_df)
 
-        stops_df = pd.merge(stops_df, merged_df[['route_type', 'stop_id']],
-                            how='left', on='stop_id', sort=False, copy=False)
+    if info_to_append == 'route_type_to_stops':
+        return stops_w_route_type
 
-        log('Appended route type to stops.')
+    if info_to_append == 'route_type_to_stop_times':
+        return stop_times_w_route_type
 
-        return stops_df
 
-    if info_to_append == 'route_type_to_stop_times':
-        merged_df = pd.merge(trips_df, routes_df, how='left', on='route_id',
-                             sort=False, copy=False)
-        merged_df.drop_duplicates(subset='trip_id', keep='first', inplace=True)
+def _append_route_types(stops_df, stop_times_df, routes_df, trips_df,
+                        stop_trips_df=None):
+    """
+    Append GTFS route type definitions to both the stops and stop times
+    DataFrames in one pass. A trip to route type look up is built once and
+    mapped onto stop times, stops are then assigned the route type of the
+    first stop time record at each stop.
 
-        stop_times_df = pd.merge(stop_times_df,
-                                 merged_df[['route_type', 'trip_id']],
-                                 how='left', on='trip_id', sort=False,
-                                 copy=False)
+    Parameters
+    ----------
+    stops_df : pandas:DataFrame
+        stops DataFrame
+    stop_times_df : pandas:DataFrame
+        stop times DataFrame
+    routes_df : pandas:DataFrame
+        routes DataFrame
+    trips_df : pandas:DataFrame
+        trip DataFrame
+    stop_trips_df : pandas:DataFrame, optional
+        DataFrame of stop_id and trip_id pairs used to assign route type
+        to stops. If None, stop_times_df is used
 
-        log('Appended route type to stop_times.')
+    Returns
+    -------
+    stops_df, stop_times_df : pandas.DataFrame
+    """
+    route_type_lookup = routes_df.drop_duplicates(
+        subset='route_id', keep='first').set_index('route_id')['route_type']
+    trips = trips_df.drop_duplicates(subset='trip_id', keep='first')
+    trip_route_type_lookup = pd.Series(
+        trips['route_id'].map(route_type_lookup).values,
+        index=trips['trip_id'].values)
+
+    stop_times_df['route_type'] = stop_times_df['trip_id'].map(
+        trip_route_type_lookup)
+    log('Appended route type to stop_times.')
+
+    if stop_trips_df is None:
+        stop_route_type_lookup = stop_times_df.groupby(
+            'stop_id', sort=False)['route_type'].first()
+    else:
+        stop_route_type_lookup = pd.Series(
+            stop_trips_df['trip_id'].map(trip_route_type_lookup).values,
+            index=stop_trips_df['stop_id'].values).groupby(
+            level=0, sort=False).first()
+    stops_df = stops_df.copy()
+    stops_df['route_type'] = stops_df['stop_id'].map(stop_route_type_lookup)
+    log('Appended route type to stops.')
 
-        return stop_times_df
+    return stops_df, stop_times_df
 
 
 def _generate_unique_agency_id(df, col_name):
@@ -1037,5 +1312,5 @@ def _list_raw_txt_columns(file):
     df : list
         list of columns in txt file
     """
-    df = pd.read_csv(file)
+    df = pd.read_csv(file, nrows=0)
     return list(df.columns)
@@ -5,11 +5,31 @@ import zipfile
 import os
 import logging as lg
 import time
-from six.moves.urllib import request
-
-from urbanaccess.utils import log
+import socket
+import hashlib
+import threading
+from multiprocessing.pool import ThreadPool
+from six.moves.urllib import request, parse
+from six.moves.urllib.error import HTTPError, URLError
+from six.moves import builtins
+
+from urbanaccess.utils import log, _replace
 from urbanaccess import config
 
+# number of bytes read and written at a time when downloading a feed
+_DOWNLOAD_CHUNKSIZE = 1024 * 1024
+# signatures at the start of a zipfile: a local file header or the end of
+# central directory record of an empty zipfile
+_ZIP_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06')
+# name of the GTFS feed download manifest file in the data folder
+_MANIFEST_FILENAME = 'gtfsfeed_manifest.yaml'
+# URLError reasons of a failed connection that are re-tried, Python 2 does
+# not have ConnectionResetError and raises a socket.error instead
+_TRANSIENT_URL_ERRORS = (
+    socket.timeout, getattr(builtins, 'ConnectionResetError', socket.error))
+# parsed GTFS feed repository catalogs by URL as (fetch time, DataFrame)
+_catalog_cache = {}
+
 
 # TODO: make class CamelCase
 class urbanaccess_gtfsfeeds(object):
@@ -248,7 +268,8 @@ feeds = urbanaccess_gtfsfeeds()
 
 
 def search(api='gtfsdataexch', search_text=None, search_field=None,
-           match='contains', add_feed=False, overwrite_feed=False):
+           match='contains', add_feed=False, overwrite_feed=False,
+           cache_ttl=86400):
     """
     Connect to a GTFS feed repository API and search for GTFS feeds that exist
     in a remote GTFS repository and whether or not to add the GTFS feed name
@@ -274,6 +295,11 @@ def search(api='gtfsdataexch', search_text=None, search_field=None,
         If true the existing urbanaccess_gtfsfeeds instance will be replaced
         with the records returned in the search results.
         All existing records will be removed.
+    cache_ttl : int, optional
+        number of seconds the feed catalog of the GTFS feed repository is
+        cached for in memory and on disk in the data_folder specified in the
+        config. Within this time the catalog is not fetched again from the
+        repository. Set to 0 to always fetch the catalog
     Returns
     -------
     search_result_df : pandas.DataFrame
@@ -298,6 +324,8 @@ def search(api='gtfsdataexch', search_text=None, search_field=None,
         raise ValueError('match must be either: contains or exact')
     if not isinstance(add_feed, bool):
         raise ValueError('add_feed must be bool')
+    if not isinstance(cache_ttl, (int, float)) or cache_ttl < 0:
+        raise ValueError('cache_ttl must be a positive number.')
 
     if api == 'gtfsdataexch':
         log(
@@ -305,11 +333,7 @@ def search(api='gtfsdataexch', search_text=None, search_field=None,
             'of Summer 2016. '
             'Data accessed here may be out of date.', level=lg.WARNING)
 
-        feed_table = pd.read_table(config.settings.gtfs_api[api], sep=',')
-        feed_table['date_added'] = pd.to_datetime(feed_table['date_added'],
-                                                  unit='s')
-        feed_table['date_last_updated'] = pd.to_datetime(
-            feed_table['date_last_updated'], unit='s')
+        feed_table = _feed_catalog(api=api, cache_ttl=cache_ttl)
 
         if search_text is None:
             log(
@@ -320,38 +344,33 @@ def search(api='gtfsdataexch', search_text=None, search_field=None,
         else:
             pass
 
-        search_result_df = pd.DataFrame()
-
         if search_field is None:
             search_field = ['name', 'url', 'dataexchange_id', 'feed_baseurl']
         else:
             if not isinstance(search_field, list):
                 raise ValueError('search_field is not list')
+        if isinstance(search_text, str):
+            search_text = [search_text]
+        else:
+            if not isinstance(search_text, list):
+                raise ValueError('search_text is not list')
 
+        # match all search text in all search fields at once as a single
+        # case-insensitive regular expression per field
+        pattern = '|'.join('(?:{})'.format(text) for text in search_text)
+        matched = pd.Series(False, index=feed_table.index)
         for field in search_field:
             if field not in feed_table.columns:
                 raise ValueError(
                     '{} column not found in available feed table'.format(
                         field))
-            for col in feed_table.select_dtypes(include=[object]).columns:
-
-                if isinstance(search_text, str):
-                    search_text = [search_text]
-                else:
-                    if not isinstance(search_text, list):
-                        raise ValueError('search_text is not list')
-
-                for text in search_text:
-                    if match == 'contains':
-                        search_result = feed_table[
-                            feed_table[col].str.contains(text, case=False,
-                                                         na=False)]
-                    if match == 'exact':
-                        search_result = feed_table[
-                            feed_table[col].str.match(text, case=False,
-                                                      na=False)]
-                    search_result_df = search_result_df.append(search_result)
-                    search_result_df.drop_duplicates(inplace=True)
+            # null values are searched as empty strings and not as 'nan'
+            values = feed_table[field].fillna('').astype(str)
+            if match == 'contains':
+                matched |= values.str.contains(pattern, case=False, na=False)
+            if match == 'exact':
+                matched |= values.str.match(pattern, case=False, na=False)
+        search_result_df = feed_table[matched].copy()
 
         log('Found {} records that matched {} inside {} columns:'.format(
             len(search_result_df), search_text, search_field))
@@ -385,9 +404,68 @@ def search(api='gtfsdataexch', search_text=None, search_field=None,
                 return search_result_df
 
 
+def _feed_catalog(api, cache_ttl=86400):
+    """
+    Read the feed catalog table of a GTFS feed repository. The catalog is
+    cached in memory and as a CSV file in the data_folder specified in the
+    config and is only fetched from the repository again when it is older
+    than cache_ttl
+
+    Parameters
+    ----------
+    api : {'gtfsdataexch'}
+        name of GTFS feed repository. name corresponds to the dict specified
+        in the urbanacess_config instance
+    cache_ttl : int, optional
+        number of seconds the cached catalog is used for
+
+    Returns
+    -------
+    feed_table : pandas.DataFrame
+    """
+    catalog_url = config.settings.gtfs_api[api]
+    now = time.time()
+
+    cached = _catalog_cache.get(catalog_url)
+    if cached is not None and now - cached[0] < cache_ttl:
+        log('Using feed catalog cached in memory for: {}'.format(api))
+        return cached[1].copy()
+
+    url_hash = hashlib.sha256(catalog_url.encode('utf-8')).hexdigest()[:12]
+    cache_path = os.path.join(
+        config.settings.data_folder,
+        'gtfsfeed_catalog_{}_{}.csv'.format(api, url_hash))
+    if os.path.exists(cache_path) and \
+            now - os.path.getmtime(cache_path) < cache_ttl:
+        fetched = os.path.getmtime(cache_path)
+        feed_table = pd.read_csv(cache_path)
+        log('Using feed catalog cached in: {}'.format(cache_path))
+    else:
+        start_time = time.time()
+        fetched = now
+        feed_table = pd.read_csv(catalog_url)
+        log('Feed catalog for {} fetched. Took {:,.2f} seconds'.format(
+            api, time.time() - start_time))
+        if cache_ttl > 0:
+            if not os.path.exists(config.settings.data_folder):
+                os.makedirs(config.settings.data_folder)
+            tmp_path = '{}.part'.format(cache_path)
+            feed_table.to_csv(tmp_path, index=False)
+            _replace(tmp_path, cache_path)
+
+    feed_table['date_added'] = pd.to_datetime(feed_table['date_added'],
+                                              unit='s')
+    feed_table['date_last_updated'] = pd.to_datetime(
+        feed_table['date_last_updated'], unit='s')
+    if cache_ttl > 0:
+        _catalog_cache[catalog_url] = (fetched, feed_table)
+    return feed_table.copy()
+
+
 def download(data_folder=os.path.join(config.settings.data_folder),
              feed_name=None, feed_url=None, feed_dict=None,
-             error_pause_duration=5, delete_zips=False):
+             error_pause_duration=5, delete_zips=False, max_workers=1,
+             max_host_connections=2, max_retries=3, use_cache=False):
     """
     Connect to the URLs passed in function or the URLs stored in the
     urbanaccess_gtfsfeeds instance and download the GTFS feed zipfile(s)
@@ -408,9 +486,24 @@ def download(data_folder=os.path.join(config.settings.data_folder),
         agency GTFS feed as the key and the GTFS feed URL as the value:
         {unique name of GTFS feed or transit service/agency : URL of feed}
     error_pause_duration : int, optional
-        how long to pause in seconds before re-trying requests if error
+        how long to pause in seconds before re-trying requests if error.
+        The pause doubles with each retry of the same request unless the
+        server specifies a Retry-After duration
     delete_zips : bool, optional
         if true the downloaded zipfiles will be removed
+    max_workers : int, optional
+        number of GTFS feeds to download concurrently in a thread pool
+    max_host_connections : int, optional
+        maximum number of concurrent downloads from the same host
+    max_retries : int, optional
+        number of times to re-try a request that returned status code 429,
+        500, 502, 503 or 504 or that timed out
+    use_cache : bool, optional
+        if true, the ETag, Last-Modified and SHA-256 hash of each downloaded
+        feed zipfile are stored in a download manifest YAML file in
+        data_folder and feeds that were previously downloaded and extracted
+        are requested conditionally. Feeds that have not changed since the
+        previous download are not downloaded or extracted again
     Returns
     -------
     nothing
@@ -454,6 +547,15 @@ def download(data_folder=os.path.join(config.settings.data_folder),
         feeds.gtfs_feeds
     else:
         raise ValueError('Passed parameters were incorrect or not specified.')
+    for name, value in [('max_workers', max_workers),
+                        ('max_host_connections', max_host_connections)]:
+        if not isinstance(value, int) or value < 1:
+            raise ValueError('{} must be an integer greater than 0.'.format(
+                name))
+    if not isinstance(max_retries, int) or max_retries < 0:
+        raise ValueError('max_retries must be a positive integer.')
+    if not isinstance(use_cache, bool):
+        raise ValueError('use_cache must be bool.')
 
     download_folder = os.path.join(data_folder, 'gtfsfeed_zips')
 
@@ -464,86 +566,257 @@ def download(data_folder=os.path.join(config.settings.data_folder),
         len(feeds.gtfs_feeds), download_folder))
 
     start_time1 = time.time()
-    msg_no_connection_w_status = ('Unable to connect. URL at {} returned '
-                                  'status code {} and no data')
-    msg_no_connection = 'Unable to connect to: {}. Error: {}'
-    msg_download_succeed = ('{} GTFS feed downloaded successfully. '
-                            'Took {:,.2f} seconds for {:,.1f}KB')
-    # TODO: add file counter and print number to user
-    for feed_name_key, feed_url_value in feeds.gtfs_feeds.items():
-        start_time2 = time.time()
-        zipfile_path = ''.join([download_folder, '/', feed_name_key, '.zip'])
-
-        # add default user-agent header in request to avoid 403 Errors
-        opener = request.build_opener()
-        opener.addheaders = [('User-agent', '')]
-        request.install_opener(opener)
-
-        if 'http' in feed_url_value:
-            try:
-                status_code = request.urlopen(feed_url_value).getcode()
-                if status_code == 200:
-                    file = request.urlopen(feed_url_value)
-
-                    _zipfile_type_check(file=file,
-                                        feed_url_value=feed_url_value)
-
-                    with open(zipfile_path, "wb") as local_file:
-                        local_file.write(file.read())
-                    log(msg_download_succeed.format(
-                        feed_name_key, time.time() - start_time2,
-                        os.path.getsize(zipfile_path)))
-                elif status_code in [429, 504]:
-                    msg = ('URL at {} returned status code {} and no data. '
-                           'Re-trying request in {:.2f} seconds.')
-                    log(msg.format(feed_url_value, status_code,
-                                   error_pause_duration),
-                        level=lg.WARNING)
-                    time.sleep(error_pause_duration)
-                    try:
-                        file = request.urlopen(feed_url_value)
-
-                        _zipfile_type_check(file=file,
-                                            feed_url_value=feed_url_value)
-
-                        with open(zipfile_path, "wb") as local_file:
-                            local_file.write(file.read())
-                    except Exception:
-                        log(msg_no_connection_w_status.format(
-                            feed_url_value, status_code),
-                            level=lg.ERROR)
-                else:
-                    log(msg_no_connection_w_status.format(
-                        feed_url_value, status_code),
-                        level=lg.ERROR)
-            except Exception:
-                log(msg_no_connection.format(
-                    feed_url_value, traceback.format_exc()),
-                    level=lg.ERROR)
-        else:
-            try:
-                file = request.urlopen(feed_url_value)
-                _zipfile_type_check(file=file,
-                                    feed_url_value=feed_url_value)
-                file_path = ''.join(
-                    [download_folder, '/', feed_name_key, '.zip'])
-                with open(file_path, "wb") as local_file:
-                    local_file.write(file.read())
-                log(msg_download_succeed.format(
-                    feed_name_key, time.time() - start_time2,
-                    os.path.getsize(zipfile_path)))
-            except Exception:
-                log(msg_no_connection.format(
-                    feed_url_value, traceback.format_exc()),
-                    level=lg.ERROR)
+    # limit the number of concurrent requests made to each host
+    host_limits = {}
+    for feed_url_value in feeds.gtfs_feeds.values():
+        host = parse.urlparse(feed_url_value).netloc
+        if host not in host_limits:
+            host_limits[host] = threading.BoundedSemaphore(
+                max_host_connections)
+
+    manifest = {}
+    if use_cache:
+        manifest = _read_download_manifest(data_folder)
+    unzip_folder = os.path.join(data_folder, 'gtfsfeed_text')
+
+    def _download(feed):
+        feed_name_key, feed_url_value = feed
+        # only request feeds conditionally that were extracted before
+        manifest_entry = manifest.get(feed_name_key)
+        if manifest_entry is not None and (
+                manifest_entry.get('url') != feed_url_value or
+                not os.path.exists(os.path.join(
+                    unzip_folder, feed_name_key))):
+            manifest_entry = None
+        with host_limits[parse.urlparse(feed_url_value).netloc]:
+            return _download_feed(
+                feed_name=feed_name_key, feed_url=feed_url_value,
+                download_folder=download_folder,
+                error_pause_duration=error_pause_duration,
+                max_retries=max_retries, manifest_entry=manifest_entry)
+
+    feed_list = list(feeds.gtfs_feeds.items())
+    if max_workers == 1 or len(feed_list) == 1:
+        results = [_download(feed) for feed in feed_list]
+    else:
+        log('Downloading GTFS feeds using {:,} concurrent workers...'.format(
+            min(max_workers, len(feed_list))))
+        pool = ThreadPool(min(max_workers, len(feed_list)))
+        try:
+            results = pool.map(_download, feed_list)
+        finally:
+            pool.close()
+            pool.join()
+
+    feed_status = {}
+    for (feed_name_key, feed_url_value), (status, entry) in zip(
+            feed_list, results):
+        feed_status.setdefault(status, []).append(feed_name_key)
+        if entry is not None:
+            manifest[feed_name_key] = entry
+    if feed_status.get('failed'):
+        log('{:,} of {:,} GTFS feed(s) failed to download: {}'.format(
+            len(feed_status['failed']), len(feed_list),
+            feed_status['failed']), level=lg.ERROR)
+    if feed_status.get('unchanged'):
+        log('{:,} of {:,} GTFS feed(s) have not changed since the previous '
+            'download and will not be extracted: {}'.format(
+                len(feed_status['unchanged']), len(feed_list),
+                feed_status['unchanged']))
 
     log('GTFS feed download completed. Took {:,.2f} seconds'.format(
         time.time() - start_time1))
 
-    _unzip(zip_rootpath=download_folder, delete_zips=delete_zips)
+    if use_cache:
+        _write_download_manifest(data_folder, manifest)
+        downloaded = feed_status.get('downloaded', [])
+        if downloaded:
+            _unzip(zip_rootpath=download_folder, delete_zips=delete_zips,
+                   subset=['{}.zip'.format(feed_name_key)
+                           for feed_name_key in downloaded])
+    else:
+        _unzip(zip_rootpath=download_folder, delete_zips=delete_zips)
+
+
+def _read_download_manifest(data_folder):
+    """
+    Read the GTFS feed download manifest
 
+    Parameters
+    ----------
+    data_folder : str
+        directory the GTFS feeds are downloaded to
 
-def _unzip(zip_rootpath, delete_zips=True):
+    Returns
+    -------
+    manifest : dict
+        dictionary of the GTFS feed name as the key and a dictionary of
+        the url, etag, last_modified and sha256 of the previous download
+        of the feed as the value
+    """
+    manifest_path = os.path.join(data_folder, _MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as f:
+        manifest = yaml.safe_load(f)
+    if not isinstance(manifest, dict):
+        log('Download manifest: {} is not valid and will be '
+            'ignored.'.format(manifest_path), level=lg.WARNING)
+        return {}
+    return manifest
+
+
+def _write_download_manifest(data_folder, manifest):
+    """
+    Write the GTFS feed download manifest
+
+    Parameters
+    ----------
+    data_folder : str
+        directory the GTFS feeds are downloaded to
+    manifest : dict
+        dictionary of the GTFS feed name as the key and a dictionary of
+        the url, etag, last_modified and sha256 of the download of the feed
+        as the value
+
+    Returns
+    -------
+    nothing
+    """
+    manifest_path = os.path.join(data_folder, _MANIFEST_FILENAME)
+    tmp_path = '{}.part'.format(manifest_path)
+    with open(tmp_path, 'w') as f:
+        yaml.dump(manifest, f, default_flow_style=False)
+    _replace(tmp_path, manifest_path)
+    log('Download manifest written to: {}'.format(manifest_path))
+
+
+def _download_feed(feed_name, feed_url, download_folder,
+                   error_pause_duration=5, max_retries=3, timeout=60,
+                   manifest_entry=None):
+    """
+    Download a single GTFS feed zipfile with one request per attempt,
+    re-trying with exponential backoff when the server is busy, the
+    request times out or the connection is reset. If a manifest entry from
+    a previous download is specified, the request is made conditional on
+    the feed having changed
+
+    Parameters
+    ----------
+    feed_name : str
+        name of transit agency or service to use to name downloaded zipfile
+    feed_url : str
+        URL to download GTFS feed zipfile
+    download_folder : str
+        directory to download GTFS feed zipfile to
+    error_pause_duration : int, optional
+        how long to pause in seconds before the first re-try, the pause
+        doubles with each following re-try
+    max_retries : int, optional
+        number of times to re-try the request
+    timeout : int, optional
+        number of seconds to wait for a response before the request is
+        re-tried
+    manifest_entry : dict, optional
+        download manifest entry of the previous download of the feed with
+        the etag, last_modified and sha256 of the feed zipfile
+
+    Returns
+    -------
+    status : {'downloaded', 'unchanged', 'failed'}
+        'unchanged' if the server responded that the feed was not modified
+        or the downloaded zipfile is identical to the previous download
+    manifest_entry : dict
+        download manifest entry of the feed, None if the download failed
+    """
+    start_time = time.time()
+    zipfile_path = os.path.join(download_folder, '{}.zip'.format(feed_name))
+    msg_no_connection_w_status = ('Unable to connect. URL at {} returned '
+                                  'status code {} and no data')
+    msg_no_connection = 'Unable to connect to: {}. Error: {}'
+    msg_retry = ('URL at {} returned {}. Re-trying request in {:.2f} '
+                 'seconds.')
+    retry_status_codes = [429, 500, 502, 503, 504]
+
+    # add default user-agent header in request to avoid 403 Errors
+    headers = {'User-agent': ''}
+    if manifest_entry:
+        if manifest_entry.get('etag'):
+            headers['If-None-Match'] = manifest_entry['etag']
+        if manifest_entry.get('last_modified'):
+            headers['If-Modified-Since'] = manifest_entry['last_modified']
+    feed_request = request.Request(feed_url, headers=headers)
+    attempt = 0
+    while True:
+        pause = error_pause_duration * (2 ** attempt)
+        try:
+            file = request.urlopen(feed_request, timeout=timeout)
+            status_code = file.getcode()
+            # non-HTTP URLs such as local files do not have a status code
+            if status_code is not None and status_code != 200:
+                file.close()
+                log(msg_no_connection_w_status.format(feed_url, status_code),
+                    level=lg.ERROR)
+                return 'failed', None
+            try:
+                sha256 = _stream_to_file(
+                    file=file, file_path=zipfile_path,
+                    feed_url_value=feed_url)
+            finally:
+                file.close()
+            log('{} GTFS feed downloaded successfully. '
+                'Took {:,.2f} seconds for {:,.1f}KB (sha256: {})'.format(
+                    feed_name, time.time() - start_time,
+                    os.path.getsize(zipfile_path) / 1000, sha256))
+            entry = {'url': feed_url,
+                     'etag': file.info().get('ETag'),
+                     'last_modified': file.info().get('Last-Modified'),
+                     'sha256': sha256}
+            if manifest_entry and manifest_entry.get('sha256') == sha256:
+                log('{} GTFS feed is identical to the previous '
+                    'download.'.format(feed_name))
+                return 'unchanged', entry
+            return 'downloaded', entry
+        except HTTPError as e:
+            if e.code == 304 and manifest_entry:
+                log('{} GTFS feed has not changed since the previous '
+                    'download. Took {:,.2f} seconds.'.format(
+                        feed_name, time.time() - start_time))
+                return 'unchanged', manifest_entry
+            if e.code not in retry_status_codes or attempt >= max_retries:
+                log(msg_no_connection_w_status.format(feed_url, e.code),
+                    level=lg.ERROR)
+                return 'failed', None
+            retry_after = e.headers.get('Retry-After') if e.headers else None
+            if retry_after is not None and retry_after.isdigit():
+                pause = float(retry_after)
+            log(msg_retry.format(
+                feed_url, 'status code {} and no data'.format(e.code),
+                pause), level=lg.WARNING)
+        except URLError as e:
+            if not isinstance(e.reason, _TRANSIENT_URL_ERRORS) or \
+                    attempt >= max_retries:
+                log(msg_no_connection.format(
+                    feed_url, traceback.format_exc()), level=lg.ERROR)
+                return 'failed', None
+            log(msg_retry.format(feed_url, 'error: {}'.format(e.reason),
+                                 pause), level=lg.WARNING)
+        except socket.timeout:
+            if attempt >= max_retries:
+                log(msg_no_connection.format(
+                    feed_url, traceback.format_exc()), level=lg.ERROR)
+                return 'failed', None
+            log(msg_retry.format(feed_url, 'no response', pause),
+                level=lg.WARNING)
+        except Exception:
+            log(msg_no_connection.format(feed_url, traceback.format_exc()),
+                level=lg.ERROR)
+            return 'failed', None
+        attempt += 1
+        time.sleep(pause)
+
+
+def _unzip(zip_rootpath, delete_zips=True, subset=None):
     """
     unzip all GTFS feed zipfiles in a root directory with resulting text files
     in the root folder: gtfsfeed_text
@@ -554,6 +827,9 @@ def _unzip(zip_rootpath, delete_zips=True):
         root directory to place downloaded GTFS feed zipfiles
     delete_zips : bool, optional
         if true the downloaded zipfiles will be removed
+    subset : list, optional
+        list of zipfile names in zip_rootpath to unzip. If None, all
+        zipfiles in zip_rootpath will be unzipped
 
     Returns
     -------
@@ -571,6 +847,9 @@ def _unzip(zip_rootpath, delete_zips=True):
 
     zipfilelist = [zipfilename for zipfilename in os.listdir(zip_rootpath) if
                    zipfilename.endswith(".zip")]
+    if subset is not None:
+        zipfilelist = [zipfilename for zipfilename in zipfilelist if
+                       zipfilename in subset]
     if len(zipfilelist) == 0:
         raise ValueError('No zipfiles were found in specified '
                          'directory: {}'.format(zip_rootpath))
@@ -605,14 +884,60 @@ def _unzip(zip_rootpath, delete_zips=True):
             time.time() - start_time, len(zipfilelist)))
 
 
-def _zipfile_type_check(file, feed_url_value):
+def _stream_to_file(file, file_path, feed_url_value,
+                    chunksize=_DOWNLOAD_CHUNKSIZE):
     """
-    zipfile format checker helper
+    Stream a downloaded GTFS feed zipfile to disk in fixed size chunks.
+    The zipfile is written to a temporary file in the same directory that
+    is renamed to file_path once the download completes so a partial
+    download never replaces an existing zipfile
 
     Parameters
     ----------
     file : addinfourl
-        loaded zipfile object in memory
+        open response of the GTFS feed zipfile request
+    file_path : str
+        path to save the GTFS feed zipfile to
+    feed_url_value : str
+        URL to download GTFS feed zipfile
+    chunksize : int, optional
+        number of bytes to read and write at a time
+
+    Returns
+    -------
+    sha256 : str
+        hex digest of the SHA-256 hash of the downloaded zipfile
+    """
+    sha256 = hashlib.sha256()
+    tmp_path = '{}.part'.format(file_path)
+    try:
+        with open(tmp_path, 'wb') as local_file:
+            chunk = file.read(chunksize)
+            _zipfile_type_check(
+                content_type=file.info().get('Content-Type'),
+                first_chunk=chunk, feed_url_value=feed_url_value)
+            while chunk:
+                sha256.update(chunk)
+                local_file.write(chunk)
+                chunk = file.read(chunksize)
+        _replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return sha256.hexdigest()
+
+
+def _zipfile_type_check(content_type, first_chunk, feed_url_value):
+    """
+    zipfile format checker helper that checks the zipfile signature at the
+    start of the first chunk of a download
+
+    Parameters
+    ----------
+    content_type : str
+        Content-Type header of the response, used in the error message
+    first_chunk : bytes
+        first bytes of the downloaded data
     feed_url_value : str
         URL to download GTFS feed zipfile
 
@@ -620,8 +945,8 @@ def _zipfile_type_check(file, feed_url_value):
     -------
     nothing
     """
-    if 'zip' not in file.info().get('Content-Type') is True \
-            or 'octet' not in file.info().get('Content-Type') is True:
+    if not first_chunk.startswith(_ZIP_SIGNATURES):
         raise ValueError(
             'data requested at {} is not a zipfile. '
-            'Data must be a zipfile'.format(feed_url_value))
+            'Data must be a zipfile. Content-Type: {}'.format(
+                feed_url_value, content_type))
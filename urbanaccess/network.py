@@ -4,7 +4,10 @@ import geopy
 from geopy import distance
 
 from sklearn.neighbors import KDTree
+import numpy as np
 import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 
 from urbanaccess.utils import log, df_to_hdf5, hdf5_to_df
 from urbanaccess import config
@@ -81,8 +84,61 @@ def _nearest_neighbor(df1, df2):
     return df1.index.values[indexes]
 
 
+def _edges_to_csgraph(edge_df, node_index, weight_col='weight',
+                      from_col='from_int', to_col='to_int'):
+    """
+    Build a sparse adjacency matrix from an edge DataFrame for use with
+    scipy.sparse.csgraph routines. Rows and columns are the positions of
+    the nodes in node_index. Where there are parallel edges between the
+    same pair of nodes only the edge with the lowest weight is kept.
+
+    Parameters
+    ----------
+    edge_df : pandas.DataFrame
+        edge DataFrame with from, to and weight columns
+    node_index : pandas.Index
+        index of node IDs that defines the matrix positions of each node
+    weight_col : str, optional
+        name of the edge weight column
+    from_col : str, optional
+        name of the column with the edge origin node ID
+    to_col : str, optional
+        name of the column with the edge destination node ID
+
+    Returns
+    -------
+    graph : scipy.sparse.csr_matrix
+    """
+    from_pos = node_index.get_indexer(edge_df[from_col])
+    to_pos = node_index.get_indexer(edge_df[to_col])
+    weights = edge_df[weight_col].to_numpy(dtype=float)
+
+    valid = (from_pos >= 0) & (to_pos >= 0) & ~np.isnan(weights)
+    from_pos = from_pos[valid]
+    to_pos = to_pos[valid]
+    weights = weights[valid]
+
+    # keep the lowest weight edge when there are parallel edges, the sparse
+    # matrix constructor would otherwise sum their weights
+    order = np.lexsort((weights, to_pos, from_pos))
+    from_pos = from_pos[order]
+    to_pos = to_pos[order]
+    weights = weights[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (from_pos[1:] != from_pos[:-1]) | (to_pos[1:] != to_pos[:-1])
+
+    node_cnt = len(node_index)
+    graph = csr_matrix(
+        (weights[first], (from_pos[first], to_pos[first])),
+        shape=(node_cnt, node_cnt))
+
+    return graph
+
+
 def integrate_network(urbanaccess_network, headways=False,
-                      urbanaccess_gtfsfeeds_df=None, headway_statistic='mean'):
+                      urbanaccess_gtfsfeeds_df=None, headway_statistic='mean',
+                      compact=False, osm_max_distance=None,
+                      osm_keep_nodes=None):
     """
     Create an integrated network comprised of transit and OSM nodes and edges
     by connecting the transit network with the OSM network.
@@ -105,6 +161,25 @@ def integrate_network(urbanaccess_network, headways=False,
         required if headways is true; route stop headway
         statistic to apply to the OSM to transit connector edges:
         mean, std, min, max. Default is mean.
+    compact : bool, optional
+        if true, the net_edges and net_nodes DataFrames are stored with
+        compact dtypes: int32 for the from_int, to_int and id_int node IDs,
+        float32 for weights and coordinates where the loss in precision is
+        negligible, and categorical for low cardinality string columns
+        such as net_type and unique_agency_id. Compact dtypes are preserved
+        when the network is saved with save_network() and read with
+        load_network()
+    osm_max_distance : float, optional
+        if specified, the OSM network is pruned before it is integrated to
+        only the OSM nodes and edges within this network distance in meters
+        of the OSM nodes nearest to the transit stops and of the nodes in
+        osm_keep_nodes. OSM nodes further away from transit than this
+        distance are removed from urbanaccess_network.osm_nodes and
+        urbanaccess_network.osm_edges
+    osm_keep_nodes : list, optional
+        list of additional OSM node IDs to measure osm_max_distance from
+        when osm_max_distance is specified. For example, the OSM nodes
+        nearest to the centroids of study zones
 
     Returns
     -------
@@ -138,6 +213,26 @@ def integrate_network(urbanaccess_network, headways=False,
 
     if not isinstance(headways, bool):
         raise ValueError('headways must be bool type')
+    if not isinstance(compact, bool):
+        raise ValueError('compact must be bool type')
+    if osm_max_distance is not None:
+        if not isinstance(osm_max_distance, (int, float)) or \
+                osm_max_distance <= 0:
+            raise ValueError('osm_max_distance must be a number greater '
+                             'than 0.')
+        if 'distance' not in urbanaccess_network.osm_edges.columns:
+            raise ValueError('osm_edges must have a distance column to use '
+                             'osm_max_distance.')
+        source_nodes = pd.Index(_nearest_neighbor(
+            urbanaccess_network.osm_nodes[['x', 'y']],
+            urbanaccess_network.transit_nodes[['x', 'y']]).ravel())
+        if osm_keep_nodes is not None:
+            source_nodes = source_nodes.append(pd.Index(osm_keep_nodes))
+        urbanaccess_network.osm_edges, urbanaccess_network.osm_nodes = \
+            _prune_osm_network(osm_edges=urbanaccess_network.osm_edges,
+                               osm_nodes=urbanaccess_network.osm_nodes,
+                               source_nodes=source_nodes,
+                               max_distance=osm_max_distance)
 
     if headways:
 
@@ -216,6 +311,15 @@ def integrate_network(urbanaccess_network, headways=False,
          urbanaccess_network.osm_edges,
          urbanaccess_network.net_connector_edges], axis=0)
 
+    # scenario travel time columns only exist on transit edges, all other
+    # edges use their base travel time in every scenario
+    scenario_cols = urbanaccess_network.net_edges.columns[
+        urbanaccess_network.net_edges.columns.str.match(r'^weight_s\d+$')]
+    for col in scenario_cols:
+        urbanaccess_network.net_edges[col] = \
+            urbanaccess_network.net_edges[col].fillna(
+                urbanaccess_network.net_edges['weight'])
+
     urbanaccess_network.net_nodes = pd.concat(
         [urbanaccess_network.transit_nodes,
          urbanaccess_network.osm_nodes], axis=0)
@@ -224,6 +328,12 @@ def integrate_network(urbanaccess_network, headways=False,
         _format_pandana_edges_nodes(edge_df=urbanaccess_network.net_edges,
                                     node_df=urbanaccess_network.net_nodes)
 
+    if compact:
+        urbanaccess_network.net_edges = _compact_dtypes(
+            urbanaccess_network.net_edges)
+        urbanaccess_network.net_nodes = _compact_dtypes(
+            urbanaccess_network.net_nodes)
+
     success_msg_1 = ('Network edge and node network integration completed '
                      'successfully resulting in a total of {:,} nodes '
                      'and {:,} edges:')
@@ -241,6 +351,57 @@ def integrate_network(urbanaccess_network, headways=False,
     return urbanaccess_network
 
 
+def _prune_osm_network(osm_edges, osm_nodes, source_nodes, max_distance):
+    """
+    Prune an OSM network to the nodes within a network distance of a set of
+    source nodes and the edges between them using a multi-source Dijkstra
+    search bounded by the distance
+
+    Parameters
+    ----------
+    osm_edges : pandas.DataFrame
+        OSM edge DataFrame with from, to and distance columns
+    osm_nodes : pandas.DataFrame
+        OSM node DataFrame
+    source_nodes : pandas.Index
+        OSM node IDs to measure the network distance from
+    max_distance : float
+        network distance in meters
+
+    Returns
+    -------
+    osm_edges, osm_nodes : pandas.DataFrame
+    """
+    start_time = time.time()
+
+    graph = _edges_to_csgraph(osm_edges, osm_nodes.index,
+                              weight_col='distance', from_col='from',
+                              to_col='to')
+    source_pos = osm_nodes.index.get_indexer(source_nodes.unique())
+    source_pos = source_pos[source_pos >= 0]
+    if len(source_pos) == 0:
+        raise ValueError('None of the source nodes were found in the OSM '
+                         'nodes.')
+    # walking is possible in both directions along OSM edges
+    dist = dijkstra(graph, directed=False, indices=source_pos,
+                    limit=max_distance, min_only=True)
+    nodes_to_keep = np.isfinite(dist)
+
+    pruned_nodes = osm_nodes.loc[nodes_to_keep]
+    pruned_edges = osm_edges.loc[
+        osm_edges['from'].isin(pruned_nodes.index).values &
+        osm_edges['to'].isin(pruned_nodes.index).values]
+
+    log('Pruned OSM network to {:,} of {:,} nodes and {:,} of {:,} edges '
+        'within {:,} meters of {:,} transit stop and keep node(s). '
+        'Took {:,.2f} seconds'.format(
+            len(pruned_nodes), len(osm_nodes), len(pruned_edges),
+            len(osm_edges), max_distance, len(source_pos),
+            time.time() - start_time))
+
+    return pruned_edges, pruned_nodes
+
+
 def _add_headway_impedance(ped_to_transit_edges_df, headways_df,
                            headway_statistic='mean'):
     """
@@ -472,6 +633,63 @@ def _format_pandana_edges_nodes(edge_df, node_df):
     return edge_df_wnumericid, node_df
 
 
+def _compact_dtypes(df, category_ratio=0.5, float_tolerance=1e-5):
+    """
+    Downcast the columns of a network node or edge DataFrame to compact
+    dtypes: integer columns and the index are downcast to int32 if their
+    values fit, float columns are downcast to float32 if no value changes
+    by more than float_tolerance and string columns are converted to
+    categorical if the ratio of unique values to records is at most
+    category_ratio
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        node or edge DataFrame
+    category_ratio : float, optional
+        maximum ratio of unique values to records for a string column to be
+        converted to categorical
+    float_tolerance : float, optional
+        maximum absolute difference allowed between a float64 value and its
+        float32 representation. The default of 1e-5 is about 1 meter in
+        decimal degrees and under a millisecond for weights in minutes
+
+    Returns
+    -------
+    df : pandas.DataFrame
+    """
+    start_time = time.time()
+    int32 = np.iinfo(np.int32)
+    mem_before = df.memory_usage(deep=True).sum()
+
+    def _to_int32(values):
+        if values.dtype.kind in 'iu' and len(values) and \
+                values.min() >= int32.min and values.max() <= int32.max:
+            return values.astype(np.int32)
+        return values
+
+    for col in df.columns:
+        values = df[col]
+        if values.dtype.kind in 'iu':
+            df[col] = _to_int32(values)
+        elif values.dtype == np.float64:
+            downcast = values.astype(np.float32)
+            diff = np.abs(downcast.astype(np.float64) - values)
+            if not (diff > float_tolerance).any():
+                df[col] = downcast
+        elif values.dtype == object and len(values) and \
+                values.map(type).eq(str).all() and \
+                values.nunique() <= category_ratio * len(values):
+            df[col] = values.astype('category')
+    df.index = _to_int32(df.index)
+
+    mem_after = df.memory_usage(deep=True).sum()
+    log('Downcast DataFrame to compact dtypes reducing memory use from '
+        '{:,.2f} MB to {:,.2f} MB. Took {:,.2f} seconds.'.format(
+         mem_before / 1e6, mem_after / 1e6, time.time() - start_time))
+    return df
+
+
 def save_network(urbanaccess_network, filename,
                  dir=config.settings.data_folder,
                  overwrite_key=False, overwrite_hdf5=False):
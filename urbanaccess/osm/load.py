@@ -1,25 +1,41 @@
 from __future__ import division
 import time
-from osmnet.load import network_from_bbox
+import os
+import re
+import gzip
+import bz2
+import glob
+import hashlib
+import numbers
+from array import array
+from xml.etree import ElementTree
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+import osmnet
+from osmnet.load import network_from_bbox, osm_filter
+from osmnet import config as osmnet_config
 
-import pandana
-from pandana import Network
+from urbanaccess.utils import log, _replace
 
-from urbanaccess.utils import log
+# network types supported when reading OSM files, the way filters of each
+# are parsed from the Overpass API query filter used by osmnet
+_OSM_NETWORK_TYPES = ['walk', 'drive']
+# a single tag filter in an osmnet Overpass API query filter that excludes a
+# way if the value of the tag matches the regular expression
+_OSM_FILTER_RE = re.compile(r'\["([^"]+)"!~"([^"]*)"\]')
 
-# set the number of Pandana Networks in memory to arbitrary 40 for
-# removing low connectivity nodes
-# Note: reserve_num_graphs was removed in Pandana beginning in v0.4 but is
-# required for prior versions
-if pandana.__version__[:3] in ['0.1', '0.2', '0.3']:
-    pandana.network.reserve_num_graphs(40)
+# radius of the earth in meters used by osmnet to compute edge distances
+_EARTH_RADIUS = 6372795
 
 
 def ua_network_from_bbox(lat_min=None, lng_min=None, lat_max=None,
                          lng_max=None, bbox=None, network_type='walk',
                          timeout=180, memory=None,
                          max_query_area_size=50 * 1000 * 50 * 1000,
-                         remove_lcn=True):
+                         remove_lcn=True, cache_dir=None,
+                         lcn_min_component_size=10):
     """
     Make a graph network (nodes and edges) from a bounding lat/lon box that
     is compatible with the network analysis tool Pandana
@@ -60,6 +76,18 @@ def ua_network_from_bbox(lat_min=None, lng_min=None, lat_max=None,
         this ensures the resulting network does
         not have nodes that are unconnected
         from the rest of the larger network
+    cache_dir : str, optional
+        if specified, the downloaded nodes and edges are saved to a HDF5 file
+        in this directory keyed by the bbox, network_type and osmnet
+        version and are read from the cache instead of being downloaded
+        again on the following runs. A bbox that is inside a cached bbox is
+        served by clipping the cached network to the bbox which keeps the
+        nodes inside the bbox and the edges between them. The directory will
+        be created if it does not exist
+    lcn_min_component_size : int, optional
+        when remove_lcn is true, nodes in strongly connected components of
+        the network with fewer nodes than this are removed. If None, only
+        the nodes in the largest component are kept
 
     Returns
     -------
@@ -73,43 +101,624 @@ def ua_network_from_bbox(lat_min=None, lng_min=None, lat_max=None,
     # so that all edges in integrated network are all one way edges
     two_way = False
 
-    nodes, edges = network_from_bbox(lat_min=lat_min, lng_min=lng_min,
-                                     lat_max=lat_max, lng_max=lng_max,
-                                     bbox=bbox, network_type=network_type,
-                                     two_way=two_way, timeout=timeout,
-                                     memory=memory,
-                                     max_query_area_size=max_query_area_size)
+    cached = None
+    if cache_dir is not None:
+        if not isinstance(cache_dir, str):
+            raise ValueError('cache_dir must be a string.')
+        if bbox is not None:
+            bounds = (bbox[0], bbox[1], bbox[2], bbox[3])
+        else:
+            bounds = (lng_max, lat_min, lng_min, lat_max)
+        if any(value is None for value in bounds):
+            raise ValueError('bbox or lat_min, lng_min, lat_max and lng_max '
+                             'must be specified.')
+        # bounds as (west, south, east, north)
+        bounds = (min(bounds[0], bounds[2]), min(bounds[1], bounds[3]),
+                  max(bounds[0], bounds[2]), max(bounds[1], bounds[3]))
+        cached = _read_osm_cache(cache_dir=cache_dir, bounds=bounds,
+                                 network_type=network_type, two_way=two_way)
+
+    if cached is not None:
+        nodes, edges = cached
+    else:
+        nodes, edges = network_from_bbox(
+            lat_min=lat_min, lng_min=lng_min, lat_max=lat_max,
+            lng_max=lng_max, bbox=bbox, network_type=network_type,
+            two_way=two_way, timeout=timeout, memory=memory,
+            max_query_area_size=max_query_area_size)
+        if cache_dir is not None:
+            _write_osm_cache(cache_dir=cache_dir, bounds=bounds,
+                             network_type=network_type, two_way=two_way,
+                             nodes=nodes, edges=edges)
 
     # remove low connectivity nodes and return cleaned nodes and edges
     if remove_lcn:
-        log('Checking for low connectivity nodes...')
-        pandana_net = Network(nodes['x'], nodes['y'],
-                              edges['from'], edges['to'], edges[['distance']])
-        lcn = pandana_net.low_connectivity_nodes(impedance=10000, count=10,
-                                                 imp_name='distance')
-        log(
-            '{:,} out of {:,} nodes ({:.2f} percent of total) were '
-            'identified as having low connectivity and have '
-            'been removed.'.format(len(lcn), len(nodes),
-                                   (len(lcn) / len(nodes)) * 100))
+        nodes, edges = _remove_lcn(
+            nodes=nodes, edges=edges,
+            min_component_size=lcn_min_component_size)
+
+    log('Completed OSM data download and graph node and edge table '
+        'creation in {:,.2f} seconds'.format(time.time() - start_time))
 
-        rm_nodes = set(lcn)
+    return nodes, edges
 
-        nodes_to_keep = ~nodes.index.isin(rm_nodes)
-        edges_to_keep = ~(
-            edges['from'].isin(rm_nodes) | edges['to'].isin(rm_nodes))
 
-        nodes = nodes.loc[nodes_to_keep]
-        edges = edges.loc[edges_to_keep]
+def _osm_cache_key(bounds, network_type, two_way):
+    """
+    Create the key of an OSM network in the OSM network cache
+
+    Parameters
+    ----------
+    bounds : tuple
+        bounding box of the network as (west, south, east, north)
+    network_type : str
+        network type of the network
+    two_way : bool
+        two_way parameter used to create the network
+
+    Returns
+    -------
+    cache_key : str
+    """
+    key = '{:.8f},{:.8f},{:.8f},{:.8f}|{}|{}|{}'.format(
+        bounds[0], bounds[1], bounds[2], bounds[3], network_type, two_way,
+        osmnet.__version__)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
 
-        log('Completed OSM data download and graph node and edge table '
-            'creation in {:,.2f} seconds'.format(time.time() - start_time))
 
+def _read_osm_cache(cache_dir, bounds, network_type, two_way):
+    """
+    Read an OSM network from the OSM network cache. An exact match of the
+    bounding box is used if it exists, otherwise the smallest cached network
+    with a bounding box that contains the bounding box is clipped to it
+
+    Parameters
+    ----------
+    cache_dir : str
+        directory of the OSM network cache
+    bounds : tuple
+        bounding box of the network as (west, south, east, north)
+    network_type : str
+        network type of the network
+    two_way : bool
+        two_way parameter used to create the network
+
+    Returns
+    -------
+    nodes, edges : tuple
+        nodes and edges DataFrames or None if no cached network matches
+    """
+    if not os.path.exists(cache_dir):
+        return None
+
+    exact_path = os.path.join(cache_dir, 'osm_{}.h5'.format(
+        _osm_cache_key(bounds=bounds, network_type=network_type,
+                       two_way=two_way)))
+    if os.path.exists(exact_path):
+        with pd.HDFStore(exact_path, mode='r') as store:
+            nodes, edges = store.get('nodes'), store.get('edges')
+        log('OSM network read from cache: {}'.format(exact_path))
         return nodes, edges
 
+    # find the smallest cached bbox that contains the bbox
+    containing_path, containing_area = None, None
+    for cache_path in glob.glob(os.path.join(cache_dir, 'osm_*.h5')):
+        try:
+            with pd.HDFStore(cache_path, mode='r') as store:
+                meta = store.get('meta').iloc[0]
+        except Exception:
+            continue
+        if meta['network_type'] != network_type or \
+                meta['two_way'] != two_way or \
+                meta['osmnet_version'] != osmnet.__version__:
+            continue
+        if meta['west'] <= bounds[0] and meta['south'] <= bounds[1] and \
+                meta['east'] >= bounds[2] and meta['north'] >= bounds[3]:
+            area = (meta['east'] - meta['west']) * (
+                meta['north'] - meta['south'])
+            if containing_area is None or area < containing_area:
+                containing_path, containing_area = cache_path, area
+    if containing_path is None:
+        return None
+
+    with pd.HDFStore(containing_path, mode='r') as store:
+        nodes, edges = store.get('nodes'), store.get('edges')
+    nodes_to_keep = (nodes['x'].between(bounds[0], bounds[2]) &
+                     nodes['y'].between(bounds[1], bounds[3]))
+    nodes = nodes.loc[nodes_to_keep]
+    edges = edges.loc[edges['from'].isin(nodes.index) &
+                      edges['to'].isin(nodes.index)]
+    log('OSM network clipped to bbox from the network in cache: {}'.format(
+        containing_path))
+    return nodes, edges
+
+
+def _write_osm_cache(cache_dir, bounds, network_type, two_way, nodes,
+                     edges):
+    """
+    Write an OSM network to the OSM network cache
+
+    Parameters
+    ----------
+    cache_dir : str
+        directory of the OSM network cache
+    bounds : tuple
+        bounding box of the network as (west, south, east, north)
+    network_type : str
+        network type of the network
+    two_way : bool
+        two_way parameter used to create the network
+    nodes, edges : pandas.DataFrame
+        nodes and edges of the network
+
+    Returns
+    -------
+    nothing
+    """
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+        log('{} does not exist. Directory was created'.format(cache_dir))
+    cache_path = os.path.join(cache_dir, 'osm_{}.h5'.format(
+        _osm_cache_key(bounds=bounds, network_type=network_type,
+                       two_way=two_way)))
+    meta = pd.DataFrame([{'west': bounds[0], 'south': bounds[1],
+                          'east': bounds[2], 'north': bounds[3],
+                          'network_type': network_type, 'two_way': two_way,
+                          'osmnet_version': osmnet.__version__}])
+    # the file is written to a temporary path first so that an interrupted
+    # write does not leave a partial cache. 'table' format stores OSM tag
+    # columns as strings instead of pickling them, so the non-null values
+    # of object columns are cast to str
+    tmp_path = '{}.part'.format(cache_path)
+    with pd.HDFStore(tmp_path, mode='w') as store:
+        store.put('nodes', _str_object_cols(nodes), format='table')
+        store.put('edges', _str_object_cols(edges), format='table')
+        store.put('meta', meta, format='table')
+    _replace(tmp_path, cache_path)
+    log('OSM network written to cache: {}'.format(cache_path))
+
+
+def _str_object_cols(df):
+    """
+    Cast the non-null values of object columns in a DataFrame to str
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        DataFrame to cast the object columns of
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        copy of the DataFrame if it has object columns
+    """
+    object_cols = df.select_dtypes(include=[object]).columns
+    if len(object_cols) == 0:
+        return df
+    df = df.copy()
+    for col in object_cols:
+        df[col] = df[col].where(df[col].isnull(), df[col].astype(str))
+    return df
+
+
+def _remove_lcn(nodes, edges, min_component_size=10):
+    """
+    Remove low connectivity nodes and the edges connected to them from a
+    graph network. Low connectivity nodes are nodes in strongly connected
+    components of the network that are smaller than min_component_size
+
+    Parameters
+    ----------
+    nodes : pandas.DataFrame
+        graph nodes
+    edges : pandas.DataFrame
+        graph edges with from and to columns
+    min_component_size : int, optional
+        minimum number of nodes in a strongly connected component for its
+        nodes to be kept. If None, only the nodes in the largest component
+        are kept
+
+    Returns
+    -------
+    nodes, edges : pandas.DataFrame
+    """
+    if min_component_size is not None and (
+            not isinstance(min_component_size, numbers.Integral) or
+            isinstance(min_component_size, bool) or
+            min_component_size < 1):
+        raise ValueError('lcn_min_component_size must be an integer greater '
+                         'than 0 or None.')
+    start_time = time.time()
+    log('Checking for low connectivity nodes...')
+    if len(nodes) == 0:
+        log('Network has no nodes. No low connectivity nodes were removed.')
+        return nodes, edges.iloc[:0]
+
+    from_pos = nodes.index.get_indexer(edges['from'])
+    to_pos = nodes.index.get_indexer(edges['to'])
+    valid = (from_pos >= 0) & (to_pos >= 0)
+    node_cnt = len(nodes)
+    graph = coo_matrix(
+        (np.ones(valid.sum(), dtype=np.int8),
+         (from_pos[valid], to_pos[valid])),
+        shape=(node_cnt, node_cnt)).tocsr()
+    component_cnt, labels = connected_components(
+        graph, directed=True, connection='strong')
+    component_sizes = np.bincount(labels, minlength=component_cnt)
+    if min_component_size is None:
+        keep_components = np.arange(component_cnt) == np.argmax(
+            component_sizes)
     else:
+        keep_components = component_sizes >= min_component_size
+    nodes_to_keep = keep_components[labels]
+    rm_cnt = (~nodes_to_keep).sum()
 
-        log('Completed OSM data download and graph node and edge table '
-            'creation in {:,.2f} seconds'.format(time.time() - start_time))
+    log(
+        '{:,} out of {:,} nodes ({:.2f} percent of total) in {:,} of {:,} '
+        'connected components were identified as having low connectivity '
+        'and have been removed. Took {:,.2f} seconds'.format(
+            rm_cnt, node_cnt, (rm_cnt / node_cnt) * 100,
+            (~keep_components).sum(), component_cnt,
+            time.time() - start_time))
 
-        return nodes, edges
+    nodes = nodes.loc[nodes_to_keep]
+    edges = edges.loc[edges['from'].isin(nodes.index) &
+                      edges['to'].isin(nodes.index)]
+
+    return nodes, edges
+
+
+def ua_network_from_file(filepath, bbox=None, network_type='walk',
+                         remove_lcn=True, lcn_min_component_size=10):
+    """
+    Make a graph network (nodes and edges) from a local OpenStreetMap
+    extract file that is compatible with the network analysis tool Pandana.
+    The resulting nodes and edges are the same as those returned by
+    ua_network_from_bbox for the same area without querying the Overpass API
+
+    Parameters
+    ----------
+    filepath : str
+        path to the OSM extract file. Supports OSM XML files with the
+        extension: .osm or .xml which can be compressed as .gz or .bz2 and
+        OSM PBF files with the extension: .pbf. Reading PBF files requires
+        the optional osmium package
+    bbox : tuple, optional
+        Bounding box formatted as a 4 element tuple:
+        (lng_max, lat_min, lng_min, lat_max)
+        example: (-122.304611,37.798933,-122.263412,37.822802)
+        a bbox can be extracted for an area using: the CSV format
+        bbox from http://boundingbox.klokantech.com/. If specified, only
+        ways with at least one node inside the bbox are kept. If None, all
+        ways in the file are used
+    network_type : {'walk', 'drive'}, optional
+        Specify the network type where value of 'walk' includes roadways
+        where pedestrians are allowed and pedestrian
+        pathways and 'drive' includes driveable roadways. Default is walk.
+    remove_lcn : bool, optional
+        remove low connectivity nodes from the resulting network.
+        this ensures the resulting network does
+        not have nodes that are unconnected
+        from the rest of the larger network
+    lcn_min_component_size : int, optional
+        when remove_lcn is true, nodes in strongly connected components of
+        the network with fewer nodes than this are removed. If None, only
+        the nodes in the largest component are kept
+
+    Returns
+    -------
+    nodesfinal, edgesfinal : pandas.DataFrame
+
+    """
+    start_time = time.time()
+
+    if not isinstance(filepath, str):
+        raise ValueError('filepath must be a string.')
+    if not os.path.exists(filepath):
+        raise ValueError('{} does not exist.'.format(filepath))
+    if network_type not in _OSM_NETWORK_TYPES:
+        raise ValueError('network_type must be one of: {}.'.format(
+            _OSM_NETWORK_TYPES))
+    if bbox is not None:
+        if not isinstance(bbox, tuple) or len(bbox) != 4:
+            raise ValueError('bbox must be a 4 element tuple.')
+
+    way_filter = _osm_way_filter(network_type)
+    keep_tags = osmnet_config.settings.keep_osm_tags
+    if filepath.endswith('.pbf'):
+        nodes, ways, waynodes = _parse_osm_pbf(
+            filepath=filepath, way_filter=way_filter, keep_tags=keep_tags)
+    else:
+        nodes, ways, waynodes = _parse_osm_xml(
+            filepath=filepath, way_filter=way_filter, keep_tags=keep_tags)
+    log('Read {:,} nodes and {:,} {} ways from: {}. Took {:,.2f} '
+        'seconds'.format(len(nodes), len(ways), network_type, filepath,
+                         time.time() - start_time))
+
+    nodes, edges = _osm_node_pairs(nodes=nodes, ways=ways, waynodes=waynodes,
+                                   bbox=bbox)
+    log('Returning processed graph with {:,} nodes and {:,} edges...'.format(
+        len(nodes), len(edges)))
+
+    if remove_lcn:
+        nodes, edges = _remove_lcn(
+            nodes=nodes, edges=edges,
+            min_component_size=lcn_min_component_size)
+
+    log('Completed OSM extract file read and graph node and edge table '
+        'creation in {:,.2f} seconds'.format(time.time() - start_time))
+
+    return nodes, edges
+
+
+def _osm_way_filter(network_type):
+    """
+    Create the OSM way tag filters of a network type from the Overpass API
+    query filter used by osmnet so that networks read from files match
+    networks downloaded with osmnet
+
+    Parameters
+    ----------
+    network_type : {'walk', 'drive'}
+        network type
+
+    Returns
+    -------
+    way_filter : dict
+        dictionary of the tag (key) and compiled regular expression (value)
+        that excludes a way if the tag value matches it
+    """
+    return {tag: re.compile(pattern) for tag, pattern in
+            _OSM_FILTER_RE.findall(osm_filter(network_type))}
+
+
+def _keep_way(tags, way_filter):
+    """
+    Check if an OSM way is part of the network using its tags
+
+    Parameters
+    ----------
+    tags : dict
+        dictionary of the OSM way tags
+    way_filter : dict
+        dictionary of the tag (key) and compiled regular expression (value)
+        that excludes a way if the tag value matches it
+
+    Returns
+    -------
+    keep : bool
+    """
+    if 'highway' not in tags:
+        return False
+    for tag, pattern in way_filter.items():
+        value = tags.get(tag)
+        if value is not None and pattern.search(value):
+            return False
+    return True
+
+
+def _osm_tables(node_ids, node_lats, node_lons, way_ids, way_tags,
+                waynode_way_ids, waynode_node_ids):
+    """
+    Create the nodes, ways and waynodes DataFrames from the arrays read from
+    an OSM extract file
+
+    Parameters
+    ----------
+    node_ids, node_lats, node_lons : array
+        ID, latitude and longitude of all nodes in the file
+    way_ids : array
+        ID of the ways that are part of the network
+    way_tags : list
+        list of dictionaries of the kept tags of the ways in way_ids
+    waynode_way_ids, waynode_node_ids : array
+        way ID and node ID of the nodes of the ways in way_ids in the order
+        they appear in the way
+
+    Returns
+    -------
+    nodes, ways, waynodes : pandas.DataFrame
+    """
+    nodes = pd.DataFrame(
+        {'lat': np.frombuffer(node_lats, dtype=np.float64),
+         'lon': np.frombuffer(node_lons, dtype=np.float64)},
+        index=pd.Index(np.frombuffer(node_ids, dtype=np.int64), name='id'))
+    ways = pd.DataFrame.from_records(way_tags, columns=None)
+    ways.index = pd.Index(np.frombuffer(way_ids, dtype=np.int64), name='id')
+    waynodes = pd.DataFrame(
+        {'node_id': np.frombuffer(waynode_node_ids, dtype=np.int64)},
+        index=pd.Index(np.frombuffer(waynode_way_ids, dtype=np.int64),
+                       name='way_id'))
+    return nodes, ways, waynodes
+
+
+def _parse_osm_xml(filepath, way_filter, keep_tags):
+    """
+    Stream an OSM XML file with an iterative parser and read all nodes and
+    the ways that are part of the network
+
+    Parameters
+    ----------
+    filepath : str
+        path to the OSM XML file, optionally compressed as .gz or .bz2
+    way_filter : dict
+        dictionary of the tag (key) and compiled regular expression (value)
+        that excludes a way if the tag value matches it
+    keep_tags : list
+        list of OSM way tags to keep
+
+    Returns
+    -------
+    nodes, ways, waynodes : pandas.DataFrame
+    """
+    if filepath.endswith('.gz'):
+        f = gzip.open(filepath, 'rb')
+    elif filepath.endswith('.bz2'):
+        f = bz2.BZ2File(filepath, 'rb')
+    else:
+        f = open(filepath, 'rb')
+
+    node_ids, node_lats, node_lons = array('q'), array('d'), array('d')
+    way_ids, way_tags = array('q'), []
+    waynode_way_ids, waynode_node_ids = array('q'), array('q')
+    with f:
+        context = ElementTree.iterparse(f, events=('start', 'end'))
+        root = None
+        for event, elem in context:
+            if root is None:
+                root = elem
+            if event != 'end':
+                continue
+            if elem.tag == 'node':
+                node_ids.append(int(elem.get('id')))
+                node_lats.append(float(elem.get('lat')))
+                node_lons.append(float(elem.get('lon')))
+            elif elem.tag == 'way':
+                tags = {tag.get('k'): tag.get('v') for tag in
+                        elem.iter('tag')}
+                if _keep_way(tags, way_filter):
+                    way_id = int(elem.get('id'))
+                    refs = [int(nd.get('ref')) for nd in elem.iter('nd')]
+                    way_ids.append(way_id)
+                    way_tags.append({tag: value for tag, value in
+                                     tags.items() if tag in keep_tags})
+                    waynode_way_ids.extend([way_id] * len(refs))
+                    waynode_node_ids.extend(refs)
+            else:
+                continue
+            # free the memory of elements that have been read
+            root.clear()
+
+    return _osm_tables(node_ids, node_lats, node_lons, way_ids, way_tags,
+                       waynode_way_ids, waynode_node_ids)
+
+
+def _parse_osm_pbf(filepath, way_filter, keep_tags):
+    """
+    Read all nodes and the ways that are part of the network from an OSM PBF
+    file using osmium
+
+    Parameters
+    ----------
+    filepath : str
+        path to the OSM PBF file
+    way_filter : dict
+        dictionary of the tag (key) and compiled regular expression (value)
+        that excludes a way if the tag value matches it
+    keep_tags : list
+        list of OSM way tags to keep
+
+    Returns
+    -------
+    nodes, ways, waynodes : pandas.DataFrame
+    """
+    try:
+        import osmium
+    except ImportError:
+        raise ImportError('osmium is required to read OSM PBF files. '
+                          'Install it with: pip install osmium')
+
+    node_ids, node_lats, node_lons = array('q'), array('d'), array('d')
+    way_ids, way_tags = array('q'), []
+    waynode_way_ids, waynode_node_ids = array('q'), array('q')
+
+    class osm_handler(osmium.SimpleHandler):
+        def node(self, n):
+            node_ids.append(n.id)
+            node_lats.append(n.location.lat)
+            node_lons.append(n.location.lon)
+
+        def way(self, w):
+            tags = {tag.k: tag.v for tag in w.tags}
+            if _keep_way(tags, way_filter):
+                refs = [nd.ref for nd in w.nodes]
+                way_ids.append(w.id)
+                way_tags.append({tag: value for tag, value in
+                                 tags.items() if tag in keep_tags})
+                waynode_way_ids.extend([w.id] * len(refs))
+                waynode_node_ids.extend(refs)
+
+    osm_handler().apply_file(filepath)
+
+    return _osm_tables(node_ids, node_lats, node_lons, way_ids, way_tags,
+                       waynode_way_ids, waynode_node_ids)
+
+
+def _osm_node_pairs(nodes, ways, waynodes, bbox=None):
+    """
+    Create the graph nodes and edges between the intersection nodes of
+    consecutive nodes in each way with distances computed using the
+    Haversine formula. Edges are created in both directions
+
+    Parameters
+    ----------
+    nodes : pandas.DataFrame
+        all OSM nodes with lat and lon columns
+    ways : pandas.DataFrame
+        OSM ways that are part of the network and their kept tags
+    waynodes : pandas.DataFrame
+        OSM way IDs (index) and node IDs in the order they appear in the way
+    bbox : tuple, optional
+        bounding box formatted as a 4 element tuple:
+        (lng_max, lat_min, lng_min, lat_max). If specified, only ways with
+        at least one node inside the bbox are kept
+
+    Returns
+    -------
+    nodesfinal, edgesfinal : pandas.DataFrame
+    """
+    # nodes outside of an extract can be referenced by ways but do not
+    # exist in the extract
+    waynodes = waynodes[waynodes['node_id'].isin(nodes.index)]
+
+    if bbox is not None:
+        lng_min, lng_max = sorted([bbox[0], bbox[2]])
+        lat_min, lat_max = sorted([bbox[1], bbox[3]])
+        node_coords = nodes.loc[waynodes['node_id']]
+        in_bbox = (node_coords['lon'].between(lng_min, lng_max) &
+                   node_coords['lat'].between(lat_min, lat_max)).values
+        ways_in_bbox = waynodes.index[in_bbox].unique()
+        waynodes = waynodes[waynodes.index.isin(ways_in_bbox)]
+        ways = ways[ways.index.isin(ways_in_bbox)]
+
+    # nodes that appear 2 or more times in ways are intersections
+    counts = waynodes['node_id'].value_counts()
+    intersections = counts.index[counts > 1]
+    waynodes = waynodes[waynodes['node_id'].isin(intersections)]
+
+    way_id = waynodes.index.values
+    node_id = waynodes['node_id'].values
+    pair = (way_id[:-1] == way_id[1:]) & (node_id[:-1] != node_id[1:])
+    from_id = node_id[:-1][pair]
+    to_id = node_id[1:][pair]
+    pair_way_id = way_id[:-1][pair]
+    if len(from_id) == 0:
+        raise ValueError('OSM extract resulted in no connected node pairs. '
+                         'Check the extract file or bounding box.')
+
+    from_coords = np.radians(nodes.loc[from_id, ['lat', 'lon']].values)
+    to_coords = np.radians(nodes.loc[to_id, ['lat', 'lon']].values)
+    dlat = to_coords[:, 0] - from_coords[:, 0]
+    dlon = to_coords[:, 1] - from_coords[:, 1]
+    a = np.sin(dlat / 2) ** 2 + np.cos(from_coords[:, 0]) * np.cos(
+        to_coords[:, 0]) * np.sin(dlon / 2) ** 2
+    distance = np.round(2 * _EARTH_RADIUS * np.arcsin(np.sqrt(a)), 6)
+
+    # edges in both directions with the reverse edge after each edge
+    edges = pd.DataFrame(
+        {'from': np.column_stack([from_id, to_id]).ravel(),
+         'to': np.column_stack([to_id, from_id]).ravel(),
+         'distance': np.repeat(distance, 2)})
+    if not ways.empty:
+        way_tags = ways.loc[np.repeat(pair_way_id, 2)]
+        for tag in way_tags.columns:
+            edges[tag] = way_tags[tag].values
+    edges.index = pd.MultiIndex.from_arrays([edges['from'].values,
+                                             edges['to'].values])
+
+    node_ids = np.unique(np.concatenate([from_id, to_id]))
+    nodesfinal = nodes.loc[node_ids, ['lon', 'lat']]
+    nodesfinal.rename(columns={'lon': 'x', 'lat': 'y'}, inplace=True)
+    nodesfinal['id'] = nodesfinal.index
+
+    return nodesfinal, edges
@@ -1,11 +1,18 @@
 import time
+import logging as lg
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 
 from urbanaccess.utils import log
-from urbanaccess.network import ua_network
+from urbanaccess.network import ua_network, _nearest_neighbor
+from urbanaccess.gtfs.gtfsfeeds_dataframe import gtfsfeeds_dfs
 
 
 def create_osm_net(osm_edges, osm_nodes,
-                   travel_speed_mph=3, network_type='walk'):
+                   travel_speed_mph=3, network_type='walk', simplify=False,
+                   protected_nodes=None):
     """
     Create a travel time weight network graph in units of minutes from
     OpenStreetMap (OSM) nodes and edges
@@ -24,6 +31,20 @@ def create_osm_net(osm_edges, osm_nodes,
         default is 'walk' for the OSM pedestrian network.
         this string is used to label the OSM network once it is
         integrated with the transit network
+    simplify : bool, optional
+        if true, chains of nodes that only connect two other nodes (degree-2
+        nodes) are contracted into single edges with the summed distance
+        and weight of the edges in the chain. All other edge attributes are
+        those of the first edge in the chain. Intersections and dead ends
+        are always kept. The OSM nodes nearest to the transit nodes in
+        ua_network.transit_nodes or, if there are none, to the stops in
+        gtfsfeeds_dfs.stops are also kept so that transit stops are
+        connected to the same OSM nodes by integrate_network. Create the
+        transit network or load the GTFS feeds before the OSM network to
+        use this
+    protected_nodes : list, optional
+        list of additional OSM node IDs that are kept when simplify is true
+        even if they are degree-2 nodes
 
     Returns
     -------
@@ -38,6 +59,8 @@ def create_osm_net(osm_edges, osm_nodes,
     if not isinstance(network_type, str) or network_type is None:
         raise ValueError('{!s} network_type passed is either not a '
                          'string or is None'.format(network_type))
+    if not isinstance(simplify, bool):
+        raise ValueError('simplify must be bool.')
 
     # assign impedance to OSM edges
     osm_edges['weight'] = (osm_edges[
@@ -47,6 +70,13 @@ def create_osm_net(osm_edges, osm_nodes,
     osm_edges['net_type'] = network_type
     osm_nodes['net_type'] = network_type
 
+    if simplify:
+        protected_nodes = _transit_protected_nodes(
+            osm_nodes=osm_nodes, protected_nodes=protected_nodes)
+        osm_edges, osm_nodes = _simplify_osm_network(
+            osm_edges=osm_edges, osm_nodes=osm_nodes,
+            protected_nodes=protected_nodes)
+
     ua_network.osm_nodes = osm_nodes
     ua_network.osm_edges = osm_edges
 
@@ -56,3 +86,164 @@ def create_osm_net(osm_edges, osm_nodes,
             travel_speed_mph, time.time() - start_time))
 
     return ua_network
+
+
+def _transit_protected_nodes(osm_nodes, protected_nodes=None):
+    """
+    Add the OSM nodes nearest to the transit nodes in
+    ua_network.transit_nodes or, if there are none, to the stops in
+    gtfsfeeds_dfs.stops to a list of protected OSM node IDs
+
+    Parameters
+    ----------
+    osm_nodes : pandas.DataFrame
+        OSM node DataFrame
+    protected_nodes : list, optional
+        list of OSM node IDs to add the nearest OSM nodes to
+
+    Returns
+    -------
+    protected_nodes : list
+    """
+    protected_nodes = [] if protected_nodes is None else list(
+        protected_nodes)
+
+    if not ua_network.transit_nodes.empty:
+        transit_xy = ua_network.transit_nodes[['x', 'y']]
+    elif not gtfsfeeds_dfs.stops.empty:
+        transit_xy = gtfsfeeds_dfs.stops[['stop_lon', 'stop_lat']]
+    else:
+        log('No transit nodes or GTFS stops were found. The OSM nodes '
+            'nearest to transit stops will not be protected from '
+            'simplification. Create the transit network first or use '
+            'protected_nodes to keep them.', level=lg.WARNING)
+        return protected_nodes
+
+    nearest_nodes = pd.unique(_nearest_neighbor(
+        osm_nodes[['x', 'y']], transit_xy).ravel())
+    log('{:,} OSM node(s) nearest to {:,} transit stop(s) will be protected '
+        'from simplification.'.format(len(nearest_nodes), len(transit_xy)))
+    return protected_nodes + list(nearest_nodes)
+
+
+def _simplify_osm_network(osm_edges, osm_nodes, protected_nodes=None):
+    """
+    Contract chains of degree-2 nodes in an OSM network into single edges.
+    A node is contracted if it is not protected and either has edges to and
+    from the same two neighboring nodes or has one edge from a node and one
+    edge to another node. Each chain is replaced by an edge from the node
+    at its start to the node at its end with the summed distance and weight
+    of the chain's edges. Chains that form an isolated loop keep one node
+
+    Parameters
+    ----------
+    osm_edges : pandas.DataFrame
+        OSM edge DataFrame with from, to, distance and weight columns
+    osm_nodes : pandas.DataFrame
+        OSM node DataFrame
+    protected_nodes : list, optional
+        list of OSM node IDs that are not contracted
+
+    Returns
+    -------
+    osm_edges, osm_nodes : pandas.DataFrame
+    """
+    start_time = time.time()
+
+    node_index = osm_nodes.index
+    from_pos = node_index.get_indexer(osm_edges['from'])
+    to_pos = node_index.get_indexer(osm_edges['to'])
+    if (from_pos < 0).any() or (to_pos < 0).any():
+        raise ValueError('All OSM edge from and to nodes must exist in the '
+                         'OSM nodes.')
+    node_cnt = len(node_index)
+
+    # find the degree-2 nodes using the number of edges and the lowest and
+    # highest neighbor into and out of each node
+    out_df = pd.DataFrame({'node': from_pos, 'nbr': to_pos})
+    in_df = pd.DataFrame({'node': to_pos, 'nbr': from_pos})
+    out_stats = out_df.groupby('node')['nbr'].agg(['count', 'min', 'max'])
+    in_stats = in_df.groupby('node')['nbr'].agg(['count', 'min', 'max'])
+    stats = out_stats.join(in_stats, how='inner', lsuffix='_out',
+                           rsuffix='_in').reindex(np.arange(node_cnt))
+    two_way = ((stats['count_out'] == 2) & (stats['count_in'] == 2) &
+               (stats['min_out'] == stats['min_in']) &
+               (stats['max_out'] == stats['max_in']) &
+               (stats['min_out'] != stats['max_out']))
+    one_way = ((stats['count_out'] == 1) & (stats['count_in'] == 1) &
+               (stats['min_out'] != stats['min_in']))
+    self_loop = np.zeros(node_cnt, dtype=bool)
+    self_loop[from_pos[from_pos == to_pos]] = True
+    contract = (two_way | one_way).values & ~self_loop
+    if protected_nodes is not None:
+        protected_pos = node_index.get_indexer(pd.Index(protected_nodes))
+        contract[protected_pos[protected_pos >= 0]] = False
+
+    # chains that form a loop of degree-2 nodes have no start, keep the
+    # first node of each loop
+    chain_edges = contract[from_pos] & contract[to_pos]
+    graph = coo_matrix(
+        (np.ones(chain_edges.sum(), dtype=np.int8),
+         (from_pos[chain_edges], to_pos[chain_edges])),
+        shape=(node_cnt, node_cnt))
+    component_cnt, labels = connected_components(graph, directed=False)
+    has_end = np.zeros(component_cnt, dtype=bool)
+    has_end[labels[to_pos[contract[to_pos] & ~contract[from_pos]]]] = True
+    loop_nodes = contract & ~has_end[labels]
+    if loop_nodes.any():
+        loop_positions = np.flatnonzero(loop_nodes)
+        first_pos = pd.Series(loop_positions).groupby(
+            labels[loop_positions]).min().values
+        contract[first_pos] = False
+
+    # the next edge of an edge that ends at a contracted node is the edge
+    # out of that node that does not return to the edge's start node
+    edge_pos = np.arange(len(osm_edges))
+    ends_contracted = contract[to_pos]
+    out_edges = pd.DataFrame({'node': from_pos, 'to': to_pos,
+                              'next_edge': edge_pos})
+    out_edges = out_edges[contract[from_pos]]
+    candidates = pd.DataFrame({'edge': edge_pos[ends_contracted],
+                               'node': to_pos[ends_contracted],
+                               'start': from_pos[ends_contracted]}).merge(
+        out_edges, on='node', how='inner')
+    candidates = candidates[candidates['to'] != candidates['start']]
+    next_edge = np.full(len(osm_edges), -1, dtype=np.int64)
+    next_edge[candidates['edge'].values] = candidates['next_edge'].values
+
+    # follow each chain to its end using pointer jumping
+    distance = osm_edges['distance'].to_numpy(dtype=float).copy()
+    weight = osm_edges['weight'].to_numpy(dtype=float).copy()
+    end_pos = to_pos.copy()
+    jump = next_edge.copy()
+    for _ in range(int(np.ceil(np.log2(max(len(osm_edges), 2)))) + 1):
+        active = jump >= 0
+        if not active.any():
+            break
+        active_jump = jump[active]
+        distance[active] += distance[active_jump]
+        weight[active] += weight[active_jump]
+        end_pos[active] = end_pos[active_jump]
+        jump[active] = jump[active_jump]
+
+    # chains start at edges out of kept nodes, chains that return to their
+    # start node are removed
+    keep_edges = ~contract[from_pos] & (end_pos != from_pos)
+    keep_edges |= ~contract[from_pos] & ~contract[to_pos]
+    simplified_edges = osm_edges.loc[keep_edges].copy()
+    simplified_edges['to'] = node_index.values[end_pos[keep_edges]]
+    simplified_edges['distance'] = distance[keep_edges]
+    simplified_edges['weight'] = weight[keep_edges]
+    if isinstance(osm_edges.index, pd.MultiIndex):
+        simplified_edges.index = pd.MultiIndex.from_arrays(
+            [simplified_edges['from'].values, simplified_edges['to'].values])
+    simplified_nodes = osm_nodes.loc[~contract]
+
+    log('Simplified OSM network by contracting {:,} degree-2 nodes: {:,} '
+        'nodes and {:,} edges reduced to {:,} nodes and {:,} edges. '
+        'Took {:,.2f} seconds'.format(
+            contract.sum(), len(osm_nodes), len(osm_edges),
+            len(simplified_nodes), len(simplified_edges),
+            time.time() - start_time))
+
+    return simplified_edges, simplified_nodes
@@ -0,0 +1,829 @@
+from __future__ import division
+import os
+import time
+import numbers
+import multiprocessing
+import numpy as np
+import pandas as pd
+import logging as lg
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import ConvexHull
+
+from urbanaccess.utils import log
+from urbanaccess.network import _edges_to_csgraph, _nearest_neighbor
+from urbanaccess import config
+from urbanaccess.gtfs.utils_validation import _check_time_range_format
+from urbanaccess.gtfs.utils_format import _timetoseconds
+
+# upper bound in bytes of the dense float64 origin by node distance matrix
+# returned by each batch of shortest path searches in od_matrix and
+# isochrones, used to pick a default chunksize from the number of nodes
+_DIST_CHUNK_BYTES = 256 * 1024 ** 2
+
+
+class urbanaccess_csa(object):
+    """
+    A timetable of transit connections and a pedestrian walk graph built
+    from a time aware integrated network for use in Connection Scan
+    Algorithm (CSA) earliest arrival and profile queries.
+
+    Parameters
+    ----------
+    node_ids : numpy.ndarray
+        integer node IDs (id_int) of the integrated network nodes in
+        matrix position order
+    walk_graph : scipy.sparse.csr_matrix
+        walk graph of the OSM and OSM to transit connector edges with travel
+        time in units of seconds
+    connections : pandas.DataFrame
+        transit connections sorted by departure time with columns:
+        from_pos, to_pos, departure_sec, arrival_sec and trip
+    footpaths : dict
+        dictionary of transit node positions (key) and a list of tuples of
+        transit node positions reachable by walking and the walking time in
+        seconds (value)
+    """
+
+    def __init__(self, node_ids, walk_graph, connections, footpaths):
+        self.node_ids = node_ids
+        self.walk_graph = walk_graph
+        self.connections = connections
+        self.footpaths = footpaths
+
+        # plain lists are considerably faster than numpy arrays for the
+        # element by element access done in the connection scan loop
+        self._departure = connections['departure_sec'].to_numpy()
+        self._conn_lists = (connections['from_pos'].tolist(),
+                            connections['to_pos'].tolist(),
+                            connections['departure_sec'].tolist(),
+                            connections['arrival_sec'].tolist(),
+                            connections['trip'].tolist())
+        self._trip_cnt = int(connections['trip'].max()) + 1 if len(
+            connections) else 0
+        self._node_pos = pd.Index(node_ids)
+
+        # walk graph with an additional source node that is connected to
+        # every transit node, the weights of these edges are set per query to
+        # the transit node arrival times so that egress walking from all
+        # transit nodes is computed with a single Dijkstra search
+        node_cnt = len(node_ids)
+        transit_pos = np.unique(np.concatenate([
+            connections['from_pos'].to_numpy(),
+            connections['to_pos'].to_numpy()])).astype(int)
+        walk_coo = walk_graph.tocoo()
+        rows = np.concatenate([walk_coo.row,
+                               np.full(len(transit_pos), node_cnt)])
+        cols = np.concatenate([walk_coo.col, transit_pos])
+        data = np.concatenate([walk_coo.data,
+                               np.ones(len(transit_pos))])
+        egress_graph = coo_matrix(
+            (data, (rows, cols)), shape=(node_cnt + 1, node_cnt + 1)).tocsr()
+        egress_graph.sort_indices()
+        start = egress_graph.indptr[node_cnt]
+        end = egress_graph.indptr[node_cnt + 1]
+        self._egress_graph = egress_graph
+        self._egress_slice = slice(start, end)
+        self._egress_targets = egress_graph.indices[start:end]
+
+    @classmethod
+    def from_network(cls, urbanaccess_network, max_transfer_time=10):
+        """
+        Create an urbanaccess_csa instance from an integrated network that
+        was created from a transit network with time_aware set to True and
+        integrated with headways set to False.
+
+        Parameters
+        ----------
+        urbanaccess_network : object
+            urbanaccess_network object with integrated net_edges and
+            net_nodes DataFrames
+        max_transfer_time : int or float, optional
+            maximum walking time in minutes between transit nodes to
+            consider as a transfer between connections
+
+        Returns
+        -------
+        urbanaccess_csa
+        """
+        start_time = time.time()
+
+        if urbanaccess_network is None or \
+                urbanaccess_network.net_edges.empty or \
+                urbanaccess_network.net_nodes.empty:
+            raise ValueError('Either no urbanaccess_network specified or '
+                             'net_edges or net_nodes are empty.')
+        if not isinstance(max_transfer_time, (int, float)) or \
+                max_transfer_time < 0:
+            raise ValueError('max_transfer_time must be a positive number.')
+
+        edges = urbanaccess_network.net_edges
+        nodes = urbanaccess_network.net_nodes
+        # networks saved before edge times were stored as seconds carry
+        # 24 hour clock formatted departure_time and arrival_time columns
+        time_cols = ['departure_time_sec', 'arrival_time_sec',
+                     'unique_trip_id']
+        if 'departure_time_sec' not in edges.columns and \
+                'departure_time' in edges.columns:
+            time_cols = ['departure_time', 'arrival_time', 'unique_trip_id']
+        for col in time_cols:
+            if col not in edges.columns:
+                raise ValueError(
+                    'Column: {} was not found in net_edges. The transit '
+                    'network must be created with time_aware set to '
+                    'True.'.format(col))
+
+        # integrate_network with headways set to True adds half of the
+        # route stop headway to the connector edge weight, waiting for a
+        # connection is modelled by the connection scan itself so this would
+        # count waiting twice
+        if 'node_id_route' in edges.columns:
+            raise ValueError('Connection scan requires an integrated network '
+                             'created with headways set to False. Waiting '
+                             'time is already part of the connection scan.')
+
+        node_pos = pd.Index(nodes.index.values)
+        is_transit = (edges['net_type'] == 'transit').to_numpy()
+
+        # walk graph of OSM and OSM to transit connector edges in seconds
+        walk_edges = edges.loc[~is_transit, ['from_int', 'to_int', 'weight']]
+        walk_edges['weight'] = walk_edges['weight'] * 60
+        walk_graph = _edges_to_csgraph(walk_edges, node_pos)
+
+        connections = _build_connections(edges.loc[is_transit], node_pos)
+
+        footpaths = _build_footpaths(
+            walk_graph=walk_graph, connections=connections,
+            max_transfer_sec=max_transfer_time * 60)
+
+        log('Connection scan timetable created with {:,} connections, {:,} '
+            'trips and {:,} transfer footpaths. Took {:,.2f} seconds.'.format(
+                len(connections), connections['trip'].nunique(),
+                sum(len(item) for item in footpaths.values()),
+                time.time() - start_time))
+
+        return cls(node_ids=node_pos.values, walk_graph=walk_graph,
+                   connections=connections, footpaths=footpaths)
+
+    def _node_positions(self, node_ids):
+        """
+        Return the matrix positions of a list of node IDs
+        """
+        if not isinstance(node_ids, (list, tuple, np.ndarray, pd.Series,
+                                     pd.Index)):
+            node_ids = [node_ids]
+        positions = self._node_pos.get_indexer(node_ids)
+        if (positions < 0).any():
+            missing = list(np.asarray(node_ids)[positions < 0])
+            raise ValueError('Node ID(s): {} were not found in the '
+                             'network.'.format(missing))
+        return list(node_ids), positions
+
+    def _scan(self, origin_pos, departure_sec, max_travel_sec):
+        """
+        Run an earliest arrival connection scan from a single origin and
+        return the travel time in seconds to every node
+        """
+        limit = departure_sec + max_travel_sec
+
+        # walk access from the origin to all nodes including transit nodes
+        access = dijkstra(self.walk_graph, indices=origin_pos,
+                          limit=max_travel_sec)
+        tau = (access + departure_sec).tolist()
+
+        from_pos, to_pos, dep, arr, trips = self._conn_lists
+        footpaths = self.footpaths
+        trip_reached = bytearray(self._trip_cnt)
+        first = int(np.searchsorted(self._departure, departure_sec, 'left'))
+        last = int(np.searchsorted(self._departure, limit, 'right'))
+
+        for i in range(first, last):
+            trip = trips[i]
+            if trip_reached[trip] or tau[from_pos[i]] <= dep[i]:
+                trip_reached[trip] = 1
+                arrival = arr[i]
+                stop = to_pos[i]
+                if arrival < tau[stop]:
+                    tau[stop] = arrival
+                    for target, walk_sec in footpaths.get(stop, ()):
+                        if arrival + walk_sec < tau[target]:
+                            tau[target] = arrival + walk_sec
+
+        # egress walk from all transit nodes reached in the scan
+        tau = np.asarray(tau)
+        offsets = tau[self._egress_targets] - departure_sec
+        offsets[offsets > max_travel_sec] = np.inf
+        self._egress_graph.data[self._egress_slice] = offsets
+        egress = dijkstra(self._egress_graph, indices=len(self.node_ids),
+                          limit=max_travel_sec)
+        travel_sec = np.minimum(egress[:-1], tau - departure_sec)
+        travel_sec[travel_sec > max_travel_sec] = np.inf
+
+        return travel_sec
+
+    def earliest_arrival(self, origins, departure_time, max_travel_time=90):
+        """
+        Compute the earliest arrival travel time from one or more origin
+        nodes to all nodes in the network for a departure time
+
+        Parameters
+        ----------
+        origins : int or list
+            integer node ID (id_int) or list of node IDs of the origin nodes
+        departure_time : str
+            departure time at the origins. Must follow format of a 24 hour
+            clock for example: 08:00:00 or 17:00:00
+        max_travel_time : int or float, optional
+            maximum travel time in minutes, nodes that cannot be reached
+            within this time will have a null travel time
+
+        Returns
+        -------
+        travel_time_df : pandas.DataFrame
+            DataFrame of travel time in units of minutes with the node IDs
+            as the index and a column for each origin node ID
+        """
+        _check_time_range_format([departure_time, departure_time])
+        if not isinstance(max_travel_time, (int, float)) or \
+                max_travel_time <= 0:
+            raise ValueError('max_travel_time must be a positive number.')
+        start_time = time.time()
+
+        origin_ids, origin_pos = self._node_positions(origins)
+        departure_sec = _timetoseconds(
+            df=pd.DataFrame({'time': [departure_time]}),
+            time_cols=['time'])['time_sec'][0]
+        max_travel_sec = max_travel_time * 60
+
+        results = {}
+        for origin_id, pos in zip(origin_ids, origin_pos):
+            results[origin_id] = self._scan(
+                origin_pos=pos, departure_sec=departure_sec,
+                max_travel_sec=max_travel_sec) / 60
+
+        travel_time_df = pd.DataFrame(results, index=self.node_ids,
+                                      columns=origin_ids)
+        travel_time_df.replace(np.inf, np.nan, inplace=True)
+        travel_time_df.index.name = 'id_int'
+
+        log('Earliest arrival query for {:,} origin(s) departing at {} '
+            'completed. Took {:,.2f} seconds.'.format(
+                len(origin_ids), departure_time, time.time() - start_time))
+
+        return travel_time_df
+
+    def profile(self, origins, timerange, interval=5, max_travel_time=90):
+        """
+        Compute earliest arrival travel times from one or more origin nodes
+        to all nodes in the network for a series of departure times within
+        a time range
+
+        Parameters
+        ----------
+        origins : int or list
+            integer node ID (id_int) or list of node IDs of the origin nodes
+        timerange : list
+            time range of departure times in a list with time 1 and time 2 as
+            strings. Must follow format of a 24 hour clock for example:
+            08:00:00 or 17:00:00
+        interval : int, optional
+            interval in minutes between departure times in the time range
+        max_travel_time : int or float, optional
+            maximum travel time in minutes, nodes that cannot be reached
+            within this time will have a null travel time
+
+        Returns
+        -------
+        travel_time_df : pandas.DataFrame
+            DataFrame of travel time in units of minutes with the node IDs
+            as the index and columns as a MultiIndex of the origin node ID
+            and the departure time
+        """
+        _check_time_range_format(timerange)
+        if not isinstance(interval, int) or interval <= 0:
+            raise ValueError('interval must be a positive integer.')
+        if not isinstance(max_travel_time, (int, float)) or \
+                max_travel_time <= 0:
+            raise ValueError('max_travel_time must be a positive number.')
+        start_time = time.time()
+
+        origin_ids, origin_pos = self._node_positions(origins)
+        start_sec, end_sec = _timetoseconds(
+            df=pd.DataFrame({'time': timerange}),
+            time_cols=['time'])['time_sec'].tolist()
+        departures = np.arange(start_sec, end_sec + 1, interval * 60)
+        if len(departures) == 0:
+            log('Warning: No departure times were found in time range: '
+                '{}.'.format(timerange), level=lg.WARNING)
+        max_travel_sec = max_travel_time * 60
+
+        results = {}
+        for origin_id, pos in zip(origin_ids, origin_pos):
+            for departure_sec in departures:
+                departure_str = '{:02d}:{:02d}:{:02d}'.format(
+                    int(departure_sec // 3600),
+                    int((departure_sec % 3600) // 60),
+                    int(departure_sec % 60))
+                results[(origin_id, departure_str)] = self._scan(
+                    origin_pos=pos, departure_sec=departure_sec,
+                    max_travel_sec=max_travel_sec) / 60
+
+        travel_time_df = pd.DataFrame(results, index=self.node_ids)
+        travel_time_df.columns.names = ['origin', 'departure_time']
+        travel_time_df.replace(np.inf, np.nan, inplace=True)
+        travel_time_df.index.name = 'id_int'
+
+        log('Profile query for {:,} origin(s) and {:,} departure times '
+            'completed. Took {:,.2f} seconds.'.format(
+                len(origin_ids), len(departures), time.time() - start_time))
+
+        return travel_time_df
+
+
+def _build_connections(transit_edges, node_pos):
+    """
+    Build the table of transit connections sorted by departure time from
+    time aware transit edges
+
+    Parameters
+    ----------
+    transit_edges : pandas.DataFrame
+        integrated network transit edges with departure_time_sec,
+        arrival_time_sec and unique_trip_id columns or with 24 hour clock
+        formatted departure_time and arrival_time columns
+    node_pos : pandas.Index
+        index of integer node IDs that defines the position of each node
+
+    Returns
+    -------
+    connections : pandas.DataFrame
+    """
+    if 'departure_time_sec' in transit_edges.columns:
+        departure_sec = transit_edges['departure_time_sec'].to_numpy()
+        arrival_sec = transit_edges['arrival_time_sec'].to_numpy()
+    else:
+        times = _timetoseconds(
+            df=pd.DataFrame({
+                'departure_time': transit_edges['departure_time'].to_numpy(),
+                'arrival_time': transit_edges['arrival_time'].to_numpy()}),
+            time_cols=['departure_time', 'arrival_time'])
+        departure_sec = times['departure_time_sec'].to_numpy()
+        arrival_sec = times['arrival_time_sec'].to_numpy()
+    connections = pd.DataFrame({
+        'from_pos': node_pos.get_indexer(transit_edges['from_int']),
+        'to_pos': node_pos.get_indexer(transit_edges['to_int']),
+        'departure_sec': departure_sec,
+        'arrival_sec': arrival_sec,
+        'trip': pd.factorize(transit_edges['unique_trip_id'])[0]})
+
+    invalid = (connections['from_pos'] < 0) | (connections['to_pos'] < 0) | \
+        connections['departure_sec'].isnull() | \
+        connections['arrival_sec'].isnull()
+    if invalid.any():
+        log('Warning: {:,} transit edge(s) without departure or arrival '
+            'times or nodes in the network were removed from the '
+            'connections.'.format(invalid.sum()), level=lg.WARNING)
+        connections = connections.loc[~invalid]
+
+    connections = connections.astype({'departure_sec': int,
+                                      'arrival_sec': int})
+    connections.sort_values(by=['departure_sec', 'arrival_sec'],
+                            kind='mergesort', inplace=True)
+    connections.reset_index(drop=True, inplace=True)
+
+    return connections
+
+
+def _build_footpaths(walk_graph, connections, max_transfer_sec):
+    """
+    Find all transit nodes reachable by walking from each transit node
+    within a maximum transfer time
+
+    Parameters
+    ----------
+    walk_graph : scipy.sparse.csr_matrix
+        walk graph with travel time in units of seconds
+    connections : pandas.DataFrame
+        transit connections
+    max_transfer_sec : int or float
+        maximum walking time in seconds between transit nodes
+
+    Returns
+    -------
+    footpaths : dict
+    """
+    footpaths = {}
+    if max_transfer_sec <= 0 or connections.empty:
+        return footpaths
+
+    transit_pos = np.unique(np.concatenate([
+        connections['from_pos'].to_numpy(),
+        connections['to_pos'].to_numpy()]))
+
+    # bound the size of the distance matrix computed for each chunk of
+    # sources to roughly 50 million cells
+    chunk_size = max(1, int(5e7 // max(walk_graph.shape[0], 1)))
+    for start in range(0, len(transit_pos), chunk_size):
+        sources = transit_pos[start:start + chunk_size]
+        dist = dijkstra(walk_graph, indices=sources,
+                        limit=max_transfer_sec)[:, transit_pos]
+        src_idx, tgt_idx = np.nonzero(np.isfinite(dist))
+        for src, tgt in zip(src_idx, tgt_idx):
+            source = int(sources[src])
+            target = int(transit_pos[tgt])
+            if source != target:
+                footpaths.setdefault(source, []).append(
+                    (target, float(dist[src, tgt])))
+
+    return footpaths
+
+
+# graph and destinations shared with od_matrix worker processes
+def _dist_chunksize(node_cnt):
+    """
+    Number of origins to compute shortest paths for at a time so that the
+    dense distance matrix of a chunk stays within _DIST_CHUNK_BYTES
+
+    Parameters
+    ----------
+    node_cnt : int
+        number of nodes in the graph
+
+    Returns
+    -------
+    chunksize : int
+    """
+    return max(1, int(_DIST_CHUNK_BYTES // (8 * max(node_cnt, 1))))
+
+
+_od_worker_data = {}
+
+
+def _od_worker_init(graph, dest_pos, limit):
+    """
+    Store the graph and destination node positions in a worker process
+    """
+    _od_worker_data['graph'] = graph
+    _od_worker_data['dest_pos'] = dest_pos
+    _od_worker_data['limit'] = limit
+
+
+def _od_worker_chunk(origin_pos):
+    """
+    Compute the shortest path travel time from a chunk of origin node
+    positions to all destination node positions in a worker process
+    """
+    dist = dijkstra(_od_worker_data['graph'], indices=origin_pos,
+                    limit=_od_worker_data['limit'])
+    return dist[:, _od_worker_data['dest_pos']].astype(np.float32)
+
+
+def od_matrix(urbanaccess_network, zones_df, x_col='x', y_col='y',
+              max_travel_time=None, chunksize=None, processes=1,
+              filename=None, dir=config.settings.data_folder):
+    """
+    Compute a zone to zone travel time matrix over the integrated network.
+    Zone centroids are snapped to the nearest integrated network node and
+    shortest path travel times are computed for chunks of origin zones so
+    that memory use is bounded by the chunk size and not the number of
+    zones or nodes. If a filename is specified, the matrix is written to a memory
+    mapped NumPy .npy file instead of being held in memory.
+
+    Parameters
+    ----------
+    urbanaccess_network : object
+        urbanaccess_network object with integrated net_edges and net_nodes
+        DataFrames
+    zones_df : pandas.DataFrame
+        DataFrame of zones with x and y centroid coordinate columns. The
+        DataFrame index is used as the zone ID
+    x_col : str, optional
+        name of the zone x coordinate column
+    y_col : str, optional
+        name of the zone y coordinate column
+    max_travel_time : int or float, optional
+        maximum travel time in minutes to search from each origin zone,
+        zones that cannot be reached within this time will have a null
+        travel time. If None, there is no limit
+    chunksize : int, optional
+        number of unique origin nodes to compute shortest paths for at a
+        time. If None, the number of origins is chosen from the number of
+        network nodes so that each chunk distance matrix stays under 256 MB
+        per process
+    processes : int, optional
+        number of worker processes to compute origin chunks with. If 1,
+        chunks are computed in the current process
+    filename : str, optional
+        name of the .npy file to write the matrix to as a memory mapped
+        array. If None, the matrix is held in memory
+    dir : str, optional
+        directory to save the .npy file
+
+    Returns
+    -------
+    od_df : pandas.DataFrame
+        DataFrame of float32 travel times in units of minutes with the
+        origin zone IDs as the index and the destination zone IDs as the
+        columns. If filename is specified, the DataFrame is backed by the
+        memory mapped array
+    """
+    start_time = time.time()
+
+    if urbanaccess_network is None or \
+            urbanaccess_network.net_edges.empty or \
+            urbanaccess_network.net_nodes.empty:
+        raise ValueError('Either no urbanaccess_network specified or '
+                         'net_edges or net_nodes are empty.')
+    for col in [x_col, y_col]:
+        if col not in zones_df.columns:
+            raise ValueError('Column: {} was not found in zones_df.'.format(
+                col))
+    if max_travel_time is not None and (
+            not isinstance(max_travel_time, (int, float)) or
+            max_travel_time <= 0):
+        raise ValueError('max_travel_time must be a positive number or '
+                         'None.')
+    if chunksize is not None and (
+            not isinstance(chunksize, numbers.Integral) or
+            isinstance(chunksize, bool) or chunksize < 1):
+        raise ValueError('chunksize must be a positive integer or None.')
+    if not isinstance(processes, int) or processes < 1:
+        raise ValueError('processes must be a positive integer.')
+
+    nodes = urbanaccess_network.net_nodes
+    edges = urbanaccess_network.net_edges
+    node_pos = pd.Index(nodes.index.values)
+    if chunksize is None:
+        chunksize = _dist_chunksize(len(node_pos))
+    graph = _edges_to_csgraph(edges, node_pos)
+
+    zone_nodes = _nearest_neighbor(nodes[['x', 'y']],
+                                   zones_df[[x_col, y_col]]).ravel()
+    zone_pos = node_pos.get_indexer(zone_nodes)
+    log('{:,} zone(s) snapped to {:,} unique network node(s).'.format(
+        len(zone_pos), len(np.unique(zone_pos))))
+
+    # zones that snap to the same node share one shortest path search
+    origin_pos, inverse = np.unique(zone_pos, return_inverse=True)
+    chunks = [origin_pos[i:i + chunksize]
+              for i in range(0, len(origin_pos), chunksize)]
+    limit = np.inf if max_travel_time is None else max_travel_time
+
+    zone_cnt = len(zone_pos)
+    if filename:
+        if not os.path.exists(dir):
+            os.makedirs(dir)
+        path = os.path.join(dir, filename)
+        od = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                       shape=(zone_cnt, zone_cnt))
+    else:
+        od = np.empty((zone_cnt, zone_cnt), dtype=np.float32)
+
+    if processes > 1 and len(chunks) > 1:
+        pool = multiprocessing.Pool(
+            processes=processes, initializer=_od_worker_init,
+            initargs=(graph, zone_pos, limit))
+        results = pool.imap(_od_worker_chunk, chunks)
+    else:
+        pool = None
+        _od_worker_init(graph, zone_pos, limit)
+        results = (_od_worker_chunk(chunk) for chunk in chunks)
+
+    try:
+        start = 0
+        for result in results:
+            end = start + len(result)
+            rows = (inverse >= start) & (inverse < end)
+            result[np.isinf(result)] = np.nan
+            od[rows] = result[inverse[rows] - start]
+            start = end
+    finally:
+        _od_worker_data.clear()
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if filename:
+        od.flush()
+        log('Saved travel time matrix to: {}.'.format(path))
+
+    od_df = pd.DataFrame(od, index=zones_df.index, columns=zones_df.index,
+                         copy=False)
+
+    log('Travel time matrix for {:,} zones computed in {:,} chunk(s). '
+        'Took {:,.2f} seconds.'.format(zone_cnt, len(chunks),
+                                       time.time() - start_time))
+
+    return od_df
+
+
+class urbanaccess_graph(object):
+    """
+    A sparse graph of an integrated network for repeated shortest path
+    queries without rebuilding the graph for each call
+
+    Parameters
+    ----------
+    node_ids : numpy.ndarray
+        integer node IDs (id_int) of the integrated network nodes in
+        matrix position order
+    x : numpy.ndarray
+        x coordinates of the nodes in matrix position order
+    y : numpy.ndarray
+        y coordinates of the nodes in matrix position order
+    graph : scipy.sparse.csr_matrix
+        graph of the integrated network edges with travel time in units of
+        minutes
+    """
+
+    def __init__(self, node_ids, x, y, graph):
+        self.node_ids = node_ids
+        self.x = x
+        self.y = y
+        self.graph = graph
+        self._node_pos = pd.Index(node_ids)
+
+    @classmethod
+    def from_network(cls, urbanaccess_network, weight_col='weight'):
+        """
+        Create an urbanaccess_graph instance from an integrated network
+
+        Parameters
+        ----------
+        urbanaccess_network : object
+            urbanaccess_network object with integrated net_edges and
+            net_nodes DataFrames
+        weight_col : str, optional
+            name of the net_edges column to use as the edge travel time
+
+        Returns
+        -------
+        urbanaccess_graph
+        """
+        if urbanaccess_network is None or \
+                urbanaccess_network.net_edges.empty or \
+                urbanaccess_network.net_nodes.empty:
+            raise ValueError('Either no urbanaccess_network specified or '
+                             'net_edges or net_nodes are empty.')
+        if weight_col not in urbanaccess_network.net_edges.columns:
+            raise ValueError('Column: {} was not found in net_edges.'.format(
+                weight_col))
+
+        nodes = urbanaccess_network.net_nodes
+        node_pos = pd.Index(nodes.index.values)
+        graph = _edges_to_csgraph(urbanaccess_network.net_edges, node_pos,
+                                  weight_col=weight_col)
+
+        return cls(node_ids=node_pos.values, x=nodes['x'].to_numpy(),
+                   y=nodes['y'].to_numpy(), graph=graph)
+
+    def isochrones(self, origins, thresholds, hulls=False, chunksize=None):
+        """
+        Compute the set of nodes reachable from each origin node within
+        each travel time threshold. Origins are computed in batches of
+        bounded Dijkstra searches limited to the largest threshold.
+
+        Parameters
+        ----------
+        origins : int or list
+            integer node ID (id_int) or list of node IDs of the origin nodes
+        thresholds : int, float or list
+            travel time threshold or list of thresholds in units of minutes
+        hulls : bool, optional
+            if True, the convex hull of the reachable nodes of each
+            isochrone is computed and returned as a list of x and y
+            coordinate tuples in a hull column
+        chunksize : int, optional
+            number of origins to compute shortest paths for at a time. If
+            None, the number of origins is chosen from the number of nodes
+            so that each batch distance matrix stays under 256 MB
+
+        Returns
+        -------
+        isochrone_df : pandas.DataFrame
+            DataFrame with a row for each origin and threshold with columns:
+            origin, threshold, node_ids with an array of the reachable node
+            IDs and optionally hull
+        """
+        start_time = time.time()
+
+        if not isinstance(thresholds, (list, tuple, np.ndarray)):
+            thresholds = [thresholds]
+        if len(thresholds) == 0 or not all(
+                isinstance(t, numbers.Real) and not isinstance(t, bool) and
+                t > 0 for t in thresholds):
+            raise ValueError('thresholds must be one or more positive '
+                             'numbers.')
+        thresholds = sorted(thresholds)
+        if chunksize is None:
+            chunksize = _dist_chunksize(len(self.node_ids))
+        if not isinstance(chunksize, numbers.Integral) or isinstance(
+                chunksize, bool) or chunksize < 1:
+            raise ValueError('chunksize must be a positive integer.')
+        if not isinstance(origins, (list, tuple, np.ndarray, pd.Series,
+                                    pd.Index)):
+            origins = [origins]
+        origin_ids = list(origins)
+        origin_pos = self._node_pos.get_indexer(origin_ids)
+        if (origin_pos < 0).any():
+            missing = list(np.asarray(origin_ids)[origin_pos < 0])
+            raise ValueError('Node ID(s): {} were not found in the '
+                             'network.'.format(missing))
+
+        records = []
+        for start in range(0, len(origin_pos), chunksize):
+            chunk = origin_pos[start:start + chunksize]
+            dist = dijkstra(self.graph, indices=chunk,
+                            limit=thresholds[-1])
+            for origin_id, row in zip(origin_ids[start:start + chunksize],
+                                      dist):
+                reached = np.flatnonzero(np.isfinite(row))
+                reached_dist = row[reached]
+                for threshold in thresholds:
+                    within = reached[reached_dist <= threshold]
+                    record = {'origin': origin_id,
+                              'threshold': threshold,
+                              'node_ids': self.node_ids[within]}
+                    if hulls:
+                        record['hull'] = _convex_hull(self.x[within],
+                                                      self.y[within])
+                    records.append(record)
+
+        columns = ['origin', 'threshold', 'node_ids']
+        if hulls:
+            columns.append('hull')
+        isochrone_df = pd.DataFrame.from_records(records, columns=columns)
+
+        log('{:,} isochrone(s) computed for {:,} origin(s). Took {:,.2f} '
+            'seconds.'.format(len(isochrone_df), len(origin_ids),
+                              time.time() - start_time))
+
+        return isochrone_df
+
+
+def _convex_hull(x, y):
+    """
+    Compute the convex hull of a set of points
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        x coordinates of the points
+    y : numpy.ndarray
+        y coordinates of the points
+
+    Returns
+    -------
+    hull : list
+        list of x and y coordinate tuples of the hull vertices in counter
+        clockwise order. If there are fewer than 3 points or the points are
+        collinear the unique points are returned
+    """
+    points = np.unique(np.column_stack([x, y]), axis=0)
+    if len(points) < 3 or np.linalg.matrix_rank(
+            points - points.mean(axis=0)) < 2:
+        return [tuple(point) for point in points]
+    hull = ConvexHull(points)
+    return [tuple(point) for point in points[hull.vertices]]
+
+
+def isochrones(urbanaccess_network, origins, thresholds, hulls=False,
+               chunksize=None, weight_col='weight'):
+    """
+    Compute the set of nodes reachable from each origin node within each
+    travel time threshold over an integrated network. To compute many
+    isochrones over the same network across multiple calls, create an
+    urbanaccess_graph once with urbanaccess_graph.from_network() and use
+    its isochrones() method to avoid rebuilding the graph for each call.
+
+    Parameters
+    ----------
+    urbanaccess_network : object
+        urbanaccess_network object with integrated net_edges and net_nodes
+        DataFrames
+    origins : int or list
+        integer node ID (id_int) or list of node IDs of the origin nodes
+    thresholds : int, float or list
+        travel time threshold or list of thresholds in units of minutes
+    hulls : bool, optional
+        if True, the convex hull of the reachable nodes of each isochrone is
+        computed and returned as a list of x and y coordinate tuples in a
+        hull column
+    chunksize : int, optional
+        number of origins to compute shortest paths for at a time. If None,
+        the number of origins is chosen from the number of nodes so that
+        each batch distance matrix stays under 256 MB
+    weight_col : str, optional
+        name of the net_edges column to use as the edge travel time
+
+    Returns
+    -------
+    isochrone_df : pandas.DataFrame
+        DataFrame with a row for each origin and threshold with columns:
+        origin, threshold, node_ids with an array of the reachable node IDs
+        and optionally hull
+    """
+    graph = urbanaccess_graph.from_network(urbanaccess_network,
+                                           weight_col=weight_col)
+    return graph.isochrones(origins=origins, thresholds=thresholds,
+                            hulls=hulls, chunksize=chunksize)
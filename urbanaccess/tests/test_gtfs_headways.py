@@ -0,0 +1,37 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from urbanaccess.gtfs import headways
+
+
+@pytest.fixture
+def headway_stop_times():
+    data = {
+        'unique_stop_id': ['1_agency_a', '1_agency_a', '1_agency_a',
+                           '1_agency_a', '2_agency_a', '2_agency_a',
+                           '3_agency_a'],
+        'unique_route_id': ['10_agency_a', '10_agency_a', '10_agency_a',
+                            '20_agency_a', '10_agency_a', '10_agency_a',
+                            '10_agency_a'],
+        'departure_time_sec_interpolate': [29400, 28800, 30600, 28800,
+                                           29100, 28800, 28800]
+    }
+    return pd.DataFrame(data)
+
+
+def test_calc_headways_by_route_stop(headway_stop_times):
+    result = headways._calc_headways_by_route_stop(headway_stop_times)
+    assert list(result.columns) == ['count', 'mean', 'std', 'min', '25%',
+                                    '50%', '75%', 'max']
+    assert list(result.index) == [
+        '1_agency_a,10_agency_a', '1_agency_a,20_agency_a',
+        '2_agency_a,10_agency_a', '3_agency_a,10_agency_a']
+    # departures at 08:00, 08:10 and 08:30 are not in time order
+    assert result.loc['1_agency_a,10_agency_a', 'count'] == 2
+    assert result.loc['1_agency_a,10_agency_a', 'min'] == 10
+    assert result.loc['1_agency_a,10_agency_a', 'max'] == 20
+    assert result.loc['2_agency_a,10_agency_a', 'mean'] == 5
+    # route stops with a single departure have no headways
+    assert result.loc['1_agency_a,20_agency_a', 'count'] == 0
+    assert np.isnan(result.loc['3_agency_a,10_agency_a', 'mean'])
@@ -5,6 +5,7 @@ import os
 import six
 import codecs
 import sys
+import shutil
 
 import urbanaccess.gtfs.load as gtfs_load
 from urbanaccess.gtfs.gtfsfeeds_dataframe import urbanaccess_gtfs_df
@@ -127,6 +128,26 @@ def test_loadgtfsfeed_to_df_wo_calendar(
             assert value.empty is False
 
 
+def test_loadgtfsfeed_to_df_column_projection(
+        agency_a_feed_on_disk_wo_calendar):
+    feed_dir = agency_a_feed_on_disk_wo_calendar
+    loaded_feeds = gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=feed_dir,
+        validation=False,
+        verbose=True,
+        bbox=None,
+        remove_stops_outsidebbox=False,
+        append_definitions=False,
+        column_projection=True)
+    assert 'route_short_name' not in loaded_feeds.routes.columns
+    assert 'pickup_type' not in loaded_feeds.stop_times.columns
+    for col in ['trip_id', 'stop_id', 'departure_time', 'arrival_time',
+                'stop_sequence', 'unique_agency_id', 'route_type',
+                'departure_time_sec', 'arrival_time_sec']:
+        assert col in loaded_feeds.stop_times.columns
+    assert loaded_feeds.stops['stop_name'].empty is False
+
+
 def test_loadgtfsfeed_to_df_wo_calendar_dates(
         agency_a_feed_on_disk_wo_calendar_dates,
         expected_urbanaccess_gtfs_df_keys):
@@ -175,6 +196,105 @@ def test_loadgtfsfeed_to_df_w_calendar_and_calendar_dates(
             assert value.empty is False
 
 
+def test_loadgtfsfeed_to_df_service_day(
+        agency_a_feed_on_disk_w_calendar_and_calendar_dates):
+    feed_dir = agency_a_feed_on_disk_w_calendar_and_calendar_dates
+    full_feeds = gtfs_load.gtfsfeed_to_df(gtfsfeed_path=feed_dir)
+    full_stop_times = full_feeds.stop_times.copy()
+    # weekend trips d1 and d2 should not be read for a monday
+    loaded_feeds = gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=feed_dir, day='monday')
+    expected = full_stop_times[
+        ~full_stop_times['trip_id'].isin(['d1', 'd2'])].reset_index(
+        drop=True)
+    assert loaded_feeds.stop_times.equals(expected)
+    # all other tables should not be filtered
+    assert len(loaded_feeds.trips) == len(full_feeds.trips)
+    # calendar_dates_lookup should add the weekend trips back
+    loaded_feeds = gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=feed_dir, day='monday',
+        calendar_dates_lookup={'schedule_type': 'WE'})
+    assert loaded_feeds.stop_times.equals(full_stop_times)
+
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_load.gtfsfeed_to_df(gtfsfeed_path=feed_dir, day='monday_2')
+    assert 'Incorrect day specified' in str(excinfo.value)
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_load.gtfsfeed_to_df(
+            gtfsfeed_path=feed_dir,
+            calendar_dates_lookup={'schedule_type': 'WE'})
+    expected_error = 'day must be specified to use calendar_dates_lookup.'
+    assert expected_error in str(excinfo.value)
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_load.gtfsfeed_to_df(
+            gtfsfeed_path=feed_dir, day='monday',
+            calendar_dates_lookup={'schedule_type_2': 'WE'})
+    expected_error = ('Column: schedule_type_2 not found in calendar_dates '
+                      'DataFrame.')
+    assert expected_error in str(excinfo.value)
+
+
+def test_loadgtfsfeed_to_df_service_day_stops_multi_agency(
+        agency_a_feed_on_disk_w_calendar_and_calendar_dates):
+    feed_dir = agency_a_feed_on_disk_w_calendar_and_calendar_dates
+    # the weekend route 13-101 and its stops 7, 8 and 9 are operated by a
+    # second agency
+    agency = pd.read_csv(os.path.join(feed_dir, 'agency.txt'))
+    agency = pd.concat([agency, agency.assign(
+        agency_id='agency b', agency_name='agency b city b')],
+        ignore_index=True)
+    agency.to_csv(os.path.join(feed_dir, 'agency.txt'), index=False)
+    routes = pd.read_csv(os.path.join(feed_dir, 'routes.txt'))
+    routes.loc[routes['route_id'] == '13-101', 'agency_id'] = 'agency b'
+    routes.to_csv(os.path.join(feed_dir, 'routes.txt'), index=False)
+
+    full_feeds = gtfs_load.gtfsfeed_to_df(gtfsfeed_path=feed_dir)
+    loaded_feeds = gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=feed_dir, day='monday')
+    assert 'd1' not in loaded_feeds.stop_times['trip_id'].values
+    assert loaded_feeds.stops.equals(full_feeds.stops)
+    stops = loaded_feeds.stops.set_index('stop_id')
+    assert (stops.loc[['7', '8', '9'], 'unique_agency_id'] ==
+            'agency_b_city_b').all()
+    assert (stops.loc[['7', '8', '9'], 'route_type'] == 1).all()
+
+
+def test_loadgtfsfeed_to_df_service_day_multi_feed_lookup(
+        agency_a_feed_on_disk_w_calendar_and_calendar_dates, tmpdir):
+    feed_dir = agency_a_feed_on_disk_w_calendar_and_calendar_dates
+    root_dir = os.path.join(tmpdir.strpath, 'multi_feed')
+    shutil.copytree(feed_dir, os.path.join(root_dir, 'feed_a'))
+    shutil.copytree(feed_dir, os.path.join(root_dir, 'feed_b'))
+    # only feed_a has the calendar_dates_lookup column
+    calendar_dates_path = os.path.join(root_dir, 'feed_b',
+                                       'calendar_dates.txt')
+    calendar_dates = pd.read_csv(calendar_dates_path)
+    calendar_dates.drop(columns=['schedule_type']).to_csv(
+        calendar_dates_path, index=False)
+
+    loaded_feeds = gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=root_dir, day='monday',
+        calendar_dates_lookup={'schedule_type': 'WE'})
+    stop_times = loaded_feeds.stop_times
+    trip_ids = stop_times.groupby('unique_feed_id')['trip_id'].unique()
+    feed_a_id = [i for i in trip_ids.index if 'feed_a' in i][0]
+    feed_b_id = [i for i in trip_ids.index if 'feed_b' in i][0]
+    # weekend trips d1 and d2 are only added back for feed_a
+    assert sorted(trip_ids[feed_a_id]) == ['a1', 'a2', 'a3', 'a4', 'b1',
+                                           'b2', 'c1', 'c2', 'd1', 'd2']
+    assert sorted(trip_ids[feed_b_id]) == ['a1', 'a2', 'a3', 'a4', 'b1',
+                                           'b2', 'c1', 'c2']
+
+    shutil.copy(calendar_dates_path, os.path.join(root_dir, 'feed_a'))
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_load.gtfsfeed_to_df(
+            gtfsfeed_path=root_dir, day='monday',
+            calendar_dates_lookup={'schedule_type': 'WE'})
+    expected_error = ('Column: schedule_type not found in calendar_dates '
+                      'DataFrame.')
+    assert expected_error in str(excinfo.value)
+
+
 def test_loadgtfsfeed_to_df_wo_calendar_and_calendar_dates(
         agency_a_feed_on_disk_wo_calendar_and_calendar_dates):
     feed_dir = agency_a_feed_on_disk_wo_calendar_and_calendar_dates
@@ -229,3 +349,43 @@ def test_loadgtfsfeed_to_df_wo_agency(
         # check that df is not empty
         if key in expected_dfs:
             assert value.empty is False
+
+
+def test_loadgtfsfeed_to_df_cache_dir(
+        agency_a_feed_on_disk_w_calendar_and_calendar_dates, tmpdir,
+        monkeypatch):
+    feed_dir = agency_a_feed_on_disk_w_calendar_and_calendar_dates
+    cache_dir = os.path.join(tmpdir.strpath, 'cache')
+    loaded_feeds = gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=feed_dir, cache_dir=cache_dir)
+    expected = {key: value.copy() for key, value in
+                vars(loaded_feeds).items()}
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+
+    # feed is read from the cache without reading the text files again
+    def _read_gtfs_file(*args, **kwargs):
+        raise AssertionError('GTFS text file was read.')
+    monkeypatch.setattr(gtfs_load.utils_format, '_read_gtfs_file',
+                        _read_gtfs_file)
+    loaded_feeds = gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=feed_dir, cache_dir=cache_dir)
+    for key in ['stops', 'routes', 'trips', 'stop_times', 'calendar',
+                'calendar_dates']:
+        pd.testing.assert_frame_equal(getattr(loaded_feeds, key),
+                                      expected[key])
+    # verbose only affects logging and does not invalidate the cache
+    gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=feed_dir, cache_dir=cache_dir, verbose=False)
+
+    # a change to the parameters or the text files invalidates the cache
+    with pytest.raises(AssertionError):
+        gtfs_load.gtfsfeed_to_df(
+            gtfsfeed_path=feed_dir, cache_dir=cache_dir, day='monday')
+    monkeypatch.undo()
+    stops_path = os.path.join(feed_dir, 'stops.txt')
+    stops_df = pd.read_csv(stops_path)
+    stops_df.iloc[:-1].to_csv(stops_path, index=False)
+    loaded_feeds = gtfs_load.gtfsfeed_to_df(
+        gtfsfeed_path=feed_dir, cache_dir=cache_dir)
+    assert len(loaded_feeds.stops) == len(expected['stops']) - 1
@@ -209,7 +209,10 @@ def stop_times_interpolated():
         'arrival_time': ['08:15:00', '08:20:00', '08:25:00', '08:30:00',
                          '08:35:00'] * 4,
         'departure_time': ['08:15:00', '08:20:00', '08:25:00', '08:30:00',
-                           '08:35:00'] * 4
+                           '08:35:00'] * 4,
+        'arrival_time_sec': [29700, 30000, 30300, 30600, 30900] * 4,
+        'departure_time_sec_interpolate': [29700, 30000, 30300, 30600,
+                                           30900] * 4
     }
 
     index = range(20)
@@ -296,10 +299,8 @@ def expected_transit_edge_from_feed_wo_calendar_dates_process_lvl_2_timeaware():
                'a3_agency_a_city_a_3', 'a3_agency_a_city_a_4',
                'a3_agency_a_city_a_5'],
         'route_type': [3] * 5,
-        'departure_time': ['08:15:00', '08:20:00', '08:25:00', '08:30:00',
-                           '08:35:00'],
-        'arrival_time': ['08:20:00', '08:25:00', '08:30:00', '08:35:00',
-                         '08:40:00']
+        'departure_time_sec': [29700, 30000, 30300, 30600, 30900],
+        'arrival_time_sec': [30000, 30300, 30600, 30900, 31200]
     }
     index = range(5)
     df = pd.DataFrame(data, index)
@@ -548,7 +549,7 @@ def test_create_transit_net_wo_calendar_dates_timeaware(
 
     result_edge = transit_net.transit_edges.copy()
     # check if expected timeware cols are in result
-    expected_timeaware_cols = ['arrival_time', 'departure_time']
+    expected_timeaware_cols = ['arrival_time_sec', 'departure_time_sec']
     assert all(col in result_edge.columns for col in expected_timeaware_cols)
     # test that output df is identical to expected df
     result_edge = result_edge.reindex(
@@ -562,6 +563,66 @@ def test_create_transit_net_wo_calendar_dates_timeaware(
     assert result_edge.equals(expected_result)
 
 
+def test_create_transit_net_memory_budget(
+        gtfs_feed_wo_calendar_dates, tmpdir, monkeypatch):
+    expected_net = gtfs_network.create_transit_net(
+        gtfs_feed_wo_calendar_dates, day='monday',
+        timerange=['07:00:00', '10:00:00'], time_aware=True)
+    expected_edges = expected_net.transit_edges.copy()
+    expected_nodes = expected_net.transit_nodes.copy()
+    gtfs_feed_wo_calendar_dates.stop_times_int = pd.DataFrame()
+    save_dir = os.path.join(tmpdir.strpath, 'chunks')
+    # a large partition memory factor forces one trip per partition
+    monkeypatch.setattr(gtfs_network, '_CHUNK_MEMORY_FACTOR', 1e12)
+    partition_lens = []
+    interpolate_stop_times = gtfs_network._interpolate_stop_times
+
+    def spy_interpolate_stop_times(stop_times_df, **kwargs):
+        partition_lens.append(len(stop_times_df))
+        return interpolate_stop_times(stop_times_df=stop_times_df, **kwargs)
+
+    monkeypatch.setattr(gtfs_network, '_interpolate_stop_times',
+                        spy_interpolate_stop_times)
+    transit_net = gtfs_network.create_transit_net(
+        gtfs_feed_wo_calendar_dates, day='monday',
+        timerange=['07:00:00', '10:00:00'], time_aware=True,
+        save_dir=save_dir, memory_budget=100)
+    result_edges = transit_net.transit_edges
+    result_edges = result_edges.reindex(expected_edges.columns, axis=1)
+    assert result_edges.equals(expected_edges)
+    assert transit_net.transit_nodes.sort_index().equals(
+        expected_nodes.sort_index())
+    # the 8 monday trips of 6 stop times each are read back one at a time
+    assert partition_lens == [6] * 8
+    # intermediate tables and the HDF5 file are not kept in chunked mode
+    assert gtfs_feed_wo_calendar_dates.stop_times_int.empty
+    assert os.listdir(save_dir) == []
+
+    # the budget must cover the stop_times and trips DataFrames
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.create_transit_net(
+            gtfs_feed_wo_calendar_dates, day='monday',
+            timerange=['07:00:00', '10:00:00'], save_dir=save_dir,
+            memory_budget=0.0001)
+    expected_error = 'memory_budget of 0.0001 MB is smaller than the'
+    assert expected_error in str(excinfo.value)
+
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.create_transit_net(
+            gtfs_feed_wo_calendar_dates, day='monday',
+            timerange=['07:00:00', '10:00:00'], memory_budget=-1)
+    expected_error = 'memory_budget must be a positive number.'
+    assert expected_error in str(excinfo.value)
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.create_transit_net(
+            gtfs_feed_wo_calendar_dates, day='monday',
+            timerange=['07:00:00', '10:00:00'], memory_budget=100,
+            save_processed_gtfs=True)
+    expected_error = ('use_existing_stop_times_int and save_processed_gtfs '
+                      'cannot be True when memory_budget is specified.')
+    assert expected_error in str(excinfo.value)
+
+
 def test_create_transit_net_wo_direction_id(
         gtfs_feed_wo_calendar_dates,
         expected_urbanaccess_network_keys,
@@ -1263,6 +1324,31 @@ def test_time_difference(selected_int_stop_times_from_feed_wo_calendar_dates):
     assert result.equals(expected_result)
 
 
+def test_time_difference_unsorted(stop_times_interpolated):
+    stop_times_int = stop_times_interpolated.drop(columns=['timediff'])
+    stop_times_int['departure_time_sec_interpolate'] = range(20)
+    sorted_result = gtfs_network._time_difference(stop_times_int.copy())
+    assert sorted_result['timediff'].isnull().sum() == 4
+    assert list(sorted_result['timediff'][0:5].fillna(0)) == [0, 1, 1, 1, 1]
+    # shuffled stop times are not contiguous by trip so the per trip
+    # difference in record order must still be used
+    shuffled = stop_times_int.sample(frac=1, random_state=1)
+    expected = shuffled.groupby('unique_trip_id')[
+        'departure_time_sec_interpolate'].diff()
+    result = gtfs_network._time_difference(shuffled)
+    assert result['timediff'].equals(expected)
+
+
+def test_format_transit_net_edge_unsorted(stop_times_interpolated):
+    expected = gtfs_network._format_transit_net_edge(
+        stop_times_interpolated.copy(), time_aware=True)
+    shuffled = stop_times_interpolated.sample(frac=1, random_state=1)
+    result = gtfs_network._format_transit_net_edge(shuffled, time_aware=True)
+    assert result.equals(expected)
+    assert list(result['sequence'][0:5]) == [1, 2, 3, 4, 1]
+    assert result['id'][4] == 'b_citytrains_1'
+
+
 def test_format_transit_net_edge_test_1_timeaware_False(
         stop_times_interpolated):
     df = gtfs_network._format_transit_net_edge(stop_times_interpolated)
@@ -1329,10 +1415,41 @@ def test_format_transit_net_edge_test_1_timeaware_True(
            df['unique_agency_id'][8] == stop_times_interpolated[
                'unique_agency_id'][11]  # noqa
 
-    assert df['departure_time'][0] == stop_times_interpolated[
-        'departure_time'][0]  # noqa
-    assert df['arrival_time'][0] == stop_times_interpolated[
-        'arrival_time'][1]  # noqa
+    assert df['departure_time_sec'][0] == stop_times_interpolated[
+        'departure_time_sec_interpolate'][0]  # noqa
+    assert df['arrival_time_sec'][0] == stop_times_interpolated[
+        'arrival_time_sec'][1]  # noqa
+    assert df['departure_time_sec'].dtype == np.int64
+    assert df['arrival_time_sec'].dtype == np.int64
+
+
+def test_format_transit_net_edge_timeaware_missing_arrival_time(
+        stop_times_interpolated):
+    # stops without an arrival time use their interpolated departure time
+    stop_times_interpolated.loc[1, 'arrival_time_sec'] = np.nan
+    stop_times_interpolated.loc[1, 'departure_time_sec_interpolate'] = 30010
+    df = gtfs_network._format_transit_net_edge(stop_times_interpolated,
+                                               time_aware=True)
+    assert df['arrival_time_sec'][0] == 30010
+    assert df['departure_time_sec'][1] == 30010
+    assert df['arrival_time_sec'].dtype == np.int64
+
+
+def test_format_edge_times(
+        expected_final_transit_edge_from_feed_wo_calendar_dates_timeaware):
+    edges = \
+        expected_final_transit_edge_from_feed_wo_calendar_dates_timeaware.copy()  # noqa
+    edges.loc[4, 'arrival_time_sec'] = 90061
+    result = gtfs_network.format_edge_times(edges)
+    assert list(result['departure_time']) == [
+        '08:15:00', '08:20:00', '08:25:00', '08:30:00', '08:35:00']
+    assert list(result['arrival_time']) == [
+        '08:20:00', '08:25:00', '08:30:00', '08:35:00', '25:01:01']
+    # input edges are not modified
+    assert 'departure_time' not in edges.columns
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.format_edge_times(edges, time_cols=['arrival_time'])
+    assert 'were not found in transit_edge_df' in str(excinfo.value)
 
 
 def test_format_transit_net_edge_test_2_timeaware_False(
@@ -1376,7 +1493,7 @@ def test_format_transit_net_edge_timeaware_True(
                                                    time_aware=True)
 
     # check if expected timeware cols are in result
-    expected_timeaware_cols = ['arrival_time', 'departure_time']
+    expected_timeaware_cols = ['arrival_time_sec', 'departure_time_sec']
     assert all(col in result.columns for col in expected_timeaware_cols)
 
     # test that output df is identical to expected df
@@ -1488,7 +1605,8 @@ def test_route_type_to_edge(
 
     result = gtfs_network._route_type_to_edge(
         transit_edge_df=input_edge_df,
-        stop_time_df=gtfs_feed_wo_calendar_dates.stop_times)
+        trips_df=gtfs_feed_wo_calendar_dates.trips,
+        routes_df=gtfs_feed_wo_calendar_dates.routes)
     assert 'route_type' in result.columns
     assert result['route_type'].isnull().sum() == 0
     # re-sort cols so they are in same order for test
@@ -1517,6 +1635,34 @@ def test_route_id_to_edge(
     assert result.equals(expected_result)
 
 
+def test_trip_attributes_to_edge(
+        gtfs_feed_wo_calendar_dates,
+        expected_transit_edge_from_feed_wo_calendar_dates_process_lvl_2):
+    input_edge_df = \
+        expected_transit_edge_from_feed_wo_calendar_dates_process_lvl_2.copy()
+    expected_route_type = input_edge_df['route_type'].copy()
+    input_edge_df.drop(columns=['route_type'], inplace=True)
+
+    result = gtfs_network._trip_attributes_to_edge(
+        transit_edge_df=input_edge_df,
+        trips_df=gtfs_feed_wo_calendar_dates.trips,
+        routes_df=gtfs_feed_wo_calendar_dates.routes,
+        columns=['unique_route_id', 'route_type', 'service_id'])
+    assert list(result['unique_route_id']) == ['10-101_agency_a_city_a'] * 5
+    assert result['route_type'].equals(expected_route_type)
+    assert result['service_id'].isnull().sum() == 0
+
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network._trip_attributes_to_edge(
+            transit_edge_df=input_edge_df,
+            trips_df=gtfs_feed_wo_calendar_dates.trips,
+            routes_df=gtfs_feed_wo_calendar_dates.routes,
+            columns=['not_a_col'])
+    expected_error = ('Column: not_a_col was not found in trips or routes '
+                      'DataFrames.')
+    assert expected_error in str(excinfo.value)
+
+
 def test_check_if_index_name_in_cols_False(
         selected_stops_from_feed_wo_calendar_dates):
     result = gtfs_network._check_if_index_name_in_cols(
@@ -1609,6 +1755,44 @@ def test_edge_impedance_by_route_type_invalid_params(
     assert result.empty is False
 
 
+def test_edge_impedance_by_route_type_multiplier_table(
+        edge_route_type_impedance_df):
+    df = edge_route_type_impedance_df.copy()
+    edge_route_type_impedance_df['unique_route_id'] = \
+        ['1'] * 3 + ['2'] * 3 + ['3'] * 4
+    table = pd.DataFrame({'unique_route_id': ['2', '3'],
+                          'multiplier': [0.25, -0.1]})
+    result = gtfs_network.edge_impedance_by_route_type(
+        edge_route_type_impedance_df,
+        underground_rail=0.5,
+        intercity_rail=-0.5,
+        multiplier_table=table)
+    # route_id 1 weight should use the route type multiplier
+    assert (result.weight.iloc[0:3] == df.weight.iloc[0:3] * 1.5).all()
+    # route_id 2 and 3 weight should use the multiplier table
+    assert (result.weight.iloc[3:6] == df.weight.iloc[3:6] * 1.25).all()
+    assert np.allclose(result.weight.iloc[6:10], df.weight.iloc[6:10] * 0.9)
+
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.edge_impedance_by_route_type(
+            edge_route_type_impedance_df,
+            multiplier_table=table.rename(
+                columns={'unique_route_id': 'route_id'}))
+    expected_error = ('multiplier_table must have a multiplier column and '
+                      'one of either a unique_route_id or unique_agency_id '
+                      'column.')
+    assert expected_error in str(excinfo.value)
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.edge_impedance_by_route_type(
+            edge_route_type_impedance_df,
+            multiplier_table=pd.DataFrame({'unique_agency_id': ['a'],
+                                           'multiplier': [0.1]}))
+    expected_error = ('Column: unique_agency_id was not found in '
+                      'transit_edge_df DataFrame and is required to use '
+                      'multiplier_table.')
+    assert expected_error in str(excinfo.value)
+
+
 def test_save_processed_gtfs_data(
         tmpdir,
         selected_int_stop_times_from_feed_wo_calendar_dates,
@@ -1702,3 +1886,43 @@ def test_load_processed_gtfs_data(
         # check that df is empty
         if key in expected_dfs_empty:
             assert value.empty
+
+
+def test_edge_impedance_scenarios(edge_route_type_impedance_df):
+    df = edge_route_type_impedance_df.copy()
+    result = gtfs_network.edge_impedance_scenarios(
+        edge_route_type_impedance_df,
+        scenarios=[{'underground_rail': 0.5},
+                   {'underground_rail': -0.5, 'intercity_rail': 0.25},
+                   {'funicular': 0.5}])
+    assert {'weight_s1', 'weight_s2', 'weight_s3'}.issubset(result.columns)
+    # base weight column should not change
+    assert result['weight'].equals(df['weight'])
+    assert list(result['weight_s1']) == [3.0] * 3 + [3.0] * 3 + [5.0] * 4
+    assert list(result['weight_s2']) == [1.0] * 3 + [3.75] * 3 + [5.0] * 4
+    # route type not found in DataFrame should not change weight
+    assert list(result['weight_s3']) == list(df['weight'].astype(float))
+
+    # each scenario should match edge_impedance_by_route_type
+    expected = gtfs_network.edge_impedance_by_route_type(
+        df.copy(), underground_rail=-0.5, intercity_rail=0.25)
+    assert np.allclose(result['weight_s2'], expected['weight'])
+
+
+def test_edge_impedance_scenarios_invalid_params(
+        edge_route_type_impedance_df):
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.edge_impedance_scenarios(
+            edge_route_type_impedance_df, scenarios={'bus': 0.5})
+    expected_error = 'scenarios must be a list of one or more dicts.'
+    assert expected_error in str(excinfo.value)
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.edge_impedance_scenarios(
+            edge_route_type_impedance_df, scenarios=[{'tram': 0.5}])
+    assert 'tram is not a valid route type parameter name' in str(
+        excinfo.value)
+    with pytest.raises(ValueError) as excinfo:
+        gtfs_network.edge_impedance_scenarios(
+            edge_route_type_impedance_df, scenarios=[{'bus': 1}])
+    expected_error = 'One or more multiplier variables are not float.'
+    assert expected_error in str(excinfo.value)
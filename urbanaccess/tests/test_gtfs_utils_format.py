@@ -474,6 +474,8 @@ def test_trips_agencyid_feed_1(trips_feed_1,
     # identical to the cols in input df
     original_cols = trips_feed_1.columns
     assert trips_feed_1.equals(result_df[original_cols])
+    # test that the input df is not modified
+    assert 'unique_agency_id' not in trips_feed_1.columns
 
     # test that output df is identical to expected df
     # re-sort cols so they are in same order for test
@@ -993,6 +995,145 @@ def test_stop_times_agencyid_feed_4(stop_times_feed_4,
         'unique_agency_id'].unique())
 
 
+@pytest.fixture
+def multi_agency_tables():
+    # two agencies that share service s1 and stop B and a route r3 without
+    # an agency_id, stop E and service s4 are not used by any trip
+    agency = pd.DataFrame({'agency_id': ['a1', 'a2'],
+                           'agency_name': ['Agency One', 'Agency & Two']})
+    routes = pd.DataFrame({'route_id': ['r1', 'r2', 'r3'],
+                           'agency_id': ['a1', 'a2', np.nan],
+                           'route_type': [3, 1, 3]})
+    trips = pd.DataFrame({'trip_id': ['t1', 't2', 't3', 't4'],
+                          'route_id': ['r1', 'r2', 'r3', 'r1'],
+                          'service_id': ['s1', 's1', 's2', 's3']})
+    stop_times = pd.DataFrame(
+        {'trip_id': ['t1', 't1', 't2', 't2', 't3', 't4'],
+         'stop_id': ['A', 'B', 'B', 'C', 'D', 'A'],
+         'stop_sequence': [1, 2, 1, 2, 1, 1]})
+    stops = pd.DataFrame({'stop_id': ['A', 'B', 'C', 'D', 'E'],
+                          'stop_name': ['a', 'b', 'c', 'd', 'e']})
+    calendar = pd.DataFrame({'service_id': ['s1', 's2', 's3', 's4'],
+                             'monday': [1, 1, 0, 1]})
+    calendar_dates = pd.DataFrame({'service_id': ['s1', 's2'],
+                                   'date': ['20200101', '20200102'],
+                                   'exception_type': [1, 2]})
+    return {'agency': agency, 'routes': routes, 'trips': trips,
+            'stop_times': stop_times, 'stops': stops, 'calendar': calendar,
+            'calendar_dates': calendar_dates}
+
+
+def _merge_agencyid(df, key_col, routes_df, agency_df, trips_df=None,
+                    stop_times_df=None):
+    # unique agency ID assignment using the merges of the routes, agency,
+    # trips and stop times tables made before the look up tables were used
+    merged_df = pd.merge(routes_df, agency_df, how='left', on='agency_id')
+    if trips_df is not None:
+        merged_df = pd.merge(trips_df, merged_df, how='left', on='route_id')
+    if stop_times_df is not None:
+        merged_df = pd.merge(stop_times_df, merged_df, how='left',
+                             on='trip_id')
+    merged_df = pd.merge(df[[key_col]], merged_df, how='left', on=key_col)
+    merged_df['unique_agency_id'] = utils_format._generate_unique_agency_id(
+        merged_df, 'agency_name')
+    pairs = merged_df[[key_col, 'unique_agency_id']].drop_duplicates()
+    if pairs[key_col].duplicated().any():
+        return pairs.merge(df, 'left', on=key_col)
+    return pd.merge(df, pairs, how='left', on=key_col)
+
+
+def test_agencyid_one_to_many(multi_agency_tables):
+    t = multi_agency_tables
+    route_agency_lookup = utils_format._route_agency_lookup(
+        t['routes'], t['agency'])
+    trip_agency_lookup = utils_format._trip_agency_lookup(
+        t['trips'], route_agency_lookup)
+
+    stops_df = utils_format._stops_agencyid(
+        stops_df=t['stops'], trips_df=t['trips'], routes_df=t['routes'],
+        stop_times_df=t['stop_times'], agency_df=t['agency'],
+        feed_folder='feed', trip_agency_lookup=trip_agency_lookup)
+    # stop B is served by both agencies and is duplicated for each
+    assert list(zip(stops_df['stop_id'], stops_df['unique_agency_id'])) == [
+        ('A', 'agency_one'), ('B', 'agency_one'), ('B', 'agency_and_two'),
+        ('C', 'agency_and_two'), ('D', 'nan'), ('E', 'nan')]
+    pd.testing.assert_frame_equal(stops_df, _merge_agencyid(
+        t['stops'], 'stop_id', t['routes'], t['agency'], t['trips'],
+        t['stop_times']))
+
+    calendar_df = utils_format._calendar_agencyid(
+        calendar_df=t['calendar'], routes_df=t['routes'],
+        trips_df=t['trips'], agency_df=t['agency'], feed_folder='feed',
+        route_agency_lookup=route_agency_lookup)
+    # service s1 is used by both agencies and is duplicated for each
+    assert list(calendar_df['service_id']) == ['s1', 's1', 's2', 's3', 's4']
+    pd.testing.assert_frame_equal(calendar_df, _merge_agencyid(
+        t['calendar'], 'service_id', t['routes'], t['agency'], t['trips']))
+
+    calendar_dates_df = utils_format._calendar_dates_agencyid(
+        calendar_dates_df=t['calendar_dates'], routes_df=t['routes'],
+        trips_df=t['trips'], agency_df=t['agency'], feed_folder='feed')
+    pd.testing.assert_frame_equal(calendar_dates_df, _merge_agencyid(
+        t['calendar_dates'], 'service_id', t['routes'], t['agency'],
+        t['trips']))
+
+    # without shared keys the tables are not duplicated
+    stops_df = utils_format._stops_agencyid(
+        stops_df=t['stops'], trips_df=t['trips'], routes_df=t['routes'],
+        stop_times_df=t['stop_times'].iloc[3:], agency_df=t['agency'],
+        feed_folder='feed')
+    assert list(stops_df['stop_id']) == ['A', 'B', 'C', 'D', 'E']
+    pd.testing.assert_frame_equal(stops_df, _merge_agencyid(
+        t['stops'], 'stop_id', t['routes'], t['agency'], t['trips'],
+        t['stop_times'].iloc[3:]))
+
+
+def test_agencyid_route_wo_agency_id(multi_agency_tables):
+    t = multi_agency_tables
+    routes_df = utils_format._routes_agencyid(
+        routes_df=t['routes'], agency_df=t['agency'])
+    # route r3 has no agency_id and no agency name to generate an ID from
+    assert list(routes_df['unique_agency_id']) == [
+        'agency_one', 'agency_and_two', 'nan']
+    pd.testing.assert_frame_equal(routes_df, _merge_agencyid(
+        t['routes'], 'route_id', t['routes'], t['agency']))
+
+    trips_df = utils_format._trips_agencyid(
+        trips_df=t['trips'], routes_df=t['routes'], agency_df=t['agency'])
+    assert list(trips_df['unique_agency_id']) == [
+        'agency_one', 'agency_and_two', 'nan', 'agency_one']
+    pd.testing.assert_frame_equal(trips_df, _merge_agencyid(
+        t['trips'], 'trip_id', t['routes'], t['agency'], t['trips']))
+
+    stop_times_df = utils_format._stop_times_agencyid(
+        stop_times_df=t['stop_times'], routes_df=t['routes'],
+        trips_df=t['trips'], agency_df=t['agency'])
+    pd.testing.assert_frame_equal(stop_times_df, _merge_agencyid(
+        t['stop_times'], 'trip_id', t['routes'], t['agency'], t['trips']))
+
+
+def test_add_unique_agencyid_single_agency_wo_agency_txt(
+        multi_agency_tables, tmpdir):
+    t = multi_agency_tables
+    feed_folder = os.path.join(tmpdir.strpath, 'agency_x')
+    os.makedirs(feed_folder)
+    result = utils_format._add_unique_agencyid(
+        agency_df=pd.DataFrame(), stops_df=t['stops'].copy(),
+        routes_df=t['routes'].copy(), trips_df=t['trips'].copy(),
+        stop_times_df=t['stop_times'].copy(),
+        calendar_df=t['calendar'].copy(),
+        calendar_dates_df=t['calendar_dates'].copy(),
+        feed_folder=feed_folder)
+    names = ['stops', 'routes', 'trips', 'stop_times', 'calendar',
+             'calendar_dates']
+    for name, df in zip(names, result):
+        # every record gets the folder name and shared keys are not
+        # duplicated as there is only one agency
+        assert list(df['unique_agency_id'].unique()) == ['agency_x']
+        pd.testing.assert_frame_equal(
+            df.drop(columns='unique_agency_id'), t[name])
+
+
 def test_add_unique_gtfsfeed_id(stops_feed_1, routes_feed_1, trips_feed_1,
                                 stop_times_feed_1, calendar_feed_1,
                                 calendar_dates_feed_1, folder_feed_1):
@@ -1144,6 +1285,47 @@ def test_read_gtfs_calendar_dates_no_data(
     assert 'service_ids' in captured.out
 
 
+def test_read_gtfs_file_column_projection(routes_txt_w_invalid_values,
+                                          stop_times_txt_w_invalid_values):
+    raw_df, expected_df, feed_path = routes_txt_w_invalid_values
+    result = utils_format._read_gtfs_file(
+        textfile_path=feed_path, textfile='routes.txt',
+        column_projection=True)
+    # unused optional columns should not be read
+    assert 'route_short_name' not in result.columns
+    expected_cols = [col for col in expected_df.columns
+                     if col in ['route_id', 'agency_id', 'route_type',
+                                'route_long_name']]
+    assert list(result.columns) == expected_cols
+    assert result.equals(expected_df[expected_cols])
+
+    raw_df, expected_df, feed_path = stop_times_txt_w_invalid_values
+    result = utils_format._read_gtfs_file(
+        textfile_path=feed_path, textfile='stop_times.txt',
+        column_projection=True)
+    assert 'pickup_type' not in result.columns
+    assert 'drop_off_type' not in result.columns
+    # definition columns should be read when appending definitions
+    result = utils_format._read_gtfs_file(
+        textfile_path=feed_path, textfile='stop_times.txt',
+        column_projection=True, append_definitions=True)
+    assert 'pickup_type' in result.columns
+    assert 'drop_off_type' in result.columns
+
+
+def test_read_gtfs_file_row_filter(stop_times_txt_w_invalid_values):
+    raw_df, expected_df, feed_path = stop_times_txt_w_invalid_values
+    trip_ids = ['a1', 'b2', 'not_a_trip']
+    # use a small chunksize to read the file across several chunks
+    result = utils_format._read_gtfs_file(
+        textfile_path=feed_path, textfile='stop_times.txt',
+        row_filter={'trip_id': trip_ids}, chunksize=3)
+    expected = expected_df[expected_df['trip_id'].isin(
+        trip_ids)].reset_index(drop=True)
+    assert len(result) > 0
+    assert result.equals(expected)
+
+
 def test_read_gtfs_file_general_errors(
         agency_a_feed_on_disk_w_calendar_and_calendar_dates_empty_txt,
         trips_txt_w_missing_req_col):
@@ -1180,6 +1362,22 @@ def test_list_raw_txt_columns(calendar_dates_txt_w_invalid_values):
     assert sorted(result_cols) == sorted(expected_cols)
 
 
+def test_sort_stop_times():
+    df = pd.DataFrame({'unique_trip_id': ['b', 'b', 'a', 'a', 'a'],
+                       'stop_sequence': [1, 2, 3, 1, np.nan]})
+    assert utils_format._is_trip_sorted(df) is False
+    result = utils_format._sort_stop_times(df)
+    assert list(result.index) == [3, 2, 4, 0, 1]
+    assert utils_format._is_trip_sorted(result) is True
+    assert list(result['trip_code']) == [0, 0, 0, 1, 1]
+    assert 'trip_code' not in df.columns
+    # sorted stop times are returned without being copied and the trip
+    # codes are reused
+    assert utils_format._sort_stop_times(result) is result
+    assert utils_format._trip_codes(result.iloc[::-1]).tolist() == [
+        1, 1, 0, 0, 0]
+
+
 def test_timetoseconds(stop_times_feed_1):
     # create 1 record that is missing a 0 in the hr position
     stop_times_feed_1['departure_time'].iloc[8] = '1:20:00'
@@ -1451,6 +1649,27 @@ def test_append_route_type_invalid_param(stops_feed_1, stop_times_feed_1,
     assert expected_error in str(excinfo.value)
 
 
+def test_append_route_types(stops_feed_1, stop_times_feed_1, routes_feed_1,
+                            trips_feed_1):
+    stop_times_df = stop_times_feed_1.copy()
+    result_stops_df, result_stop_times_df = utils_format._append_route_types(
+        stops_df=stops_feed_1,
+        stop_times_df=stop_times_df,
+        routes_df=routes_feed_1[['route_id', 'route_type']],
+        trips_df=trips_feed_1[['trip_id', 'route_id']])
+    assert result_stops_df['route_type'].isnull().sum() == 0
+    assert result_stops_df[stops_feed_1.columns].equals(stops_feed_1)
+    assert result_stops_df.iloc[0]['route_type'] == 3 and \
+           result_stops_df.iloc[6]['route_type'] == 1
+    assert result_stop_times_df['route_type'].isnull().sum() == 0
+    assert result_stop_times_df[stop_times_feed_1.columns].equals(
+        stop_times_feed_1)
+    assert result_stop_times_df.iloc[0]['route_type'] == 3 and \
+           result_stop_times_df.iloc[36]['route_type'] == 1
+    # input stops should not have changed
+    assert 'route_type' not in stops_feed_1.columns
+
+
 def test_add_unique_agencyid_case_1(
         agency_a_feed_on_disk_wo_agency, stops_feed_1, stop_times_feed_1,
         routes_feed_1, trips_feed_1, calendar_feed_1, calendar_dates_feed_1):
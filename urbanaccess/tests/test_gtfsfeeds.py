@@ -1,7 +1,15 @@
 import pytest
 import os
+import shutil
+import io
+import hashlib
+import time
+import zipfile
+import threading
 import pandas as pd
 import yaml
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.error import URLError
 
 from urbanaccess import gtfsfeeds
 from urbanaccess.gtfsfeeds import feeds
@@ -217,3 +225,293 @@ def test_download_gtfs_feed_via_feed_name_and_dict(tmpdir):
             assert os.path.exists(check_path) is True
     # clear feeds from global memory
     feeds.remove_feed(remove_all=True)
+
+
+@pytest.fixture
+def feed_server():
+    # local HTTP server that serves GTFS feed zipfiles after a delay, a
+    # feed that is busy on the first request and a missing feed
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        z.writestr('stops.txt', 'stop_id,stop_name\n1,stop 1\n')
+    zip_bytes = buffer.getvalue()
+    state = {'requests': {}, 'active': 0, 'max_active': 0,
+             'lock': threading.Lock()}
+
+    class handler(BaseHTTPServer.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            with state['lock']:
+                count = state['requests'].get(self.path, 0) + 1
+                state['requests'][self.path] = count
+                state['active'] += 1
+                state['max_active'] = max(state['max_active'],
+                                          state['active'])
+            try:
+                if self.path == '/missing.zip':
+                    self.send_response(404)
+                    self.end_headers()
+                elif self.path == '/notzip.zip':
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html')
+                    self.end_headers()
+                    self.wfile.write(b'<html>not a zipfile</html>')
+                elif self.path == '/busy.zip' and count == 1:
+                    self.send_response(503)
+                    self.send_header('Retry-After', '0')
+                    self.end_headers()
+                elif self.path == '/etag.zip' and self.headers.get(
+                        'If-None-Match') == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    time.sleep(0.5)
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/zip')
+                    self.send_header('Content-Length', str(len(zip_bytes)))
+                    if self.path == '/etag.zip':
+                        self.send_header('ETag', '"v1"')
+                        self.send_header(
+                            'Last-Modified', 'Mon, 05 Oct 2020 00:00:00 GMT')
+                    self.end_headers()
+                    self.wfile.write(zip_bytes)
+            finally:
+                with state['lock']:
+                    state['active'] -= 1
+
+    class server_cls(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+        daemon_threads = True
+
+    server = server_cls(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    yield url, state
+    server.shutdown()
+    server.server_close()
+    feeds.remove_feed(remove_all=True)
+
+
+def test_download_concurrent(feed_server, tmpdir):
+    url, state = feed_server
+    feed_dict = {'feed_{}'.format(i): '{}/feed_{}.zip'.format(url, i)
+                 for i in range(4)}
+    start_time = time.time()
+    gtfsfeeds.download(data_folder=tmpdir.strpath, feed_dict=feed_dict,
+                       max_workers=4, max_host_connections=4)
+    # each feed takes 0.5 seconds to serve, serially this would take
+    # 2 seconds
+    assert time.time() - start_time < 1.5
+    assert state['max_active'] > 1
+    for name in feed_dict.keys():
+        assert os.path.exists(os.path.join(
+            tmpdir.strpath, 'gtfsfeed_text', name, 'stops.txt'))
+    # a single request is made per feed
+    assert all(count == 1 for count in state['requests'].values())
+
+
+def test_download_host_limit(feed_server, tmpdir):
+    url, state = feed_server
+    feed_dict = {'feed_{}'.format(i): '{}/feed_{}.zip'.format(url, i)
+                 for i in range(3)}
+    gtfsfeeds.download(data_folder=tmpdir.strpath, feed_dict=feed_dict,
+                       max_workers=3, max_host_connections=1)
+    assert state['max_active'] == 1
+
+
+def test_download_retry_and_errors(feed_server, tmpdir):
+    url, state = feed_server
+    feed_dict = {'busy': '{}/busy.zip'.format(url),
+                 'missing': '{}/missing.zip'.format(url)}
+    gtfsfeeds.download(data_folder=tmpdir.strpath, feed_dict=feed_dict,
+                       max_workers=2, error_pause_duration=0)
+    # busy feed is re-tried once and downloaded, the missing feed is not
+    # re-tried
+    assert state['requests']['/busy.zip'] == 2
+    assert state['requests']['/missing.zip'] == 1
+    zip_path = os.path.join(tmpdir.strpath, 'gtfsfeed_zips')
+    assert os.listdir(zip_path) == ['busy.zip']
+
+    with pytest.raises(ValueError) as excinfo:
+        gtfsfeeds.download(data_folder=tmpdir.strpath, feed_name='busy',
+                           feed_url='{}/busy.zip'.format(url),
+                           max_workers=0)
+    expected_error = 'max_workers must be an integer greater than 0.'
+    assert expected_error in str(excinfo.value)
+
+
+def test_download_retry_connection_reset(feed_server, tmpdir, monkeypatch):
+    url, state = feed_server
+    urlopen = gtfsfeeds.request.urlopen
+    calls = []
+
+    def reset_once(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise URLError(gtfsfeeds._TRANSIENT_URL_ERRORS[-1](
+                'Connection reset by peer'))
+        return urlopen(*args, **kwargs)
+    monkeypatch.setattr(gtfsfeeds.request, 'urlopen', reset_once)
+    status, entry = gtfsfeeds._download_feed(
+        feed_name='feed', feed_url='{}/feed.zip'.format(url),
+        download_folder=tmpdir.strpath, error_pause_duration=0)
+    assert status == 'downloaded'
+    assert len(calls) == 2
+    assert state['requests']['/feed.zip'] == 1
+
+    # other connection errors are not re-tried
+    def unresolved(*args, **kwargs):
+        calls.append(args)
+        raise URLError('Name or service not known')
+    monkeypatch.setattr(gtfsfeeds.request, 'urlopen', unresolved)
+    status, entry = gtfsfeeds._download_feed(
+        feed_name='feed', feed_url='{}/feed.zip'.format(url),
+        download_folder=tmpdir.strpath, error_pause_duration=0)
+    assert status == 'failed'
+    assert entry is None
+    assert len(calls) == 3
+
+
+def test_download_not_a_zipfile(feed_server, tmpdir):
+    url, state = feed_server
+    zip_path = os.path.join(tmpdir.strpath, 'gtfsfeed_zips')
+    os.makedirs(zip_path)
+    # an existing zipfile is not replaced by a failed download
+    existing_zip = os.path.join(zip_path, 'notzip.zip')
+    with zipfile.ZipFile(existing_zip, 'w') as z:
+        z.writestr('stops.txt', 'stop_id\n1\n')
+    with open(existing_zip, 'rb') as f:
+        expected = f.read()
+    gtfsfeeds.download(data_folder=tmpdir.strpath,
+                       feed_name='notzip', feed_url='{}/notzip.zip'.format(url))
+    assert sorted(os.listdir(zip_path)) == ['notzip.zip']
+    with open(existing_zip, 'rb') as f:
+        assert f.read() == expected
+
+
+def test_stream_to_file(tmpdir):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        z.writestr('stops.txt', 'stop_id\n' + '1\n' * 1000)
+    data = buffer.getvalue()
+
+    class response(io.BytesIO):
+        def info(self):
+            return {'Content-Type': 'application/zip'}
+
+    file_path = os.path.join(tmpdir.strpath, 'feed.zip')
+    sha256 = gtfsfeeds._stream_to_file(
+        file=response(data), file_path=file_path,
+        feed_url_value='http://test.com/feed.zip', chunksize=64)
+    assert sha256 == hashlib.sha256(data).hexdigest()
+    with open(file_path, 'rb') as f:
+        assert f.read() == data
+    assert os.listdir(tmpdir.strpath) == ['feed.zip']
+
+    with pytest.raises(ValueError) as excinfo:
+        gtfsfeeds._stream_to_file(
+            file=response(b'<html></html>'), file_path=file_path,
+            feed_url_value='http://test.com/feed.zip')
+    assert 'is not a zipfile' in str(excinfo.value)
+    assert os.listdir(tmpdir.strpath) == ['feed.zip']
+
+
+def test_download_use_cache(feed_server, tmpdir, monkeypatch):
+    url, state = feed_server
+    feed_dict = {'etag': '{}/etag.zip'.format(url),
+                 'no_etag': '{}/feed_0.zip'.format(url)}
+    gtfsfeeds.download(data_folder=tmpdir.strpath, feed_dict=feed_dict,
+                       use_cache=True)
+    manifest_path = os.path.join(tmpdir.strpath, 'gtfsfeed_manifest.yaml')
+    with open(manifest_path, 'r') as f:
+        manifest = yaml.safe_load(f)
+    assert sorted(manifest.keys()) == ['etag', 'no_etag']
+    assert manifest['etag']['etag'] == '"v1"'
+    assert manifest['no_etag']['etag'] is None
+    zip_path = os.path.join(tmpdir.strpath, 'gtfsfeed_zips', 'no_etag.zip')
+    with open(zip_path, 'rb') as f:
+        assert manifest['no_etag']['sha256'] == hashlib.sha256(
+            f.read()).hexdigest()
+
+    # neither feed changed: the first is not modified and the second has
+    # the same hash so nothing is extracted again
+    unzipped = []
+    monkeypatch.setattr(gtfsfeeds, '_unzip',
+                        lambda *args, **kwargs: unzipped.append(kwargs))
+    feeds.remove_feed(remove_all=True)
+    gtfsfeeds.download(data_folder=tmpdir.strpath, feed_dict=feed_dict,
+                       use_cache=True)
+    assert state['requests']['/etag.zip'] == 2
+    assert unzipped == []
+
+    # a removed extracted feed is downloaded and extracted again
+    shutil.rmtree(os.path.join(tmpdir.strpath, 'gtfsfeed_text', 'etag'))
+    feeds.remove_feed(remove_all=True)
+    gtfsfeeds.download(data_folder=tmpdir.strpath, feed_dict=feed_dict,
+                       use_cache=True)
+    assert unzipped[0]['subset'] == ['etag.zip']
+
+
+@pytest.fixture
+def feed_catalog(tmpdir, monkeypatch):
+    # local copy of a GTFS feed repository catalog
+    catalog_df = pd.DataFrame(
+        {'name': ['AC Transit', 'Bay Area Rapid Transit', 'Santa Rosa CityBus',
+                  'Sonoma County Transit'],
+         'url': ['http://www.actransit.org', 'http://www.bart.gov',
+                 'http://ci.santa-rosa.ca.us', None],
+         'dataexchange_id': ['ac-transit', 'bay-area-rapid-transit',
+                             'santa-rosa-citybus', 'sonoma-county-transit'],
+         'feed_baseurl': [None, None, None, None],
+         'area': ['San Francisco Bay Area', 'San Francisco Bay Area',
+                  'Santa Rosa', 'Sonoma County'],
+         'dataexchange_url': ['http://www.gtfs-data-exchange.com/agency/'
+                              '{}/'.format(i) for i in range(4)],
+         'date_added': [1230000000] * 4,
+         'date_last_updated': [1300000000] * 4})
+    catalog_path = os.path.join(tmpdir.strpath, 'catalog.csv')
+    catalog_df.to_csv(catalog_path, index=False)
+    data_folder = os.path.join(tmpdir.strpath, 'data')
+    monkeypatch.setattr(gtfsfeeds.config.settings, 'gtfs_api',
+                        {'gtfsdataexch': catalog_path})
+    monkeypatch.setattr(gtfsfeeds.config.settings, 'data_folder',
+                        data_folder)
+    monkeypatch.setattr(gtfsfeeds, '_catalog_cache', {})
+    return catalog_path, data_folder
+
+
+def test_search_feed_catalog_cache(feed_catalog):
+    catalog_path, data_folder = feed_catalog
+    search_result = gtfsfeeds.search(
+        search_text=['ac transit', 'SANTA ROSA'], match='contains')
+    assert list(search_result['dataexchange_id']) == [
+        'ac-transit', 'santa-rosa-citybus']
+    assert search_result['date_added'].dtype == 'datetime64[ns]'
+    # only the requested fields are searched
+    search_result = gtfsfeeds.search(
+        search_text='San Francisco Bay Area', search_field=['area'],
+        match='exact')
+    assert len(search_result) == 2
+    search_result = gtfsfeeds.search(
+        search_text='San Francisco Bay Area', search_field=['name'])
+    assert search_result is None
+    # null catalog fields such as feed_baseurl do not match 'nan'
+    assert gtfsfeeds.search(search_text='nan') is None
+
+    # the catalog is read from the memory and disk caches within the TTL
+    os.remove(catalog_path)
+    assert len(gtfsfeeds.search()) == 4
+    gtfsfeeds._catalog_cache.clear()
+    assert len(gtfsfeeds.search()) == 4
+    assert len([f for f in os.listdir(data_folder) if
+                f.startswith('gtfsfeed_catalog_gtfsdataexch')]) == 1
+    with pytest.raises(IOError):
+        gtfsfeeds.search(cache_ttl=0)
+
+    with pytest.raises(ValueError) as excinfo:
+        gtfsfeeds.search(cache_ttl=-1)
+    expected_error = 'cache_ttl must be a positive number.'
+    assert expected_error in str(excinfo.value)
@@ -1,5 +1,6 @@
 import pytest
 import pandas as pd
+import numpy as np
 from urbanaccess import network
 
 
@@ -83,3 +84,105 @@ def test_connector_edges(osm_nodes_df, transit_nodes_df,
     expected_connector_edge_df = expected_connector_edge_df[col_order]
     net_connector_edges = net_connector_edges[col_order]
     assert expected_connector_edge_df.equals(net_connector_edges)
+
+
+@pytest.fixture
+def small_ua_network(osm_nodes_df, transit_nodes_df):
+    osm_nodes = osm_nodes_df.copy()
+    osm_nodes['id'] = osm_nodes.index
+    osm_edges = pd.DataFrame({'from': [1, 2, 2, 3],
+                              'to': [2, 1, 3, 2],
+                              'weight': [5.0, 5.0, 10.0, 10.0],
+                              'net_type': 'walk'})
+    transit_nodes = transit_nodes_df.reset_index().rename(
+        columns={'node_id_route': 'node_id'}).set_index('node_id')
+    transit_edges = pd.DataFrame(
+        {'node_id_from': ['1_transit_a', '2_transit_a', '3_transit_a'],
+         'node_id_to': ['2_transit_a', '3_transit_a', '4_transit_a'],
+         'weight': [2.0, 2.0, 4.0],
+         'weight_s1': [3.0, 3.0, 6.0],
+         'net_type': 'transit'})
+    return network.urbanaccess_network(
+        transit_nodes=transit_nodes, transit_edges=transit_edges,
+        osm_nodes=osm_nodes, osm_edges=osm_edges)
+
+
+def test_integrate_network_scenario_weights(small_ua_network, tmpdir):
+    result = network.integrate_network(small_ua_network, headways=False)
+    edges = result.net_edges
+    assert edges['weight_s1'].notnull().all()
+    transit = edges['net_type'] == 'transit'
+    assert list(edges.loc[transit, 'weight_s1']) == [3.0, 3.0, 6.0]
+    assert edges.loc[~transit, 'weight_s1'].equals(
+        edges.loc[~transit, 'weight'])
+
+    network.save_network(result, filename='test.h5', dir=tmpdir.strpath)
+    loaded = network.load_network(dir=tmpdir.strpath, filename='test.h5')
+    assert loaded.net_edges['weight_s1'].equals(edges['weight_s1'])
+
+
+def test_integrate_network_compact(small_ua_network, tmpdir):
+    result = network.integrate_network(small_ua_network, headways=False,
+                                       compact=True)
+    edges = result.net_edges
+    nodes = result.net_nodes
+    assert edges['from_int'].dtype == np.int32
+    assert edges['to_int'].dtype == np.int32
+    assert edges['weight'].dtype == np.float32
+    assert edges['net_type'].dtype.name == 'category'
+    assert nodes['x'].dtype == np.float32
+    assert nodes['y'].dtype == np.float32
+    assert list(edges.loc[edges['net_type'] == 'transit', 'weight']) == [
+        2.0, 2.0, 4.0]
+
+    network.save_network(result, filename='test.h5', dir=tmpdir.strpath)
+    loaded = network.load_network(dir=tmpdir.strpath, filename='test.h5')
+    assert loaded.net_edges.dtypes.equals(edges.dtypes)
+    assert loaded.net_nodes.dtypes.equals(nodes.dtypes)
+    assert loaded.net_edges.equals(edges)
+
+
+def test_compact_dtypes_keeps_precision():
+    df = pd.DataFrame({'x': [-122.2588301, -122.2588302],
+                       'weight': [1.123456789012, 5.0],
+                       'id': ['a', 'b'],
+                       'count': [1, 2 ** 40]})
+    result = network._compact_dtypes(df.copy())
+    # coordinates change by less than the tolerance so are downcast
+    assert result['x'].dtype == np.float32
+    assert result['weight'].dtype == np.float32
+    # unique strings and values too large for int32 are left as is
+    assert result['id'].dtype == object
+    assert result['count'].dtype == np.int64
+    result = network._compact_dtypes(df.copy(), float_tolerance=1e-12)
+    assert result['weight'].dtype == np.float64
+
+
+def test_integrate_network_osm_max_distance(small_ua_network):
+    # add OSM nodes 500 and 2,500 meters away from OSM node 3 and an OSM
+    # node that is not connected to the network
+    osm_nodes = small_ua_network.osm_nodes
+    far_nodes = pd.DataFrame({'x': [-122.21, -122.19, -122.0],
+                              'y': [37.78, 37.77, 37.5]},
+                             index=pd.Index([4, 5, 6], name='id'))
+    far_nodes['id'] = far_nodes.index
+    small_ua_network.osm_nodes = pd.concat([osm_nodes, far_nodes])
+    small_ua_network.osm_edges = pd.concat(
+        [small_ua_network.osm_edges,
+         pd.DataFrame({'from': [3, 4, 4, 5], 'to': [4, 3, 5, 4],
+                       'weight': [6.0, 6.0, 25.0, 25.0],
+                       'net_type': 'walk'})], ignore_index=True)
+    small_ua_network.osm_edges['distance'] = [
+        300.0, 300.0, 4000.0, 4000.0, 500.0, 500.0, 2000.0, 2000.0]
+
+    with pytest.raises(ValueError) as excinfo:
+        network.integrate_network(small_ua_network, osm_max_distance=0)
+    expected_error = 'osm_max_distance must be a number greater than 0.'
+    assert expected_error in str(excinfo.value)
+
+    result = network.integrate_network(
+        small_ua_network, osm_max_distance=1000, osm_keep_nodes=[6])
+    assert list(result.osm_nodes.index) == [1, 2, 3, 4, 6]
+    assert sorted(zip(result.osm_edges['from'], result.osm_edges['to'])) == [
+        (1, 2), (2, 1), (2, 3), (3, 2), (3, 4), (4, 3)]
+    assert len(result.net_nodes) == 4 + 5
@@ -0,0 +1,213 @@
+import pytest
+import os
+import gzip
+import warnings
+import numpy as np
+import pandas as pd
+from osmnet.load import node_pairs, osm_filter
+
+from urbanaccess.osm import load as osm_load
+
+
+@pytest.fixture
+def osm_nodes():
+    # a 3 x 3 grid of nodes and a node outside of the grid
+    nodes = {}
+    node_id = 1
+    for lat in [37.80, 37.81, 37.82]:
+        for lon in [-122.30, -122.29, -122.28]:
+            nodes[node_id] = (lat, lon)
+            node_id += 1
+    nodes[10] = (37.90, -122.10)
+    return nodes
+
+
+@pytest.fixture
+def osm_ways():
+    # way ID, node IDs and tags. ways 105 and 106 are not walkable and way
+    # 107 references a node that is not in the extract
+    return [
+        (101, [1, 2, 3], {'highway': 'residential', 'name': 'A St'}),
+        (102, [4, 5, 6], {'highway': 'footway'}),
+        (103, [7, 8, 9], {'highway': 'service', 'oneway': 'yes'}),
+        (104, [1, 4, 7], {'highway': 'primary'}),
+        (105, [2, 5, 8], {'highway': 'motorway'}),
+        (106, [3, 6, 9], {'highway': 'residential', 'foot': 'no'}),
+        (107, [3, 6, 9, 11], {'highway': 'path'}),
+        (108, [5, 10], {'building': 'yes'})]
+
+
+@pytest.fixture
+def osm_xml_file(tmpdir, osm_nodes, osm_ways):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+             '<osm version="0.6" generator="test">\n']
+    for node_id, (lat, lon) in osm_nodes.items():
+        lines.append('  <node id="{}" lat="{}" lon="{}">\n'
+                     '    <tag k="highway" v="crossing"/>\n'
+                     '  </node>\n'.format(node_id, lat, lon))
+    for way_id, refs, tags in osm_ways:
+        lines.append('  <way id="{}">\n'.format(way_id))
+        for ref in refs:
+            lines.append('    <nd ref="{}"/>\n'.format(ref))
+        for k, v in tags.items():
+            lines.append('    <tag k="{}" v="{}"/>\n'.format(k, v))
+        lines.append('  </way>\n')
+    lines.append('</osm>\n')
+    osm_path = os.path.join(tmpdir.strpath, 'extract.osm')
+    with open(osm_path, 'w') as f:
+        f.writelines(lines)
+    return osm_path
+
+
+@pytest.fixture
+def expected_walk_network(osm_nodes, osm_ways):
+    # network created by osmnet from the same nodes and walkable ways
+    walk_ways = [(way_id, [ref for ref in refs if ref in osm_nodes], tags)
+                 for way_id, refs, tags in osm_ways if
+                 way_id in [101, 102, 103, 104, 107]]
+    nodes = pd.DataFrame.from_records(
+        [{'id': node_id, 'lat': lat, 'lon': lon} for
+         node_id, (lat, lon) in osm_nodes.items()], index='id')
+    ways = pd.DataFrame.from_records(
+        [dict(tags, id=way_id) for way_id, refs, tags in walk_ways],
+        index='id')
+    waynodes = pd.DataFrame.from_records(
+        [{'way_id': way_id, 'node_id': ref} for way_id, refs, tags in
+         walk_ways for ref in refs], index='way_id')
+    edges = node_pairs(nodes, ways, waynodes, two_way=False)
+    edges.rename(columns={'from_id': 'from', 'to_id': 'to'}, inplace=True)
+    return edges
+
+
+def test_ua_network_from_file(osm_xml_file, expected_walk_network):
+    nodes, edges = osm_load.ua_network_from_file(
+        filepath=osm_xml_file, remove_lcn=False)
+
+    expected = expected_walk_network
+    pd.testing.assert_frame_equal(
+        edges[expected.columns].reset_index(drop=True),
+        expected.reset_index(drop=True), check_dtype=False)
+    assert list(edges.index) == list(expected.index)
+    assert list(nodes.index) == [1, 3, 4, 6, 7, 9]
+    assert list(nodes.columns) == ['x', 'y', 'id']
+    assert nodes.loc[3, 'x'] == -122.28
+
+    # compressed file
+    gz_path = '{}.gz'.format(osm_xml_file)
+    with open(osm_xml_file, 'rb') as f_in, gzip.open(gz_path, 'wb') as f_out:
+        f_out.write(f_in.read())
+    nodes_gz, edges_gz = osm_load.ua_network_from_file(
+        filepath=gz_path, remove_lcn=False)
+    pd.testing.assert_frame_equal(edges_gz, edges)
+
+
+def test_ua_network_from_file_bbox_and_drive(osm_xml_file):
+    # only walkable ways 101, 102 and 104 have a node in the bbox
+    nodes, edges = osm_load.ua_network_from_file(
+        filepath=osm_xml_file, bbox=(-122.305, 37.795, -122.285, 37.815),
+        remove_lcn=False)
+    assert sorted(set(edges['from'])) == [1, 4]
+
+    nodes, edges = osm_load.ua_network_from_file(
+        filepath=osm_xml_file, network_type='drive', remove_lcn=False)
+    assert sorted(set(edges['from'])) == [1, 2, 3]
+    assert 'service' not in set(edges['highway'])
+
+    with pytest.raises(ValueError) as excinfo:
+        osm_load.ua_network_from_file(
+            filepath=osm_xml_file, network_type='bike')
+    expected_error = 'network_type must be one of'
+    assert expected_error in str(excinfo.value)
+
+
+def test_osm_way_filter():
+    for network_type in osm_load._OSM_NETWORK_TYPES:
+        way_filter = osm_load._osm_way_filter(network_type)
+        # every tag filter in the osmnet query filter is parsed
+        assert len(way_filter) == osm_filter(network_type).count('[')
+    way_filter = osm_load._osm_way_filter('walk')
+    assert sorted(way_filter.keys()) == ['foot', 'highway', 'pedestrians']
+    assert osm_load._keep_way({'highway': 'residential'}, way_filter)
+    assert not osm_load._keep_way({'highway': 'motorway'}, way_filter)
+    assert not osm_load._keep_way({'highway': 'path', 'foot': 'no'},
+                                  way_filter)
+
+
+def test_ua_network_from_bbox_cache_dir(osm_xml_file, tmpdir, monkeypatch):
+    nodes, edges = osm_load.ua_network_from_file(
+        filepath=osm_xml_file, remove_lcn=False)
+    calls = []
+
+    def network_from_bbox(**kwargs):
+        calls.append(kwargs)
+        return nodes.copy(), edges.copy()
+    monkeypatch.setattr(osm_load, 'network_from_bbox', network_from_bbox)
+    cache_dir = os.path.join(tmpdir.strpath, 'osm_cache')
+    bbox = (-122.305, 37.795, -122.275, 37.825)
+
+    # OSM tag columns are written without being pickled
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', pd.errors.PerformanceWarning)
+        nodes_1, edges_1 = osm_load.ua_network_from_bbox(
+            bbox=bbox, remove_lcn=False, cache_dir=cache_dir)
+    assert len(calls) == 1
+    nodes_2, edges_2 = osm_load.ua_network_from_bbox(
+        lat_min=bbox[1], lng_min=bbox[2], lat_max=bbox[3], lng_max=bbox[0],
+        remove_lcn=False, cache_dir=cache_dir)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(nodes_2, nodes_1)
+    pd.testing.assert_frame_equal(edges_2, edges_1)
+
+    # a bbox inside the cached bbox is clipped from the cached network
+    nodes_3, edges_3 = osm_load.ua_network_from_bbox(
+        bbox=(-122.305, 37.795, -122.285, 37.815), remove_lcn=False,
+        cache_dir=cache_dir)
+    assert len(calls) == 1
+    assert list(nodes_3.index) == [1, 4]
+    assert sorted(zip(edges_3['from'], edges_3['to'])) == [(1, 4), (4, 1)]
+
+    # a different network type or a bbox outside of the cache is downloaded
+    osm_load.ua_network_from_bbox(
+        bbox=bbox, network_type='drive', remove_lcn=False,
+        cache_dir=cache_dir)
+    osm_load.ua_network_from_bbox(
+        bbox=(-122.305, 37.795, -122.275, 37.835), remove_lcn=False,
+        cache_dir=cache_dir)
+    assert len(calls) == 3
+    assert len(os.listdir(cache_dir)) == 3
+
+
+def test_remove_lcn():
+    # a component of 4 nodes, a component of 2 nodes, a node that can only
+    # be reached in one direction and an isolated node
+    nodes = pd.DataFrame({'x': range(8), 'y': range(8)},
+                         index=[11, 12, 13, 14, 21, 22, 31, 41])
+    edge_pairs = [(11, 12), (12, 13), (13, 14), (14, 11), (21, 22),
+                  (22, 21), (11, 31)]
+    edges = pd.DataFrame(edge_pairs, columns=['from', 'to'])
+    edges['distance'] = 0.0
+
+    nodes_lcn, edges_lcn = osm_load._remove_lcn(
+        nodes=nodes, edges=edges, min_component_size=2)
+    assert list(nodes_lcn.index) == [11, 12, 13, 14, 21, 22]
+    assert len(edges_lcn) == 6
+
+    nodes_lcn, edges_lcn = osm_load._remove_lcn(
+        nodes=nodes, edges=edges, min_component_size=None)
+    assert list(nodes_lcn.index) == [11, 12, 13, 14]
+    assert list(edges_lcn.index) == [0, 1, 2, 3]
+
+    nodes_lcn, edges_lcn = osm_load._remove_lcn(
+        nodes=nodes, edges=edges, min_component_size=np.int64(4))
+    assert list(nodes_lcn.index) == [11, 12, 13, 14]
+
+    # a network without nodes has no edges
+    nodes_lcn, edges_lcn = osm_load._remove_lcn(
+        nodes=nodes.iloc[:0], edges=edges, min_component_size=None)
+    assert nodes_lcn.empty and edges_lcn.empty
+    assert list(edges_lcn.columns) == list(edges.columns)
+
+    with pytest.raises(ValueError) as excinfo:
+        osm_load._remove_lcn(nodes=nodes, edges=edges, min_component_size=0)
+    expected_error = 'lcn_min_component_size must be an integer'
+    assert expected_error in str(excinfo.value)
@@ -1,6 +1,11 @@
 import pytest
+import numpy as np
+import pandas as pd
 
 from urbanaccess.osm.load import ua_network_from_bbox
+from urbanaccess.osm.network import create_osm_net
+from urbanaccess.network import ua_network, _nearest_neighbor
+from urbanaccess.gtfs.gtfsfeeds_dataframe import gtfsfeeds_dfs
 
 
 @pytest.fixture
@@ -21,3 +26,91 @@ def test_column_names(bbox1):
     col_list = ['distance', 'from', 'to']
     for col in col_list:
         assert col in edges.columns
+
+
+@pytest.fixture
+def osm_chain_network():
+    # intersection 1 connects to dead ends 5 and 9 through chains of
+    # degree-2 nodes 2, 3, 4 and 6, 7, 8. node 10 is a one way chain from
+    # 9 to 1 and nodes 11, 12, 13 form an isolated loop
+    two_way_pairs = [(1, 2), (2, 3), (3, 4), (4, 5), (1, 6), (6, 7), (7, 8),
+                     (8, 9), (11, 12), (12, 13), (13, 11)]
+    pairs = []
+    for from_node, to_node in two_way_pairs:
+        pairs.extend([(from_node, to_node), (to_node, from_node)])
+    pairs.extend([(9, 10), (10, 1)])
+    edges = pd.DataFrame(pairs, columns=['from', 'to'])
+    edges['distance'] = 1609.34
+    edges['highway'] = 'footway'
+    edges.index = pd.MultiIndex.from_arrays(
+        [edges['from'].values, edges['to'].values])
+    nodes = pd.DataFrame({'x': np.arange(1, 14) * 0.001,
+                          'y': np.arange(1, 14) * 0.001},
+                         index=pd.Index(np.arange(1, 14), name='id'))
+    nodes['id'] = nodes.index
+    return edges, nodes
+
+
+@pytest.fixture
+def no_transit(monkeypatch):
+    monkeypatch.setattr(ua_network, 'transit_nodes', pd.DataFrame())
+    monkeypatch.setattr(gtfsfeeds_dfs, 'stops', pd.DataFrame())
+
+
+def test_create_osm_net_simplify(osm_chain_network, no_transit):
+    edges, nodes = osm_chain_network
+    osm_net = create_osm_net(osm_edges=edges.copy(), osm_nodes=nodes.copy(),
+                             travel_speed_mph=60, simplify=True)
+    simplified_edges = osm_net.osm_edges
+    assert list(osm_net.osm_nodes.index) == [1, 5, 9, 11]
+    result = sorted(zip(simplified_edges['from'], simplified_edges['to'],
+                        simplified_edges['distance'].round(2),
+                        simplified_edges['weight'].round(2)))
+    assert result == [(1, 5, 6437.36, 4.0), (1, 9, 6437.36, 4.0),
+                      (5, 1, 6437.36, 4.0), (9, 1, 3218.68, 2.0),
+                      (9, 1, 6437.36, 4.0)]
+    assert list(simplified_edges.index) == list(
+        zip(simplified_edges['from'], simplified_edges['to']))
+    assert (simplified_edges['highway'] == 'footway').all()
+
+    # protected nodes are kept
+    osm_net = create_osm_net(osm_edges=edges.copy(), osm_nodes=nodes.copy(),
+                             travel_speed_mph=60, simplify=True,
+                             protected_nodes=[3, 7])
+    assert list(osm_net.osm_nodes.index) == [1, 3, 5, 7, 9, 11]
+    simplified_edges = osm_net.osm_edges
+    assert sorted(zip(simplified_edges['from'], simplified_edges['to'],
+                      simplified_edges['distance'].round(2)))[:2] == [
+        (1, 3, 3218.68), (1, 7, 3218.68)]
+
+    with pytest.raises(ValueError) as excinfo:
+        create_osm_net(osm_edges=edges, osm_nodes=nodes, simplify='yes')
+    expected_error = 'simplify must be bool.'
+    assert expected_error in str(excinfo.value)
+
+
+def test_create_osm_net_simplify_keeps_stop_nodes(osm_chain_network,
+                                                  no_transit):
+    edges, nodes = osm_chain_network
+    # stops nearest to degree-2 nodes 3 and 7
+    transit_nodes = pd.DataFrame({'x': [0.0031, 0.0069],
+                                  'y': [0.0031, 0.0069]},
+                                 index=pd.Index(['s1', 's2'],
+                                                name='node_id'))
+    expected = _nearest_neighbor(nodes[['x', 'y']], transit_nodes)
+    assert list(expected.ravel()) == [3, 7]
+
+    ua_network.transit_nodes = transit_nodes
+    osm_net = create_osm_net(osm_edges=edges.copy(), osm_nodes=nodes.copy(),
+                             travel_speed_mph=60, simplify=True)
+    assert list(osm_net.osm_nodes.index) == [1, 3, 5, 7, 9, 11]
+    result = _nearest_neighbor(osm_net.osm_nodes[['x', 'y']], transit_nodes)
+    assert list(result.ravel()) == list(expected.ravel())
+
+    # GTFS stops are used when there are no transit nodes
+    ua_network.transit_nodes = pd.DataFrame()
+    gtfsfeeds_dfs.stops = pd.DataFrame(
+        {'stop_id': ['s1'], 'stop_lon': [0.0031], 'stop_lat': [0.0031]})
+    osm_net = create_osm_net(osm_edges=edges.copy(), osm_nodes=nodes.copy(),
+                             travel_speed_mph=60, simplify=True)
+    assert list(osm_net.osm_nodes.index) == [1, 3, 5, 9, 11]
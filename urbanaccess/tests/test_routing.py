@@ -0,0 +1,277 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from urbanaccess import routing
+from urbanaccess.network import urbanaccess_network, _edges_to_csgraph
+
+
+@pytest.fixture
+def time_aware_network():
+    # OSM nodes 1-4 along a street and transit nodes 5-7 on a single line
+    # running from near node 1 to near node 4 with a transfer to a second
+    # line at node 7
+    nodes = pd.DataFrame(
+        {'id_int': [1, 2, 3, 4, 5, 6, 7],
+         'x': [0.0, 0.01, 0.02, 0.03, 0.0, 0.03, 0.03],
+         'y': [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.001],
+         'net_type': ['walk'] * 4 + ['transit'] * 3}).set_index('id_int')
+
+    walk = pd.DataFrame(
+        {'from_int': [1, 2, 2, 3, 3, 4, 1, 5, 4, 6, 6, 7],
+         'to_int': [2, 1, 3, 2, 4, 3, 5, 1, 6, 4, 7, 6],
+         'weight': [20.0, 20.0, 20.0, 20.0, 20.0, 20.0,
+                    1.0, 1.0, 1.0, 1.0, 2.0, 2.0],
+         'net_type': ['walk'] * 6 + ['osm to transit', 'transit to osm'] +
+                     ['osm to transit', 'transit to osm'] +
+                     ['transit to transit'] * 2})
+    walk['departure_time_sec'] = np.nan
+    walk['arrival_time_sec'] = np.nan
+    walk['unique_trip_id'] = np.nan
+
+    transit = pd.DataFrame(
+        {'from_int': [5, 5, 5, 7],
+         'to_int': [6, 6, 6, 5],
+         'weight': [10.0, 10.0, 10.0, 10.0],
+         'net_type': ['transit'] * 4,
+         'departure_time_sec': [29100, 30000, 30900, 31800],
+         'arrival_time_sec': [29700, 30600, 31500, 32400],
+         'unique_trip_id': ['trip_a', 'trip_b', 'trip_c', 'trip_d']})
+
+    edges = pd.concat([walk, transit], ignore_index=True)
+    return urbanaccess_network(net_nodes=nodes, net_edges=edges)
+
+
+def test_edges_to_csgraph_keeps_min_parallel_edge():
+    edges = pd.DataFrame({'from_int': [1, 1, 2],
+                          'to_int': [2, 2, 3],
+                          'weight': [5.0, 2.0, 1.0]})
+    graph = _edges_to_csgraph(edges, pd.Index([1, 2, 3]))
+    assert graph.shape == (3, 3)
+    assert graph[0, 1] == 2.0
+    assert graph[1, 2] == 1.0
+    assert graph.nnz == 2
+
+
+def test_csa_from_network(time_aware_network):
+    csa = routing.urbanaccess_csa.from_network(time_aware_network,
+                                               max_transfer_time=5)
+    assert len(csa.connections) == 4
+    assert csa.connections['departure_sec'].is_monotonic_increasing
+    assert csa.walk_graph.shape == (7, 7)
+    # transit node 6 can walk to transit node 7 as a transfer
+    assert (7, 120.0) in [(csa.node_ids[t], s) for t, s in
+                          csa.footpaths[5]]
+
+
+def test_csa_from_network_rejects_headways(time_aware_network):
+    # connector edges of networks integrated with headways carry the
+    # headway route stop ID and have the headway added to their weight
+    edges = time_aware_network.net_edges
+    edges['node_id_route'] = np.where(
+        edges['net_type'] == 'osm to transit', '5_route_a', np.nan)
+    with pytest.raises(ValueError) as excinfo:
+        routing.urbanaccess_csa.from_network(time_aware_network)
+    expected_error = ('Connection scan requires an integrated network '
+                      'created with headways set to False.')
+    assert expected_error in str(excinfo.value)
+
+
+def test_csa_earliest_arrival(time_aware_network):
+    csa = routing.urbanaccess_csa.from_network(time_aware_network)
+    result = csa.earliest_arrival(origins=1, departure_time='08:00:00',
+                                  max_travel_time=60)
+    travel = result[1]
+    assert list(result.columns) == [1]
+    assert travel[1] == 0
+    # walk 1 min to the stop, wait until 08:05, ride 10 min
+    assert travel[6] == 15
+    # egress from transit node 6 to node 4 and transfer to node 7
+    assert travel[4] == 16
+    assert travel[7] == 17
+    # node 3 is reached faster via transit and walking back from node 4
+    assert travel[3] == 36
+
+
+def test_csa_earliest_arrival_missed_departure(time_aware_network):
+    csa = routing.urbanaccess_csa.from_network(time_aware_network)
+    result = csa.earliest_arrival(origins=[1], departure_time='08:05:00',
+                                  max_travel_time=60)
+    # walking to the stop misses the 08:05 trip so wait for the 08:20 trip
+    assert result.loc[6, 1] == 25
+
+
+def test_csa_earliest_arrival_max_travel_time(time_aware_network):
+    csa = routing.urbanaccess_csa.from_network(time_aware_network)
+    result = csa.earliest_arrival(origins=1, departure_time='08:00:00',
+                                  max_travel_time=10)
+    assert np.isnan(result.loc[2, 1])
+    assert np.isnan(result.loc[6, 1])
+    assert result.loc[5, 1] == 1
+
+
+def test_csa_from_network_clock_times(time_aware_network):
+    # networks with 24 hour clock formatted edge times are still supported
+    edges = time_aware_network.net_edges.copy()
+    edges['departure_time'] = edges['departure_time_sec'].map(
+        lambda sec: '{:02d}:{:02d}:00'.format(int(sec // 3600),
+                                              int(sec % 3600 // 60)),
+        na_action='ignore')
+    edges['arrival_time'] = edges['arrival_time_sec'].map(
+        lambda sec: '{:02d}:{:02d}:00'.format(int(sec // 3600),
+                                              int(sec % 3600 // 60)),
+        na_action='ignore')
+    edges.drop(columns=['departure_time_sec', 'arrival_time_sec'],
+               inplace=True)
+    expected = routing.urbanaccess_csa.from_network(time_aware_network)
+    csa = routing.urbanaccess_csa.from_network(
+        urbanaccess_network(net_nodes=time_aware_network.net_nodes,
+                            net_edges=edges))
+    assert csa.connections.equals(expected.connections)
+
+
+def test_csa_profile(time_aware_network):
+    csa = routing.urbanaccess_csa.from_network(time_aware_network)
+    result = csa.profile(origins=1, timerange=['08:00:00', '08:10:00'],
+                         interval=5, max_travel_time=60)
+    assert result.columns.names == ['origin', 'departure_time']
+    assert list(result.columns.get_level_values(1)) == [
+        '08:00:00', '08:05:00', '08:10:00']
+    assert list(result.loc[6]) == [15, 25, 20]
+
+
+def test_csa_invalid_params(time_aware_network):
+    with pytest.raises(ValueError):
+        routing.urbanaccess_csa.from_network(urbanaccess_network())
+    edges = time_aware_network.net_edges.drop(
+        columns=['departure_time_sec'])
+    with pytest.raises(ValueError):
+        routing.urbanaccess_csa.from_network(
+            urbanaccess_network(net_nodes=time_aware_network.net_nodes,
+                                net_edges=edges))
+    csa = routing.urbanaccess_csa.from_network(time_aware_network)
+    with pytest.raises(ValueError):
+        csa.earliest_arrival(origins=99, departure_time='08:00:00')
+    with pytest.raises(ValueError):
+        csa.earliest_arrival(origins=1, departure_time='08:00:00',
+                             max_travel_time=-1)
+
+
+@pytest.fixture
+def zones_df():
+    data = {'zone_id': ['a', 'b', 'c'],
+            'x': [0.0001, 0.0201, 0.0299],
+            'y': [0.0, 0.0, 0.0]}
+    return pd.DataFrame(data).set_index('zone_id')
+
+
+def test_od_matrix(time_aware_network, zones_df):
+    od = routing.od_matrix(time_aware_network, zones_df, chunksize=1)
+    assert list(od.index) == ['a', 'b', 'c']
+    assert list(od.columns) == ['a', 'b', 'c']
+    assert od.dtypes.unique()[0] == np.float32
+    # zones snap to nodes 1, 3 and 4, node 3 is reached by riding transit
+    # and walking back from node 4
+    assert od.loc['a', 'a'] == 0
+    assert od.loc['a', 'b'] == 32
+    assert od.loc['a', 'c'] == 12
+    assert od.loc['c', 'a'] == 14
+
+
+def test_od_matrix_limit_and_memmap(time_aware_network, zones_df,
+                                    tmpdir):
+    od = routing.od_matrix(time_aware_network, zones_df,
+                           max_travel_time=30, chunksize=2,
+                           filename='od.npy', dir=tmpdir.strpath)
+    saved = np.load(tmpdir.join('od.npy').strpath)
+    assert np.isnan(od.loc['a', 'b'])
+    np.testing.assert_array_equal(saved, od.to_numpy())
+
+
+def test_od_matrix_processes(time_aware_network, zones_df):
+    expected = routing.od_matrix(time_aware_network, zones_df)
+    result = routing.od_matrix(time_aware_network, zones_df, chunksize=1,
+                               processes=2)
+    assert result.equals(expected)
+
+
+def test_od_matrix_chunk_memory(time_aware_network, zones_df, monkeypatch):
+    # the default chunk distance matrix stays within the byte budget for
+    # networks of any size
+    for node_cnt in [7, 10 ** 6, 10 ** 7]:
+        chunksize = routing._dist_chunksize(node_cnt)
+        assert chunksize >= 1
+        assert chunksize * node_cnt * 8 <= routing._DIST_CHUNK_BYTES
+
+    expected = routing.od_matrix(time_aware_network, zones_df)
+    node_cnt = len(time_aware_network.net_nodes)
+    monkeypatch.setattr(routing, '_DIST_CHUNK_BYTES', 2 * node_cnt * 8)
+    chunk_bytes = []
+    od_worker_chunk = routing._od_worker_chunk
+
+    def worker_chunk(origin_pos):
+        chunk_bytes.append(len(origin_pos) * node_cnt * 8)
+        return od_worker_chunk(origin_pos)
+    monkeypatch.setattr(routing, '_od_worker_chunk', worker_chunk)
+    result = routing.od_matrix(time_aware_network, zones_df)
+    assert result.equals(expected)
+    assert len(chunk_bytes) == 2
+    assert max(chunk_bytes) <= routing._DIST_CHUNK_BYTES
+
+
+def test_od_matrix_invalid_params(time_aware_network, zones_df):
+    with pytest.raises(ValueError):
+        routing.od_matrix(time_aware_network, zones_df, x_col='lon')
+    with pytest.raises(ValueError):
+        routing.od_matrix(time_aware_network, zones_df, chunksize=0)
+    with pytest.raises(ValueError):
+        routing.od_matrix(time_aware_network, zones_df, processes=0)
+
+
+def test_isochrones(time_aware_network):
+    result = routing.isochrones(time_aware_network, origins=[1, 4],
+                                thresholds=[15, 5])
+    assert list(result.columns) == ['origin', 'threshold', 'node_ids']
+    assert list(result['origin']) == [1, 1, 4, 4]
+    assert list(result['threshold']) == [5, 15, 5, 15]
+    assert sorted(result['node_ids'][0]) == [1, 5]
+    assert sorted(result['node_ids'][1]) == [1, 4, 5, 6, 7]
+    assert sorted(result['node_ids'][2]) == [4, 6, 7]
+
+
+def test_graph_isochrones_hulls(time_aware_network):
+    graph = routing.urbanaccess_graph.from_network(time_aware_network)
+    result = graph.isochrones(origins=1, thresholds=15, hulls=True)
+    hull = result['hull'][0]
+    assert len(hull) == 3
+    assert set(hull) == {(0.0, 0.0), (0.03, 0.0), (0.03, 0.001)}
+    # coincident reachable points are returned without a hull
+    result = graph.isochrones(origins=1, thresholds=5, hulls=True)
+    assert result['hull'][0] == [(0.0, 0.0)]
+
+
+def test_graph_isochrones_numpy_thresholds(time_aware_network):
+    graph = routing.urbanaccess_graph.from_network(time_aware_network)
+    expected = graph.isochrones(origins=[1, 4], thresholds=[5, 15])
+    result = graph.isochrones(origins=[1, 4],
+                              thresholds=[np.int64(5), np.float32(15)],
+                              chunksize=np.int64(1))
+    assert list(result['threshold']) == [5, 15, 5, 15]
+    for node_ids, expected_node_ids in zip(result['node_ids'],
+                                           expected['node_ids']):
+        assert sorted(node_ids) == sorted(expected_node_ids)
+
+
+def test_isochrones_invalid_params(time_aware_network):
+    graph = routing.urbanaccess_graph.from_network(time_aware_network)
+    with pytest.raises(ValueError):
+        graph.isochrones(origins=1, thresholds=-5)
+    with pytest.raises(ValueError):
+        graph.isochrones(origins=1, thresholds=True)
+    with pytest.raises(ValueError):
+        graph.isochrones(origins=1, thresholds=[5, '15'])
+    with pytest.raises(ValueError):
+        graph.isochrones(origins=99, thresholds=5)
+    with pytest.raises(ValueError):
+        routing.urbanaccess_graph.from_network(time_aware_network,
+                                               weight_col='weight_s1')
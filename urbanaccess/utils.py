@@ -11,6 +11,10 @@ import pandas as pd
 
 from urbanaccess import config
 
+# os.replace overwrites existing files on all platforms but is not
+# available in Python 2
+_replace = getattr(os, 'replace', os.rename)
+
 
 def log(message, level=None, name=None, filename=None):
     """